@@ -0,0 +1,144 @@
+# benchmarks/db_benchmark.py
+"""
+Đo hiệu năng truy vấn của DatabaseManager
+
+Chạy: python benchmarks/db_benchmark.py [--queries N]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+from utils.data_importer import DataImporter
+from utils.heart_rate_stream import HeartRateStream
+
+def _prepare_database(db_file: str) -> int:
+    """Tạo database mẫu với 30 ngày dữ liệu, trả về user_id"""
+    db = DatabaseManager(db_file, pool_size=0, profile="default")
+    db.init_database()
+    db.create_user("bench", "benchpass", "Bench User", 170.0)
+    user_id = db.authenticate_user("bench", "benchpass")['user_id']
+    
+    conn = db.get_connection()
+    try:
+        for day in range(30):
+            date = f"2024-01-{day + 1:02d}"
+            conn.execute('INSERT INTO weight_records (user_id, record_date, weight, bmi) VALUES (?, ?, ?, ?)',
+                         (user_id, date, 65.0 + day * 0.1, 22.5))
+            conn.execute('''INSERT INTO activities (user_id, activity_date, activity_type, duration, calories_burned)
+                            VALUES (?, ?, ?, ?, ?)''', (user_id, date, "Đi bộ", 30, 150.0))
+            conn.execute('INSERT INTO heart_rate_records (user_id, record_date, record_time, bpm) VALUES (?, ?, ?, ?)',
+                         (user_id, date, "08:00", 70))
+        conn.commit()
+    finally:
+        conn.close()
+    return user_id
+
+def bench_reads(db: DatabaseManager, user_id: int, queries: int) -> float:
+    """Chạy lặp các truy vấn đọc của dashboard, trả về số truy vấn/giây"""
+    readers = (
+        lambda: db.get_current_weight(user_id),
+        lambda: db.get_weekly_activity_minutes(user_id),
+        lambda: db.get_latest_heart_rate(user_id),
+        lambda: db.get_user_height(user_id),
+    )
+    start = time.perf_counter()
+    for i in range(queries):
+        readers[i % len(readers)]()
+    elapsed = time.perf_counter() - start
+    return queries / elapsed
+
+def bench_writes(db: DatabaseManager, user_id: int, writes: int) -> float:
+    """Ghi từng bản ghi nhịp tim một (mỗi lần một commit), trả về số bản ghi/giây"""
+    start = time.perf_counter()
+    for i in range(writes):
+        db.add_heart_rate_record(user_id, "2024-02-01", f"{i // 60 % 24:02d}:{i % 60:02d}", 60 + i % 40)
+    elapsed = time.perf_counter() - start
+    return writes / elapsed
+
+def bench_bulk_writes(db: DatabaseManager, user_id: int, writes: int) -> float:
+    """Ghi cùng số bản ghi nhịp tim qua add_heart_rate_records_bulk, trả về số bản ghi/giây"""
+    rows = [{'record_date': "2024-03-01", 'record_time': f"{i // 60 % 24:02d}:{i % 60:02d}", 'bpm': 60 + i % 40}
+            for i in range(writes)]
+    start = time.perf_counter()
+    db.add_heart_rate_records_bulk(user_id, rows)
+    elapsed = time.perf_counter() - start
+    return writes / elapsed
+
+def bench_import(db: DatabaseManager, user_id: int, rows: int, temp_dir: str) -> float:
+    """Nhập file CSV nhịp tim (định dạng HistoryTab xuất) qua DataImporter, trả về số dòng/giây"""
+    path = os.path.join(temp_dir, "heart_rate.csv")
+    with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Ngày', 'Thời gian', 'BPM', 'Hoạt động', 'Ghi chú'])
+        for i in range(rows):
+            writer.writerow([f"2024-04-{i // 1440 % 28 + 1:02d}", f"{i // 60 % 24:02d}:{i % 60:02d}",
+                             60 + i % 40, '', ''])
+    start = time.perf_counter()
+    DataImporter(db).import_file(user_id, 'heart_rate', path)
+    elapsed = time.perf_counter() - start
+    return rows / elapsed
+
+def bench_stream(db: DatabaseManager, user_id: int, samples: int) -> float:
+    """Ghi mẫu nhịp tim theo giây qua HeartRateStream (thread ghi nền), trả về số mẫu/giây"""
+    start_ts = int(time.mktime((2024, 5, 1, 0, 0, 0, 0, 0, -1)))
+    data = [(start_ts + i, 60 + i % 40) for i in range(samples)]
+    start = time.perf_counter()
+    with HeartRateStream(db, user_id) as stream:
+        for i in range(0, samples, 1000):
+            stream.put_many(data[i:i + 1000])
+    elapsed = time.perf_counter() - start
+    return samples / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseManager")
+    parser.add_argument("--queries", type=int, default=5000, help="Số truy vấn mỗi lượt đo")
+    parser.add_argument("--writes", type=int, default=500, help="Số bản ghi mỗi lượt đo ghi")
+    parser.add_argument("--import-rows", type=int, default=100000, help="Số dòng CSV khi đo nhập file")
+    parser.add_argument("--stream-samples", type=int, default=50000, help="Số mẫu khi đo luồng nhịp tim theo giây")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_file = os.path.join(temp_dir, "bench.db")
+        user_id = _prepare_database(db_file)
+        
+        print(f"Read benchmark ({args.queries} queries)")
+        for label, pool_size in (("per-query connection", 0), ("pooled connection", 5)):
+            db = DatabaseManager(db_file, pool_size=pool_size, profile="default")
+            qps = bench_reads(db, user_id, args.queries)
+            db.close()
+            print(f"  {label:<22} {qps:>10.0f} queries/sec")
+        
+        print(f"Write benchmark ({args.writes} single-row inserts)")
+        for profile in ("default", "performance"):
+            db_file = os.path.join(temp_dir, f"bench_{profile}.db")
+            user_id = _prepare_database(db_file)
+            db = DatabaseManager(db_file, profile=profile)
+            wps = bench_writes(db, user_id, args.writes)
+            db.close()
+            print(f"  {profile + ' profile':<22} {wps:>10.0f} rows/sec")
+        
+        print(f"Bulk write benchmark ({args.writes * 20} rows, one transaction)")
+        db = DatabaseManager(db_file)
+        wps = bench_bulk_writes(db, user_id, args.writes * 20)
+        db.close()
+        print(f"  {'bulk insert':<22} {wps:>10.0f} rows/sec")
+        
+        print(f"Import benchmark ({args.import_rows} CSV rows)")
+        db = DatabaseManager(db_file)
+        rps = bench_import(db, user_id, args.import_rows, temp_dir)
+        db.close()
+        print(f"  {'csv import':<22} {rps:>10.0f} rows/sec")
+        
+        print(f"Stream benchmark ({args.stream_samples} per-second heart rate samples)")
+        db = DatabaseManager(db_file)
+        sps = bench_stream(db, user_id, args.stream_samples)
+        db.close()
+        print(f"  {'heart rate stream':<22} {sps:>10.0f} samples/sec")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# database/alert_state.py
+"""
+Trạng thái cửa sổ trượt cho hệ thống cảnh báo
+
+Mỗi (user, loại bản ghi) có một trạng thái JSON nhỏ trong bảng alert_state,
+chỉ giữ phần dữ liệu AlertSystem cần:
+  - weight: cân nặng theo ngày trong cửa sổ 7 ngày
+  - activity: tổng phút hoạt động theo ngày trong cửa sổ 7 ngày
+  - sleep: [giờ ngủ, chất lượng] theo ngày trong cửa sổ 7 ngày
+  - heart_rate: 2 bản ghi nhịp tim mới nhất [ngày, giờ, bpm, hoạt động]
+
+Mỗi lần add_* ghi một bản ghi, trạng thái được cập nhật trong cùng giao
+dịch bằng merge_alert_state; sau bulk insert thì dựng lại bằng một truy vấn
+theo cửa sổ (build_alert_state). Kích thước trạng thái bị giới hạn, nên
+đánh giá cảnh báo không phụ thuộc số bản ghi.
+"""
+import datetime
+import sqlite3
+from typing import Dict, List, Sequence, Tuple
+
+ALERT_STATE_TYPES = ("weight", "activity", "sleep", "heart_rate")
+
+# Độ dài cửa sổ (ngày), tính từ hôm nay trừ N ngày như date('now', '-N days')
+ALERT_WINDOW_DAYS = {"weight": 7, "activity": 7, "sleep": 7, "heart_rate": 2}
+
+# Số bản ghi nhịp tim mới nhất được giữ (bản ghi mới nhất và bản ghi ngay trước)
+HEART_RATE_KEEP = 2
+
+# Truy vấn dựng lại trạng thái; hàng trả về có cùng dạng với tham số record của merge_alert_state
+ALERT_STATE_QUERIES = {
+    "weight": '''
+        SELECT record_date, weight FROM weight_records
+        WHERE user_id = ? AND record_date >= ?
+    ''',
+    "activity": '''
+        SELECT activity_date, SUM(duration) FROM activities
+        WHERE user_id = ? AND activity_date >= ?
+        GROUP BY activity_date
+    ''',
+    "sleep": '''
+        SELECT record_date, sleep_hours, sleep_quality FROM sleep_records
+        WHERE user_id = ? AND record_date >= ?
+    ''',
+    "heart_rate": '''
+        SELECT record_date, record_time, bpm, activity_type FROM heart_rate_records
+        WHERE user_id = ?
+        ORDER BY record_date DESC, record_time DESC
+        LIMIT ?
+    ''',
+}
+
+def window_start(record_type: str, today: datetime.date = None) -> str:
+    """Ngày đầu tiên (YYYY-MM-DD) còn nằm trong cửa sổ của loại bản ghi"""
+    today = today or datetime.date.today()
+    return (today - datetime.timedelta(days=ALERT_WINDOW_DAYS[record_type])).isoformat()
+
+def build_alert_state(conn: sqlite3.Connection, user_id: int, record_type: str,
+                      today: datetime.date = None) -> Dict:
+    """Dựng trạng thái từ bảng bản ghi bằng một truy vấn (theo cửa sổ / LIMIT)"""
+    if record_type == "heart_rate":
+        rows = conn.execute(ALERT_STATE_QUERIES[record_type], (user_id, HEART_RATE_KEEP)).fetchall()
+        return {"latest": [list(row) for row in rows]}
+
+    rows = conn.execute(ALERT_STATE_QUERIES[record_type],
+                        (user_id, window_start(record_type, today))).fetchall()
+    if record_type == "sleep":
+        return {"days": {date: [hours, quality] for date, hours, quality in rows}}
+    return {"days": {date: value for date, value in rows}}
+
+def merge_alert_state(record_type: str, state: Dict, record: Sequence,
+                      today: datetime.date = None) -> Dict:
+    """
+    Cập nhật trạng thái với một bản ghi vừa ghi
+
+    Args:
+        record_type: Loại bản ghi
+        state: Trạng thái hiện tại
+        record: Bộ giá trị như một hàng của ALERT_STATE_QUERIES[record_type]
+        today: Ngày tính cửa sổ (mặc định hôm nay)
+
+    Returns:
+        Trạng thái mới, đã bỏ các ngày ra khỏi cửa sổ
+    """
+    if record_type == "heart_rate":
+        latest = state.get("latest", []) + [list(record)]
+        latest.sort(key=lambda r: (r[0], r[1] or ""), reverse=True)
+        return {"latest": latest[:HEART_RATE_KEEP]}
+
+    start = window_start(record_type, today)
+    days = {date: value for date, value in state.get("days", {}).items() if date >= start}
+    date = record[0]
+    if date >= start:
+        if record_type == "activity":
+            # Nhiều hoạt động trong một ngày được cộng dồn
+            days[date] = days.get(date, 0) + record[1]
+        elif record_type == "sleep":
+            days[date] = [record[1], record[2]]
+        else:
+            # Cân nặng: một bản ghi mỗi ngày (INSERT OR REPLACE)
+            days[date] = record[1]
+    return {"days": days}
+
+def window_days(record_type: str, state: Dict, today: datetime.date = None) -> List[Tuple[str, object]]:
+    """Các cặp (ngày, giá trị) còn trong cửa sổ tính tới hôm nay, ngày mới nhất trước"""
+    start = window_start(record_type, today)
+    days = state.get("days", {}) if state else {}
+    return sorted(((date, value) for date, value in days.items() if date >= start), reverse=True)
@@ -0,0 +1,74 @@
+# database/change_bus.py
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# Các loại bản ghi phát thay đổi
+RECORD_TYPES = ("weight", "activity", "sleep", "heart_rate")
+
+@dataclass(frozen=True)
+class DataChange:
+    """Thông báo một lần ghi dữ liệu (thêm / sửa / xóa) đã được commit"""
+    user_id: int
+    record_type: str
+    from_date: Optional[str] = None   # None = không rõ khoảng ngày
+    to_date: Optional[str] = None
+
+    def overlaps(self, from_date: Optional[str], to_date: Optional[str]) -> bool:
+        """Khoảng ngày thay đổi có giao với [from_date, to_date] không (None = không giới hạn)"""
+        if self.from_date is None or self.to_date is None:
+            return True
+        return (from_date is None or self.to_date >= from_date) and \
+               (to_date is None or self.from_date <= to_date)
+
+class DataChangeBus:
+    """
+    Bus publish/subscribe cho thay đổi dữ liệu
+
+    DatabaseManager phát một DataChange sau mỗi lần ghi thành công. Callback
+    được gọi ngay trên thread đã ghi (có thể là thread nền), nên subscriber
+    phía giao diện phải tự chuyển về main thread.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Callable[[DataChange], None], Optional[frozenset], Optional[int]]] = []
+
+    def subscribe(self, callback: Callable[[DataChange], None], record_types: Iterable[str] = None,
+                  user_id: int = None) -> Callable[[], None]:
+        """
+        Đăng ký nhận thay đổi
+
+        Args:
+            callback: Hàm(DataChange)
+            record_types: Chỉ nhận các loại bản ghi này (mặc định tất cả)
+            user_id: Chỉ nhận thay đổi của user này (mặc định tất cả)
+
+        Returns:
+            Hàm hủy đăng ký
+        """
+        entry = (callback, frozenset(record_types) if record_types is not None else None, user_id)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, change: DataChange):
+        """Gửi thay đổi tới các subscriber phù hợp; lỗi của subscriber không ảnh hưởng nơi ghi"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, record_types, user_id in subscribers:
+            if record_types is not None and change.record_type not in record_types:
+                continue
+            if user_id is not None and change.user_id != user_id:
+                continue
+            try:
+                callback(change)
+            except Exception as e:
+                self.logger.error(f"Error in data change subscriber: {e}")
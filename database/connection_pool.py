@@ -0,0 +1,136 @@
+# database/connection_pool.py
+import sqlite3
+import threading
+import logging
+from queue import Queue, Empty, Full
+from typing import Callable, Optional
+
+class PooledConnection:
+    """Kết nối mượn từ pool - close() trả kết nối về pool thay vì đóng thật"""
+
+    def __init__(self, pool: 'ConnectionPool', conn: sqlite3.Connection, pooled: bool):
+        self._pool = pool
+        self._conn = conn
+        self._pooled = pooled
+        self._released = False
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        """Kết nối sqlite3 gốc"""
+        return self._conn
+
+    def close(self):
+        """Trả kết nối về pool (gọi nhiều lần không gây lỗi)"""
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._conn, self._pooled)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+class ConnectionPool:
+    """
+    Pool kết nối SQLite dùng lại giữa các lần truy vấn
+
+    Mỗi kết nối chỉ được một thread dùng tại một thời điểm (mượn/trả qua queue),
+    nên có thể mở với check_same_thread=False và chuyển giữa các thread an toàn.
+    Khi pool cạn, một kết nối tạm được mở và đóng lại khi trả về, nên các lời
+    gọi lồng nhau trong cùng thread không bao giờ bị treo. Sau close_all() pool
+    chỉ cho mượn kết nối tạm (lời gọi muộn vẫn chạy nhưng không giữ lại kết
+    nối nào) cho tới khi reopen().
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], pool_size: int = 5):
+        """
+        Args:
+            factory: Hàm tạo kết nối sqlite3 mới
+            pool_size: Số kết nối rảnh tối đa được giữ lại
+        """
+        self.factory = factory
+        self.pool_size = max(pool_size, 1)
+        self._idle = Queue(maxsize=self.pool_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self.logger = logging.getLogger(__name__)
+
+    def acquire(self) -> PooledConnection:
+        """Mượn một kết nối từ pool (kết nối tạm nếu pool đã đóng)"""
+        try:
+            conn = self._idle.get_nowait()
+            return PooledConnection(self, conn, pooled=True)
+        except Empty:
+            pass
+
+        with self._lock:
+            pooled = not self._closed and self._created < self.pool_size
+            if pooled:
+                self._created += 1
+
+        try:
+            conn = self.factory()
+        except Exception:
+            if pooled:
+                with self._lock:
+                    self._created -= 1
+            raise
+        return PooledConnection(self, conn, pooled)
+
+    def release(self, conn: sqlite3.Connection, pooled: bool = True):
+        """Nhận lại kết nối; hủy giao dịch dở dang trước khi cho mượn tiếp"""
+        if not pooled or self._closed:
+            self._discard(conn, pooled)
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (sqlite3.Error, Full) as e:
+            self.logger.warning(f"Discarding pooled connection: {e}")
+            self._discard(conn, pooled)
+
+    def _discard(self, conn: sqlite3.Connection, pooled: bool):
+        """Đóng hẳn một kết nối"""
+        if pooled:
+            with self._lock:
+                self._created = max(self._created - 1, 0)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Đóng mọi kết nối rảnh; kết nối đang được mượn sẽ bị đóng khi trả về"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(conn, pooled=True)
+        self.logger.info("Connection pool closed")
+
+    def reopen(self):
+        """Cho phép giữ lại kết nối trở lại sau close_all()"""
+        with self._lock:
+            self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        """Pool đã đóng (close_all) và chưa reopen"""
+        return self._closed
+
+    @property
+    def idle_count(self) -> int:
+        """Số kết nối đang rảnh trong pool"""
+        return self._idle.qsize()
@@ -1,17 +1,202 @@
 # database/db_manager.py
 import sqlite3
 import datetime
+import json
 import logging
-from typing import List, Dict, Optional, Tuple
+import threading
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
+from .alert_state import ALERT_STATE_TYPES, build_alert_state, merge_alert_state
+from .change_bus import DataChange, DataChangeBus
+from .connection_pool import ConnectionPool
+from .migrations import run_migrations
+
+# Các bộ PRAGMA áp dụng khi mở kết nối
+PRAGMA_PROFILES = {
+    # Giữ nguyên mặc định của SQLite (rollback journal, synchronous=FULL)
+    "default": {},
+    # WAL + synchronous=NORMAL: mỗi lần ghi không còn fsync toàn bộ journal,
+    # vẫn an toàn trước lỗi ứng dụng (chỉ có thể mất giao dịch cuối khi mất điện).
+    # journal_mode=WAL được lưu vào file database (đổi định dạng trên đĩa, có
+    # thêm file -wal / -shm khi đang mở) nên chỉ dùng khi chủ động chọn.
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,        # ~16 MB page cache
+        "mmap_size": 134217728,      # 128 MB memory-mapped I/O
+        "temp_store": "MEMORY",
+    },
+}
+
+# Các loại bản ghi hỗ trợ phân trang theo keyset (xem get_records_page)
+# key: các cột xác định thứ tự duy nhất của bản ghi trong một user
+# key_sql: biểu thức SQL thay cho cột khóa có thể NULL (NULL làm phép so sánh
+#          keyset luôn sai nên bản ghi bị bỏ sót); NULL được coi là ''
+PAGED_RECORD_TYPES = {
+    "weight": {
+        "table": "weight_records",
+        "key": ("record_date",),
+        "columns": ("record_id", "record_date", "weight", "bmi", "notes"),
+    },
+    "heart_rate": {
+        "table": "heart_rate_records",
+        "key": ("record_date", "record_time", "heart_rate_id"),
+        "key_sql": {"record_time": "COALESCE(record_time, '')"},
+        "columns": ("heart_rate_id", "user_id", "record_date", "record_time",
+                    "bpm", "activity_type", "notes"),
+    },
+}
+
+# Truy vấn lịch sử theo khoảng ngày (xem _get_history)
+# id: cột khóa chính (dùng cho sửa / xóa theo id)
+# fields: tên khóa trả về -> cột SQL; default: các khóa trả về khi không chọn cột
+HISTORY_QUERIES = {
+    "weight": {
+        "table": "weight_records",
+        "id": "record_id",
+        "date_column": "record_date",
+        "order": "record_date DESC",
+        "fields": {"record_id": "record_id", "date": "record_date", "weight": "weight",
+                   "bmi": "bmi", "notes": "notes"},
+        "default": ("date", "weight", "bmi", "notes"),
+    },
+    "activity": {
+        "table": "activities",
+        "id": "activity_id",
+        "date_column": "activity_date",
+        "order": "activity_date DESC",
+        "fields": {"activity_id": "activity_id", "date": "activity_date",
+                   "activity_type": "activity_type", "duration": "duration",
+                   "calories_burned": "calories_burned", "intensity": "intensity",
+                   "notes": "notes"},
+        "default": ("date", "activity_type", "duration", "calories_burned", "intensity", "notes"),
+    },
+    "sleep": {
+        "table": "sleep_records",
+        "id": "sleep_id",
+        "date_column": "record_date",
+        "order": "record_date DESC",
+        "fields": {"sleep_id": "sleep_id", "user_id": "user_id", "record_date": "record_date",
+                   "sleep_hours": "sleep_hours", "sleep_quality": "sleep_quality",
+                   "notes": "notes"},
+        "default": ("sleep_id", "user_id", "record_date", "sleep_hours", "sleep_quality", "notes"),
+    },
+    "heart_rate": {
+        "table": "heart_rate_records",
+        "id": "heart_rate_id",
+        "date_column": "record_date",
+        "order": "record_date DESC, record_time DESC",
+        "fields": {"heart_rate_id": "heart_rate_id", "user_id": "user_id",
+                   "record_date": "record_date", "record_time": "record_time", "bpm": "bpm",
+                   "activity_type": "activity_type", "notes": "notes"},
+        "default": ("heart_rate_id", "user_id", "record_date", "record_time", "bpm",
+                    "activity_type", "notes"),
+    },
+}
+
+# Số id tối đa trong một câu DELETE ... IN (...) (giới hạn số tham số của SQLite)
+DELETE_CHUNK_SIZE = 500
+
+# Hoạt động của bản ghi nhịp tim tổng hợp từ thiết bị (xem add_heart_rate_samples)
+DEVICE_ACTIVITY = "Thiết bị"
+
+# Cột giá trị mặc định khi gộp theo khoảng thời gian (xem get_aggregated_series)
+AGGREGATE_VALUES = {
+    "weight": "weight",
+    "activity": "duration",
+    "sleep": "sleep_hours",
+    "heart_rate": "bpm",
+}
+
+# Biểu thức SQL đưa ngày về ngày đầu của nhóm (tuần bắt đầu từ thứ Hai)
+AGGREGATE_BUCKETS = {
+    "day": "{column}",
+    "week": "date({column}, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', {column})",
+}
 
 class DatabaseManager:
-    def __init__(self, db_name: str = "health_app.db"):
+    def __init__(self, db_name: str = "health_app.db", pool_size: int = 5,
+                 profile: Union[str, Dict] = "default"):
+        """
+        Args:
+            db_name: Đường dẫn file SQLite
+            pool_size: Số kết nối giữ lại để dùng lại (0 = mở kết nối mới mỗi truy vấn)
+            profile: Tên bộ PRAGMA trong PRAGMA_PROFILES hoặc dict PRAGMA tùy chỉnh
+        """
+        if isinstance(profile, str):
+            if profile not in PRAGMA_PROFILES:
+                raise ValueError(f"Unknown database profile: {profile}")
+            profile = PRAGMA_PROFILES[profile]
+        
         self.db_name = db_name
+        self.pool_size = pool_size
+        self.pragmas = dict(profile)
         self.logger = logging.getLogger(__name__)
+        self._pool = ConnectionPool(self._create_connection, pool_size) if pool_size > 0 else None
+        
+        # Phiên bản dữ liệu theo (user_id, loại bản ghi), tăng sau mỗi lần ghi
+        self._data_versions: Dict[Tuple[int, str], int] = {}
+        self._versions_lock = threading.Lock()
+        
+        # Thông báo thay đổi dữ liệu cho giao diện (xem _notify_change)
+        self.changes = DataChangeBus()
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """Mở một kết nối sqlite3 mới và áp dụng bộ PRAGMA đã chọn"""
+        conn = sqlite3.connect(self.db_name, check_same_thread=self._pool is None)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
     
     def get_connection(self):
-        """Tạo kết nối đến database"""
-        return sqlite3.connect(self.db_name)
+        """Lấy kết nối đến database (mượn từ pool nếu bật chế độ pool)"""
+        if self._pool is not None:
+            return self._pool.acquire()
+        return self._create_connection()
+    
+    def close(self):
+        """Đóng các kết nối đang giữ trong pool"""
+        if self._pool is not None:
+            self._pool.close_all()
+    
+    def reopen(self):
+        """Dùng lại pool sau close() (vd: đăng nhập lại sau khi đăng xuất)"""
+        if self._pool is not None:
+            self._pool.reopen()
+    
+    def get_data_version(self, user_id: int, record_type: str) -> int:
+        """
+        Phiên bản dữ liệu của một loại bản ghi ('weight', 'activity', 'sleep', 'heart_rate')
+        
+        Giá trị tăng mỗi khi có ghi thành công, dùng làm khóa cache cho các
+        kết quả tính từ dữ liệu (vd: biểu đồ).
+        """
+        with self._versions_lock:
+            return self._data_versions.get((user_id, record_type), 0)
+    
+    def get_data_versions(self, user_id: int, record_types: Iterable[str]) -> Tuple[int, ...]:
+        """Phiên bản dữ liệu của nhiều loại bản ghi"""
+        with self._versions_lock:
+            return tuple(self._data_versions.get((user_id, t), 0) for t in record_types)
+    
+    def _bump_data_version(self, user_id: int, record_type: str):
+        """Đánh dấu dữ liệu của một loại bản ghi đã thay đổi"""
+        with self._versions_lock:
+            key = (user_id, record_type)
+            self._data_versions[key] = self._data_versions.get(key, 0) + 1
+    
+    def _notify_change(self, user_id: int, record_type: str, dates: Iterable[str] = None):
+        """
+        Tăng phiên bản dữ liệu và phát DataChange sau một lần ghi đã commit
+        
+        Args:
+            dates: Các ngày bị ảnh hưởng (None = không rõ, vd: xóa theo id)
+        """
+        self._bump_data_version(user_id, record_type)
+        dates = [d for d in dates if d] if dates is not None else []
+        self.changes.publish(DataChange(user_id, record_type,
+                                        min(dates) if dates else None,
+                                        max(dates) if dates else None))
     
     def init_database(self):
         """Khởi tạo database và các bảng"""
@@ -110,7 +295,10 @@ class DatabaseManager:
             ''')
             
             conn.commit()
-            self.logger.info("Database initialized successfully")
+            
+            # Nâng cấp schema (index, bảng mới) cho database cũ
+            version = run_migrations(conn)
+            self.logger.info(f"Database initialized successfully (schema v{version})")
             
         except Exception as e:
             self.logger.error(f"Error initializing database: {e}")
@@ -229,6 +417,30 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def get_users(self, user_ids: Iterable[int] = None) -> List[Dict]:
+        """Lấy danh sách user (không kèm mật khẩu), mặc định là tất cả"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            sql = 'SELECT user_id, username, full_name, height FROM users'
+            params = []
+            if user_ids is not None:
+                params = list(user_ids)
+                if not params:
+                    return []
+                sql += f' WHERE user_id IN ({", ".join("?" * len(params))})'
+            cursor.execute(sql + ' ORDER BY user_id', params)
+            
+            return [{'user_id': row[0], 'username': row[1], 'full_name': row[2], 'height': row[3]}
+                    for row in cursor.fetchall()]
+            
+        except Exception as e:
+            self.logger.error(f"Error getting users: {e}")
+            return []
+        finally:
+            conn.close()
+    
     # ========== WEIGHT RECORDS ==========
     
     def add_weight_record(self, user_id: int, weight: float, date: str = None, 
@@ -240,21 +452,25 @@ class DatabaseManager:
             if date is None:
                 date = datetime.datetime.now().strftime("%Y-%m-%d")
             
-            # Lấy chiều cao và tính BMI
-            height = self.get_user_height(user_id) / 100  # chuyển sang mét
-            bmi = BMICalculator.calculate_bmi(weight, height)
-            
             conn = self.get_connection()
             cursor = conn.cursor()
             
+            # Lấy chiều cao (dùng chung kết nối) và tính BMI
+            cursor.execute('SELECT height FROM users WHERE user_id = ?', (user_id,))
+            result = cursor.fetchone()
+            height = (result[0] if result else 170.0) / 100  # chuyển sang mét
+            bmi = BMICalculator.calculate_bmi(weight, height)
+            
             # Insert hoặc update record cho ngày đó
             cursor.execute('''
                 INSERT OR REPLACE INTO weight_records 
                 (user_id, record_date, weight, bmi, notes)
                 VALUES (?, ?, ?, ?, ?)
             ''', (user_id, date, weight, bmi, notes))
+            self._update_alert_state(conn, user_id, 'weight', (date, weight))
             
             conn.commit()
+            self._notify_change(user_id, 'weight', [date])
             self.logger.info(f"Weight record added: user={user_id}, weight={weight}, bmi={bmi}")
             return bmi
             
@@ -317,8 +533,10 @@ class DatabaseManager:
                 (user_id, activity_date, activity_type, duration, calories_burned, intensity, notes)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (user_id, date, activity_type, duration, calories_burned, intensity, notes))
+            self._update_alert_state(conn, user_id, 'activity', (date, duration))
             
             conn.commit()
+            self._notify_change(user_id, 'activity', [date])
             self.logger.info(f"Activity added: user={user_id}, type={activity_type}, duration={duration}")
             return True
             
@@ -362,34 +580,64 @@ class DatabaseManager:
             conn.close()
     
     def get_weekly_activity_minutes(self, user_id: int) -> int:
-        """Tính tổng thời gian hoạt động trong tuần"""
+        """Tính tổng thời gian hoạt động trong tuần (từ daily_summary)"""
+        return int(self.get_summary_stats(user_id, days=7)['activity_minutes'])
+    
+    # ========== HEALTH STATISTICS ==========
+    
+    def get_current_weight(self, user_id: int) -> Optional[float]:
+        """Lấy cân nặng hiện tại (mới nhất)"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT SUM(duration) 
-                FROM activities 
+                SELECT weight FROM weight_records 
                 WHERE user_id = ? 
-                AND activity_date >= date('now', '-7 days')
+                ORDER BY record_date DESC 
+                LIMIT 1
             ''', (user_id,))
             
             result = cursor.fetchone()
-            return int(result[0]) if result[0] else 0
+            return result[0] if result else None
             
         except Exception as e:
-            self.logger.error(f"Error calculating weekly activity: {e}")
-            return 0
+            self.logger.error(f"Error getting current weight: {e}")
+            return None
         finally:
             conn.close()
     
-    # ========== HEALTH STATISTICS ==========
-    
-    def get_current_weight(self, user_id: int) -> Optional[float]:
-        """Lấy cân nặng hiện tại (mới nhất)"""
+    def get_dashboard_snapshot(self, user_id: int) -> Dict:
+        """
+        Lấy toàn bộ số liệu cho dashboard trong một lần truy cập database
+        
+        Mọi truy vấn chạy trên cùng một kết nối và trong một giao dịch đọc,
+        nên các số liệu nhất quán với nhau.
+        
+        Returns:
+            Dict gồm current_weight, weekly_activity_minutes, recent_activities,
+            sleep_records, average_sleep, latest_heart_rate, average_heart_rate,
+            recent_heart_rates
+        """
+        from datetime import datetime, timedelta
+        week_start = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+        
+        snapshot = {
+            'current_weight': None,
+            'weekly_activity_minutes': 0,
+            'recent_activities': [],
+            'sleep_records': [],
+            'average_sleep': 0.0,
+            'latest_heart_rate': None,
+            'average_heart_rate': 0.0,
+            'recent_heart_rates': []
+        }
+        
+        conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            cursor.execute("BEGIN")
             
             cursor.execute('''
                 SELECT weight FROM weight_records 
@@ -397,15 +645,74 @@ class DatabaseManager:
                 ORDER BY record_date DESC 
                 LIMIT 1
             ''', (user_id,))
+            row = cursor.fetchone()
+            snapshot['current_weight'] = row[0] if row else None
             
-            result = cursor.fetchone()
-            return result[0] if result else None
+            cursor.execute('''
+                SELECT activity_date, activity_type, duration, calories_burned, intensity, notes
+                FROM activities 
+                WHERE user_id = ? 
+                AND activity_date >= date('now', '-7 days')
+                ORDER BY activity_date DESC
+            ''', (user_id,))
+            snapshot['recent_activities'] = [{
+                'date': row[0],
+                'activity_type': row[1],
+                'duration': row[2],
+                'calories_burned': row[3],
+                'intensity': row[4],
+                'notes': row[5]
+            } for row in cursor.fetchall()]
+            
+            cursor.execute('''
+                SELECT sleep_id, user_id, record_date, sleep_hours, sleep_quality, notes
+                FROM sleep_records
+                WHERE user_id = ? AND record_date >= ?
+                ORDER BY record_date DESC
+            ''', (user_id, week_start))
+            snapshot['sleep_records'] = [{
+                'sleep_id': row[0],
+                'user_id': row[1],
+                'record_date': row[2],
+                'sleep_hours': row[3],
+                'sleep_quality': row[4],
+                'notes': row[5]
+            } for row in cursor.fetchall()]
+            
+            # Tổng / trung bình tuần lấy từ daily_summary thay vì cộng từng bản ghi
+            stats = self._query_summary_stats(cursor, user_id, week_start)
+            snapshot['weekly_activity_minutes'] = int(stats['activity_minutes'])
+            snapshot['average_sleep'] = round(stats['average_sleep'], 1)
+            snapshot['average_heart_rate'] = round(stats['average_heart_rate'], 0)
+            
+            cursor.execute('''
+                SELECT heart_rate_id, user_id, record_date, record_time, bpm, activity_type, notes
+                FROM heart_rate_records
+                WHERE user_id = ?
+                ORDER BY record_date DESC, record_time DESC
+                LIMIT 5
+            ''', (user_id,))
+            heart_rates = [{
+                'heart_rate_id': row[0],
+                'user_id': row[1],
+                'record_date': row[2],
+                'record_time': row[3],
+                'bpm': row[4],
+                'activity_type': row[5],
+                'notes': row[6]
+            } for row in cursor.fetchall()]
+            snapshot['latest_heart_rate'] = heart_rates[0] if heart_rates else None
+            snapshot['recent_heart_rates'] = [hr for hr in heart_rates if hr['record_date'] >= week_start]
+            
+            conn.commit()
+            return snapshot
             
         except Exception as e:
-            self.logger.error(f"Error getting current weight: {e}")
-            return None
+            self.logger.error(f"Error getting dashboard snapshot: {e}")
+            return snapshot
         finally:
-            conn.close()
+            if conn:
+                conn.close()
     
     # ========== SLEEP RECORDS ==========
     
@@ -421,8 +728,10 @@ class DatabaseManager:
                 (user_id, record_date, sleep_hours, sleep_quality, notes)
                 VALUES (?, ?, ?, ?, ?)
             ''', (user_id, record_date, sleep_hours, sleep_quality, notes))
+            self._update_alert_state(conn, user_id, 'sleep', (record_date, sleep_hours, sleep_quality))
             
             conn.commit()
+            self._notify_change(user_id, 'sleep', [record_date])
             self.logger.info(f"Sleep record added for user {user_id}")
             return True
             
@@ -469,12 +778,8 @@ class DatabaseManager:
             conn.close()
     
     def get_average_sleep(self, user_id: int, days: int = 7) -> float:
-        """Lấy giờ ngủ trung bình trong N ngày"""
-        records = self.get_sleep_records(user_id, days)
-        if not records:
-            return 0.0
-        total_hours = sum(r['sleep_hours'] for r in records)
-        return round(total_hours / len(records), 1)
+        """Lấy giờ ngủ trung bình trong N ngày (từ daily_summary)"""
+        return round(self.get_summary_stats(user_id, days)['average_sleep'], 1)
     
     # ========== HEART RATE RECORDS ==========
     
@@ -490,8 +795,10 @@ class DatabaseManager:
                 (user_id, record_date, record_time, bpm, activity_type, notes)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (user_id, record_date, record_time, bpm, activity_type, notes))
+            self._update_alert_state(conn, user_id, 'heart_rate', (record_date, record_time, bpm, activity_type))
             
             conn.commit()
+            self._notify_change(user_id, 'heart_rate', [record_date])
             self.logger.info(f"Heart rate record added for user {user_id}")
             return True
             
@@ -572,40 +879,1015 @@ class DatabaseManager:
             conn.close()
     
     def get_average_heart_rate(self, user_id: int, days: int = 7) -> float:
-        """Lấy nhịp tim trung bình trong N ngày"""
-        records = self.get_heart_rate_records(user_id, days)
-        if not records:
-            return 0.0
-        total_bpm = sum(r['bpm'] for r in records)
-        return round(total_bpm / len(records), 0)
-    
-    def get_weight_history(self, user_id: int, from_date: str, to_date: str) -> List[Dict]:
-        """Lấy lịch sử cân nặng theo khoảng thời gian"""
+        """Lấy nhịp tim trung bình trong N ngày (từ daily_summary)"""
+        return round(self.get_summary_stats(user_id, days)['average_heart_rate'], 0)
+    
+    # ========== NHỊP TIM THEO GIÂY (THIẾT BỊ) ==========
+    
+    def add_heart_rate_samples(self, user_id: int, samples: List[Tuple[int, int]],
+                               store_samples: bool = True, store_minutes: bool = True) -> int:
+        """
+        Ghi một lô mẫu nhịp tim theo giây trong một giao dịch
+        
+        Mẫu trùng thời điểm với mẫu đã lưu bị bỏ qua. Tổng hợp theo phút của
+        các phút trong lô được tính lại từ bảng mẫu, nên ghi lại một lô không
+        làm sai tổng hợp; khi không lưu mẫu thô thì lô được cộng dồn thẳng vào
+        tổng hợp phút.
+        
+        Mỗi phút có tổng hợp được đưa vào heart_rate_records (một bản ghi
+        mỗi phút, bpm trung bình, hoạt động DEVICE_ACTIVITY), nên dữ liệu từ
+        thiết bị hiện trong lịch sử, biểu đồ, daily_summary và cảnh báo như bản
+        ghi nhập tay; mỗi lô phát một DataChange 'heart_rate'. Với
+        store_minutes=False chỉ mẫu thô được lưu và không có bản ghi nào.
+        
+        Args:
+            user_id: ID người dùng
+            samples: Các cặp (Unix timestamp giây, bpm) đã kiểm tra hợp lệ
+            store_samples: Lưu mẫu thô vào heart_rate_samples
+            store_minutes: Lưu tổng hợp theo phút vào heart_rate_minutes
+            
+        Returns:
+            Số mẫu đã lưu (mẫu mới, hoặc mẫu được cộng vào tổng hợp phút); 0 nếu lỗi
+        """
+        if not samples or not (store_samples or store_minutes):
+            return 0
+        
+        conn = None
+        try:
+            conn = self.get_connection()
+            first = min(t for t, _ in samples)
+            last = max(t for t, _ in samples)
+            
+            if store_samples:
+                cursor = conn.executemany('''
+                    INSERT OR IGNORE INTO heart_rate_samples (user_id, sample_time, bpm)
+                    VALUES (?, ?, ?)
+                ''', [(user_id, t, bpm) for t, bpm in samples])
+                saved = cursor.rowcount
+                if store_minutes and saved:
+                    conn.execute('''
+                        INSERT INTO heart_rate_minutes
+                        (user_id, minute_start, bpm_min, bpm_max, bpm_sum, sample_count)
+                        SELECT user_id, sample_time / 60 * 60, MIN(bpm), MAX(bpm), SUM(bpm), COUNT(*)
+                        FROM heart_rate_samples
+                        WHERE user_id = ? AND sample_time BETWEEN ? AND ?
+                        GROUP BY sample_time / 60
+                        ON CONFLICT (user_id, minute_start) DO UPDATE SET
+                            bpm_min = excluded.bpm_min, bpm_max = excluded.bpm_max,
+                            bpm_sum = excluded.bpm_sum, sample_count = excluded.sample_count
+                    ''', (user_id, first - first % 60, last - last % 60 + 59))
+            else:
+                minutes = {}
+                for t, bpm in samples:
+                    minute = minutes.get(t - t % 60)
+                    if minute is None:
+                        minutes[t - t % 60] = [bpm, bpm, bpm, 1]
+                    else:
+                        minute[0] = min(minute[0], bpm)
+                        minute[1] = max(minute[1], bpm)
+                        minute[2] += bpm
+                        minute[3] += 1
+                conn.executemany('''
+                    INSERT INTO heart_rate_minutes
+                    (user_id, minute_start, bpm_min, bpm_max, bpm_sum, sample_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, minute_start) DO UPDATE SET
+                        bpm_min = MIN(bpm_min, excluded.bpm_min), bpm_max = MAX(bpm_max, excluded.bpm_max),
+                        bpm_sum = bpm_sum + excluded.bpm_sum, sample_count = sample_count + excluded.sample_count
+                ''', [(user_id, start, *values) for start, values in minutes.items()])
+                saved = len(samples)
+            
+            dates = []
+            if store_minutes and saved:
+                dates = self._roll_up_heart_rate_minutes(conn, user_id, first - first % 60, last)
+            
+            conn.commit()
+            if dates:
+                self._rebuild_alert_state(conn, user_id, 'heart_rate')
+                self._notify_change(user_id, 'heart_rate', dates)
+            return saved
+            
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Error adding heart rate samples: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    @staticmethod
+    def _roll_up_heart_rate_minutes(conn, user_id: int, start: int, end: int) -> List[str]:
+        """
+        Ghi tổng hợp các phút trong [start, end] vào heart_rate_records (caller commit)
+        
+        Phút đã có bản ghi (heart_rate_minute_records) được cập nhật bpm;
+        phút mới, hoặc phút có bản ghi đã bị người dùng xóa, được thêm bản ghi mới.
+        daily_summary được trigger của heart_rate_records cập nhật.
+        
+        Returns:
+            Các ngày (YYYY-MM-DD, giờ địa phương) bị ảnh hưởng
+        """
+        rows = conn.execute('''
+            SELECT m.minute_start, CAST(ROUND(m.bpm_sum * 1.0 / m.sample_count) AS INTEGER), r.heart_rate_id
+            FROM heart_rate_minutes m
+            LEFT JOIN heart_rate_minute_records r
+                ON r.user_id = m.user_id AND r.minute_start = m.minute_start
+            WHERE m.user_id = ? AND m.minute_start BETWEEN ? AND ?
+        ''', (user_id, start, end)).fetchall()
+        
+        dates = set()
+        for minute_start, bpm, record_id in rows:
+            moment = datetime.datetime.fromtimestamp(minute_start)
+            if record_id is not None:
+                row = conn.execute('SELECT bpm FROM heart_rate_records WHERE heart_rate_id = ?',
+                                   (record_id,)).fetchone()
+                if row is None:
+                    record_id = None  # bản ghi đã bị xóa
+                elif row[0] == bpm:
+                    continue
+                else:
+                    conn.execute('UPDATE heart_rate_records SET bpm = ? WHERE heart_rate_id = ?',
+                                 (bpm, record_id))
+            if record_id is None:
+                record_id = conn.execute('''
+                    INSERT INTO heart_rate_records
+                    (user_id, record_date, record_time, bpm, activity_type, notes)
+                    VALUES (?, ?, ?, ?, ?, '')
+                ''', (user_id, moment.strftime("%Y-%m-%d"), moment.strftime("%H:%M"), bpm,
+                      DEVICE_ACTIVITY)).lastrowid
+                conn.execute('''
+                    INSERT OR REPLACE INTO heart_rate_minute_records (user_id, minute_start, heart_rate_id)
+                    VALUES (?, ?, ?)
+                ''', (user_id, minute_start, record_id))
+            dates.add(moment.strftime("%Y-%m-%d"))
+        return sorted(dates)
+    
+    def get_heart_rate_samples(self, user_id: int, start_time: int, end_time: int) -> List[Tuple[int, int]]:
+        """Lấy các mẫu (timestamp, bpm) trong khoảng [start_time, end_time] (Unix timestamp giây)"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            return conn.execute('''
+                SELECT sample_time, bpm FROM heart_rate_samples
+                WHERE user_id = ? AND sample_time BETWEEN ? AND ?
+                ORDER BY sample_time
+            ''', (user_id, start_time, end_time)).fetchall()
+        
+        except Exception as e:
+            self.logger.error(f"Error getting heart rate samples: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+    
+    def get_heart_rate_minutes(self, user_id: int, from_date: str, to_date: str) -> List[Dict]:
+        """
+        Lấy tổng hợp nhịp tim theo phút trong các ngày [from_date, to_date] (giờ địa phương)
+        
+        Returns:
+            List dict gồm minute ('YYYY-MM-DD HH:MM'), minute_start (timestamp),
+            bpm_min, bpm_avg, bpm_max, sample_count; phút cũ trước
+        """
+        conn = None
+        try:
+            start = int(datetime.datetime.strptime(from_date, "%Y-%m-%d").timestamp())
+            end = int((datetime.datetime.strptime(to_date, "%Y-%m-%d")
+                       + datetime.timedelta(days=1)).timestamp()) - 1
+            
+            conn = self.get_connection()
+            rows = conn.execute('''
+                SELECT strftime('%Y-%m-%d %H:%M', minute_start, 'unixepoch', 'localtime'),
+                       minute_start, bpm_min, bpm_sum, bpm_max, sample_count
+                FROM heart_rate_minutes
+                WHERE user_id = ? AND minute_start BETWEEN ? AND ?
+                ORDER BY minute_start
+            ''', (user_id, start, end)).fetchall()
+            
+            return [{
+                'minute': row[0],
+                'minute_start': row[1],
+                'bpm_min': row[2],
+                'bpm_avg': row[3] / row[5],
+                'bpm_max': row[4],
+                'sample_count': row[5]
+            } for row in rows]
+        
+        except Exception as e:
+            self.logger.error(f"Error getting heart rate minutes: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+    
+    # ========== DAILY SUMMARY ==========
+    
+    @classmethod
+    def _query_summary_stats(cls, cursor, user_id: int, start_date: str) -> Dict:
+        """Tổng hợp các dòng daily_summary từ start_date (mỗi ngày một dòng)"""
+        cursor.execute('''
+            SELECT AVG(weight), SUM(activity_minutes), SUM(calories),
+                   AVG(sleep_hours), COUNT(sleep_hours),
+                   MIN(hr_min), MAX(hr_max), SUM(hr_sum), SUM(hr_count)
+            FROM daily_summary
+            WHERE user_id = ? AND summary_date >= ?
+        ''', (user_id, start_date))
+        return cls._summary_stats_from_row(cursor.fetchone())
+    
+    @staticmethod
+    def _summary_stats_from_row(row: tuple) -> Dict:
+        return {
+            'average_weight': row[0],
+            'activity_minutes': row[1] or 0,
+            'calories_burned': row[2] or 0.0,
+            'average_sleep': row[3] or 0.0,
+            'sleep_days': row[4] or 0,
+            'min_heart_rate': row[5],
+            'max_heart_rate': row[6],
+            'average_heart_rate': row[7] / row[8] if row[8] else 0.0,
+            'heart_rate_count': row[8] or 0
+        }
+    
+    def get_summary_stats(self, user_id: int, days: int = 7) -> Dict:
+        """
+        Số liệu tổng hợp N ngày gần nhất từ bảng daily_summary
+        
+        Bảng được trigger cập nhật khi ghi / xóa bản ghi, nên chi phí chỉ phụ
+        thuộc số ngày (N dòng theo khóa chính), không phụ thuộc số bản ghi.
+        
+        Returns:
+            Dict gồm average_weight, activity_minutes, calories_burned,
+            average_sleep, sleep_days, min_heart_rate, max_heart_rate,
+            average_heart_rate, heart_rate_count
+        """
+        start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d")
+        try:
+            conn = self.get_connection()
+            return self._query_summary_stats(conn.cursor(), user_id, start_date)
+            
+        except Exception as e:
+            self.logger.error(f"Error getting summary stats: {e}")
+            return self._summary_stats_from_row((None,) * 9)
+        finally:
+            conn.close()
+    
+    def get_daily_summary(self, user_id: int, from_date: str, to_date: str) -> List[Dict]:
+        """
+        Lấy các dòng tổng hợp theo ngày trong khoảng [from_date, to_date], ngày cũ trước
+        
+        Returns:
+            List dict gồm date, weight, bmi, activity_minutes, calories,
+            sleep_hours, hr_min, hr_avg, hr_max, hr_count
+        """
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT record_date, weight, bmi, notes
-                FROM weight_records 
-                WHERE user_id = ? 
-                AND record_date BETWEEN ? AND ?
-                ORDER BY record_date DESC
+                SELECT summary_date, weight, bmi, activity_minutes, calories, sleep_hours,
+                       hr_min, hr_sum, hr_max, hr_count
+                FROM daily_summary
+                WHERE user_id = ? AND summary_date BETWEEN ? AND ?
+                ORDER BY summary_date
             ''', (user_id, from_date, to_date))
             
-            records = []
-            for row in cursor.fetchall():
-                records.append({
-                    'date': row[0],
-                    'weight': row[1],
-                    'bmi': row[2],
-                    'notes': row[3]
-                })
+            return [{
+                'date': row[0],
+                'weight': row[1],
+                'bmi': row[2],
+                'activity_minutes': row[3],
+                'calories': row[4],
+                'sleep_hours': row[5],
+                'hr_min': row[6],
+                'hr_avg': row[7] / row[9] if row[9] else None,
+                'hr_max': row[8],
+                'hr_count': row[9] or 0
+            } for row in cursor.fetchall()]
+            
+        except Exception as e:
+            self.logger.error(f"Error getting daily summary: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def get_weight_history(self, user_id: int, from_date: str, to_date: str,
+                           limit: int = None, columns: Iterable[str] = None) -> List[Dict]:
+        """Lấy lịch sử cân nặng theo khoảng thời gian"""
+        return self._get_history('weight', user_id, from_date, to_date, limit, columns)
+    
+    def get_activity_history(self, user_id: int, from_date: str, to_date: str,
+                             limit: int = None, columns: Iterable[str] = None) -> List[Dict]:
+        """Lấy lịch sử hoạt động theo khoảng thời gian"""
+        return self._get_history('activity', user_id, from_date, to_date, limit, columns)
+    
+    def get_sleep_history(self, user_id: int, from_date: str, to_date: str,
+                          limit: int = None, columns: Iterable[str] = None) -> List[Dict]:
+        """Lấy lịch sử giấc ngủ theo khoảng thời gian"""
+        return self._get_history('sleep', user_id, from_date, to_date, limit, columns)
+    
+    def get_heart_rate_history(self, user_id: int, from_date: str, to_date: str,
+                               limit: int = None, columns: Iterable[str] = None) -> List[Dict]:
+        """Lấy lịch sử nhịp tim theo khoảng thời gian"""
+        return self._get_history('heart_rate', user_id, from_date, to_date, limit, columns)
+    
+    def _get_history(self, record_type: str, user_id: int, from_date: str, to_date: str,
+                     limit: int = None, columns: Iterable[str] = None) -> List[Dict]:
+        """
+        Lấy bản ghi trong khoảng ngày [from_date, to_date], mới nhất trước
+        
+        Việc lọc ngày, giới hạn số dòng và chọn cột đều do SQLite thực hiện,
+        chỉ các dòng/cột được yêu cầu mới được đọc ra.
+        
+        Args:
+            record_type: Khóa trong HISTORY_QUERIES
+            user_id: ID người dùng
+            from_date, to_date: Khoảng ngày (YYYY-MM-DD), tính cả hai đầu
+            limit: Số bản ghi tối đa (None = không giới hạn)
+            columns: Các khóa cần lấy (mặc định như các hàm get_* tương ứng)
+            
+        Returns:
+            Danh sách bản ghi dạng dict
+        """
+        spec = HISTORY_QUERIES[record_type]
+        keys = tuple(columns) if columns else spec['default']
+        unknown = [key for key in keys if key not in spec['fields']]
+        if unknown:
+            raise ValueError(f"Unknown {record_type} columns: {', '.join(unknown)}")
+        
+        select_sql = ', '.join(spec['fields'][key] for key in keys)
+        params = [user_id, from_date, to_date]
+        limit_sql = ''
+        if limit is not None:
+            limit_sql = 'LIMIT ?'
+            params.append(limit)
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
             
+            cursor.execute(f'''
+                SELECT {select_sql}
+                FROM {spec['table']}
+                WHERE user_id = ?
+                AND {spec['date_column']} BETWEEN ? AND ?
+                ORDER BY {spec['order']}
+                {limit_sql}
+            ''', params)
+            
+            return [dict(zip(keys, row)) for row in cursor.fetchall()]
+            
+        except Exception as e:
+            self.logger.error(f"Error getting {record_type} history: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def iter_records(self, record_type: str, user_id: int, from_date: str = None,
+                     to_date: str = None, columns: Iterable[str] = None,
+                     batch_size: int = 500) -> Iterator[Dict]:
+        """
+        Duyệt bản ghi theo từng lô bằng fetchmany, mới nhất trước
+        
+        Chỉ một lô batch_size dòng nằm trong bộ nhớ tại một thời điểm nên dùng
+        được cho toàn bộ lịch sử (vd: xuất file). Kết nối được giữ cho tới khi
+        duyệt xong hoặc generator bị đóng; lỗi database được ném ra cho nơi gọi.
+        
+        Args:
+            record_type: Khóa trong HISTORY_QUERIES
+            user_id: ID người dùng
+            from_date, to_date: Khoảng ngày (YYYY-MM-DD), None = không giới hạn
+            columns: Các khóa cần lấy (mặc định như _get_history)
+            batch_size: Số dòng mỗi lần fetchmany
+        """
+        spec = HISTORY_QUERIES[record_type]
+        keys = tuple(columns) if columns else spec['default']
+        unknown = [key for key in keys if key not in spec['fields']]
+        if unknown:
+            raise ValueError(f"Unknown {record_type} columns: {', '.join(unknown)}")
+        
+        conditions = ['user_id = ?']
+        params = [user_id]
+        if from_date:
+            conditions.append(f"{spec['date_column']} >= ?")
+            params.append(from_date)
+        if to_date:
+            conditions.append(f"{spec['date_column']} <= ?")
+            params.append(to_date)
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(spec['fields'][key] for key in keys)}
+                FROM {spec['table']}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {spec['order']}
+            ''', params)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(keys, row))
+        finally:
+            conn.close()
+    
+    # ========== TỔNG HỢP ==========
+    
+    def get_aggregated_series(self, record_type: str, user_id: int, from_date: str,
+                              to_date: str = None, bucket: str = "day",
+                              value: str = None) -> List[Dict]:
+        """
+        Gộp bản ghi theo ngày/tuần/tháng ngay trong SQLite
+        
+        Args:
+            record_type: Khóa trong HISTORY_QUERIES
+            user_id: ID người dùng
+            from_date, to_date: Khoảng ngày (YYYY-MM-DD), to_date bỏ trống = tới nay
+            bucket: 'day', 'week' hoặc 'month'
+            value: Khóa cột cần gộp (mặc định theo AGGREGATE_VALUES)
+            
+        Returns:
+            Danh sách nhóm theo thứ tự thời gian tăng dần, mỗi nhóm gồm
+            'date' (ngày đầu nhóm), 'count', 'min', 'avg', 'max', 'sum'
+        """
+        spec = HISTORY_QUERIES[record_type]
+        if bucket not in AGGREGATE_BUCKETS:
+            raise ValueError(f"Unknown aggregate bucket: {bucket}")
+        value = value or AGGREGATE_VALUES[record_type]
+        if value not in spec['fields']:
+            raise ValueError(f"Unknown {record_type} column: {value}")
+        
+        date_column = spec['date_column']
+        bucket_sql = AGGREGATE_BUCKETS[bucket].format(column=date_column)
+        value_sql = spec['fields'][value]
+        
+        conditions = ['user_id = ?', f'{date_column} >= ?']
+        params = [user_id, from_date]
+        if to_date:
+            conditions.append(f'{date_column} <= ?')
+            params.append(to_date)
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT {bucket_sql} AS bucket, COUNT({value_sql}), MIN({value_sql}),
+                       AVG({value_sql}), MAX({value_sql}), SUM({value_sql})
+                FROM {spec['table']}
+                WHERE {' AND '.join(conditions)}
+                GROUP BY bucket
+                ORDER BY bucket
+            ''', params)
+            
+            return [{
+                'date': row[0],
+                'count': row[1],
+                'min': row[2],
+                'avg': row[3],
+                'max': row[4],
+                'sum': row[5]
+            } for row in cursor.fetchall()]
+            
+        except Exception as e:
+            self.logger.error(f"Error aggregating {record_type}: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def get_activity_totals_by_type(self, user_id: int, from_date: str,
+                                    to_date: str = None) -> List[Dict]:
+        """Tổng số lần, thời gian và calories theo loại hoạt động"""
+        conditions = ['user_id = ?', 'activity_date >= ?']
+        params = [user_id, from_date]
+        if to_date:
+            conditions.append('activity_date <= ?')
+            params.append(to_date)
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT activity_type, COUNT(*), SUM(duration), SUM(calories_burned)
+                FROM activities
+                WHERE {' AND '.join(conditions)}
+                GROUP BY activity_type
+                ORDER BY SUM(duration) DESC
+            ''', params)
+            
+            return [{
+                'activity_type': row[0],
+                'count': row[1],
+                'duration': row[2] or 0,
+                'calories_burned': row[3] or 0
+            } for row in cursor.fetchall()]
+            
+        except Exception as e:
+            self.logger.error(f"Error getting activity totals: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def has_records(self, user_id: int, record_types: Iterable[str] = None, days: int = None) -> bool:
+        """
+        Kiểm tra nhanh user có bản ghi nào không (EXISTS, không đọc dữ liệu)
+        
+        Args:
+            user_id: ID người dùng
+            record_types: Các khóa trong HISTORY_QUERIES (mặc định: tất cả)
+            days: Chỉ xét N ngày gần nhất (None = toàn bộ)
+        """
+        record_types = list(record_types) if record_types is not None else list(HISTORY_QUERIES)
+        if not record_types:
+            return False
+        
+        start_date = None
+        if days is not None:
+            start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d")
+        
+        probes, params = [], []
+        for record_type in record_types:
+            spec = HISTORY_QUERIES[record_type]
+            condition = 'user_id = ?'
+            params.append(user_id)
+            if start_date:
+                condition += f" AND {spec['date_column']} >= ?"
+                params.append(start_date)
+            probes.append(f"EXISTS (SELECT 1 FROM {spec['table']} WHERE {condition})")
+        
+        try:
+            conn = self.get_connection()
+            row = conn.execute(f"SELECT {' OR '.join(probes)}", params).fetchone()
+            return bool(row[0])
+            
+        except Exception as e:
+            self.logger.error(f"Error probing records: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    # ========== PHÂN TRANG ==========
+    
+    def get_records_page(self, record_type: str, user_id: int, from_date: str = None,
+                         to_date: str = None, after: Tuple = None, before: Tuple = None,
+                         limit: int = 200) -> List[Dict]:
+        """
+        Lấy một trang bản ghi, mới nhất trước, theo keyset pagination
+        
+        Trang kế tiếp được xác định bằng khóa của bản ghi cuối trang trước
+        thay vì OFFSET, nên chi phí mỗi trang không phụ thuộc vị trí trang.
+        
+        Args:
+            record_type: Khóa trong PAGED_RECORD_TYPES ('weight', 'heart_rate')
+            user_id: ID người dùng
+            from_date, to_date: Khoảng ngày (YYYY-MM-DD), bỏ trống = không giới hạn
+            after: Khóa bản ghi; lấy các bản ghi cũ hơn khóa này
+            before: Khóa bản ghi; lấy các bản ghi mới hơn khóa này
+            limit: Số bản ghi tối đa của trang
+            
+        Returns:
+            Danh sách bản ghi (dict theo tên cột), sắp xếp mới nhất trước
+        """
+        spec = PAGED_RECORD_TYPES[record_type]
+        key_columns = [spec.get('key_sql', {}).get(column, column) for column in spec['key']]
+        key_sql = ', '.join(key_columns)
+        key_params = ', '.join('?' * len(key_columns))
+        
+        conditions = ['user_id = ?']
+        params = [user_id]
+        if from_date:
+            conditions.append('record_date >= ?')
+            params.append(from_date)
+        if to_date:
+            conditions.append('record_date <= ?')
+            params.append(to_date)
+        
+        direction = 'DESC'
+        if after is not None:
+            conditions.append(f'({key_sql}) < ({key_params})')
+            params.extend(after)
+        elif before is not None:
+            conditions.append(f'({key_sql}) > ({key_params})')
+            params.extend(before)
+            direction = 'ASC'
+        params.append(limit)
+        
+        order_sql = ', '.join(f'{column} {direction}' for column in key_columns)
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT {', '.join(spec['columns'])}
+                FROM {spec['table']}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {order_sql}
+                LIMIT ?
+            ''', params)
+            
+            records = [dict(zip(spec['columns'], row)) for row in cursor.fetchall()]
+            if before is not None:
+                records.reverse()
             return records
             
         except Exception as e:
-            self.logger.error(f"Error getting weight history: {e}")
+            self.logger.error(f"Error getting {record_type} page: {e}")
             return []
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+    
+    @staticmethod
+    def get_record_key(record_type: str, record: Dict) -> Tuple:
+        """Khóa keyset của một bản ghi trả về từ get_records_page"""
+        spec = PAGED_RECORD_TYPES[record_type]
+        nullable = spec.get('key_sql', {})
+        return tuple('' if record[column] is None and column in nullable else record[column]
+                     for column in spec['key'])
+    
+    # ========== SỬA / XÓA THEO ID ==========
+    
+    def delete_records(self, record_type: str, user_id: int, record_ids: Iterable[int]) -> int:
+        """
+        Xóa nhiều bản ghi theo khóa chính trong một giao dịch
+        
+        Chỉ xóa bản ghi thuộc user_id. daily_summary được trigger cập nhật,
+        trạng thái cảnh báo được dựng lại trong cùng giao dịch.
+        
+        Args:
+            record_type: Khóa trong HISTORY_QUERIES
+            user_id: ID người dùng
+            record_ids: Khóa chính (record_id, activity_id, sleep_id, heart_rate_id)
+            
+        Returns:
+            Số bản ghi đã xóa (0 nếu lỗi)
+        """
+        spec = HISTORY_QUERIES[record_type]
+        ids = list(dict.fromkeys(int(record_id) for record_id in record_ids))
+        if not ids:
+            return 0
+        
+        conn = None
+        try:
+            conn = self.get_connection()
+            deleted = 0
+            for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+                chunk = ids[start:start + DELETE_CHUNK_SIZE]
+                cursor = conn.execute(f'''
+                    DELETE FROM {spec['table']}
+                    WHERE user_id = ? AND {spec['id']} IN ({', '.join('?' * len(chunk))})
+                ''', [user_id, *chunk])
+                deleted += cursor.rowcount
+            
+            if deleted:
+                self._update_alert_state(conn, user_id, record_type)
+            conn.commit()
+            if deleted:
+                self._notify_change(user_id, record_type)
+            self.logger.info(f"Deleted {deleted} {record_type} records for user {user_id}")
+            return deleted
+            
+        except Exception as e:
+            self.logger.error(f"Error deleting {record_type} records: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def delete_record(self, record_type: str, user_id: int, record_id: int) -> bool:
+        """Xóa một bản ghi theo khóa chính"""
+        return self.delete_records(record_type, user_id, [record_id]) == 1
+    
+    def update_record(self, record_type: str, user_id: int, record_id: int, changes: Dict) -> bool:
+        """
+        Sửa một bản ghi theo khóa chính
+        
+        Args:
+            record_type: Khóa trong HISTORY_QUERIES
+            user_id: ID người dùng
+            record_id: Khóa chính của bản ghi
+            changes: Khóa (như trong HISTORY_QUERIES[record_type]['fields']) -> giá trị mới;
+                sửa cân nặng mà không truyền 'bmi' thì BMI được tính lại
+            
+        Returns:
+            True nếu bản ghi được sửa (False: không tồn tại, trùng ngày hoặc lỗi)
+        """
+        spec = HISTORY_QUERIES[record_type]
+        changes = dict(changes)
+        invalid = [key for key in changes
+                   if key not in spec['fields'] or spec['fields'][key] in (spec['id'], 'user_id')]
+        if invalid or not changes:
+            raise ValueError(f"Cannot update {record_type} columns: {', '.join(invalid) or '(none)'}")
+        
+        conn = None
+        try:
+            conn = self.get_connection()
+            
+            if record_type == 'weight' and 'weight' in changes and 'bmi' not in changes:
+                from utils.bmi_calculator import BMICalculator
+                result = conn.execute('SELECT height FROM users WHERE user_id = ?', (user_id,)).fetchone()
+                height = (result[0] if result else 170.0) / 100
+                changes['bmi'] = BMICalculator.calculate_bmi(float(changes['weight']), height)
+            
+            assignments = ', '.join(f"{spec['fields'][key]} = ?" for key in changes)
+            cursor = conn.execute(f'''
+                UPDATE {spec['table']} SET {assignments}
+                WHERE user_id = ? AND {spec['id']} = ?
+            ''', [*changes.values(), user_id, record_id])
+            if cursor.rowcount == 0:
+                return False
+            
+            self._update_alert_state(conn, user_id, record_type)
+            conn.commit()
+            self._notify_change(user_id, record_type)
+            self.logger.info(f"Updated {record_type} record {record_id} for user {user_id}")
+            return True
+            
+        except sqlite3.IntegrityError as e:
+            self.logger.warning(f"Cannot update {record_type} record {record_id}: {e}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error updating {record_type} record: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
+    # ========== ALERT STATE ==========
+    
+    def _update_alert_state(self, conn, user_id: int, record_type: str, record: tuple = None) -> Dict:
+        """
+        Cập nhật trạng thái cảnh báo trong giao dịch đang mở (caller commit)
+        
+        Args:
+            conn: Kết nối đang ghi bản ghi
+            user_id: ID người dùng
+            record_type: Loại bản ghi
+            record: Bản ghi vừa ghi (xem merge_alert_state); None = dựng lại từ bảng
+            
+        Returns:
+            Trạng thái mới
+        """
+        state = None
+        if record is not None:
+            row = conn.execute('SELECT state FROM alert_state WHERE user_id = ? AND record_type = ?',
+                               (user_id, record_type)).fetchone()
+            if row:
+                state = merge_alert_state(record_type, json.loads(row[0]), record)
+        if state is None:
+            # Chưa có trạng thái (database cũ / sau bulk insert): dựng lại, đã gồm bản ghi vừa ghi
+            state = build_alert_state(conn, user_id, record_type)
+        
+        conn.execute('''
+            INSERT OR REPLACE INTO alert_state (user_id, record_type, state, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (user_id, record_type, json.dumps(state)))
+        return state
+    
+    def _rebuild_alert_state(self, conn, user_id: int, record_type: str):
+        """Dựng lại trạng thái cảnh báo sau khi ghi nhiều bản ghi (các bản ghi đã được commit)"""
+        try:
+            self._update_alert_state(conn, user_id, record_type)
+            conn.commit()
+        except Exception as e:
+            self.logger.warning(f"Error rebuilding alert state ({record_type}): {e}")
+            conn.rollback()
+            try:
+                # Bỏ trạng thái cũ để get_alert_state dựng lại lần sau
+                conn.execute('DELETE FROM alert_state WHERE user_id = ? AND record_type = ?',
+                             (user_id, record_type))
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+    
+    def get_alert_state(self, user_id: int) -> Optional[Dict[str, Dict]]:
+        """
+        Lấy trạng thái cửa sổ trượt của mọi loại bản ghi cho AlertSystem
+        
+        Một truy vấn theo khóa chính; loại nào chưa có trạng thái (database
+        cũ, dữ liệu ghi trực tiếp) được dựng lại và lưu ngay.
+        
+        Returns:
+            Dict loại bản ghi -> trạng thái (xem database.alert_state), None nếu lỗi
+        """
+        try:
+            conn = self.get_connection()
+            rows = conn.execute('SELECT record_type, state FROM alert_state WHERE user_id = ?',
+                                (user_id,)).fetchall()
+            states = {record_type: json.loads(state) for record_type, state in rows}
+            
+            missing = [t for t in ALERT_STATE_TYPES if t not in states]
+            for record_type in missing:
+                states[record_type] = self._update_alert_state(conn, user_id, record_type)
+            if missing:
+                conn.commit()
+            return states
+            
+        except Exception as e:
+            self.logger.error(f"Error getting alert state: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    # ========== BULK INSERT ==========
+    
+    def _executemany_outcomes(self, conn, sql: str, params: List[Optional[tuple]]) -> List[bool]:
+        """
+        Ghi nhiều dòng trong một giao dịch bằng executemany
+        
+        Dòng có params None (dữ liệu không hợp lệ) bị bỏ qua. Nếu executemany
+        lỗi ràng buộc, giao dịch được làm lại từng dòng để biết chính xác
+        dòng nào thất bại.
+        
+        Returns:
+            Kết quả (True/False) cho từng dòng theo đúng thứ tự đầu vào
+        """
+        outcomes = [p is not None for p in params]
+        valid = [p for p in params if p is not None]
+        if not valid:
+            return outcomes
+        
+        try:
+            conn.executemany(sql, valid)
+            conn.commit()
+            return outcomes
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            self.logger.warning(f"Bulk insert failed, retrying row by row: {e}")
+        
+        for i, row in enumerate(params):
+            if row is None:
+                continue
+            try:
+                conn.execute(sql, row)
+            except sqlite3.IntegrityError:
+                outcomes[i] = False
+        conn.commit()
+        return outcomes
+    
+    def add_weight_records_bulk(self, user_id: int, records: Iterable[Dict]) -> List[Optional[float]]:
+        """
+        Thêm nhiều bản ghi cân nặng trong một giao dịch
+        
+        Args:
+            user_id: ID người dùng
+            records: Các dict có khóa 'weight' và tùy chọn 'date', 'notes'
+            
+        Returns:
+            BMI của từng bản ghi đã lưu, None với bản ghi lỗi
+        """
+        from utils.bmi_calculator import BMICalculator
+        
+        records = list(records)
+        conn = None
+        try:
+            conn = self.get_connection()
+            
+            # Chỉ tra chiều cao một lần cho cả lô
+            result = conn.execute('SELECT height FROM users WHERE user_id = ?', (user_id,)).fetchone()
+            height = (result[0] if result else 170.0) / 100
+            today = datetime.datetime.now().strftime("%Y-%m-%d")
+            
+            weights = []
+            for record in records:
+                try:
+                    weights.append(float(record['weight']))
+                except (KeyError, TypeError, ValueError):
+                    weights.append(None)
+            
+            # Tính BMI cả lô một lần
+            valid = iter(BMICalculator.calculate_bmi_many([w for w in weights if w is not None], height))
+            params, bmis = [], []
+            for record, weight in zip(records, weights):
+                if weight is None:
+                    params.append(None)
+                    bmis.append(None)
+                else:
+                    bmi = float(next(valid))
+                    params.append((user_id, record.get('date') or today, weight, bmi, record.get('notes')))
+                    bmis.append(bmi)
+            
+            outcomes = self._executemany_outcomes(conn, '''
+                INSERT OR REPLACE INTO weight_records 
+                (user_id, record_date, weight, bmi, notes)
+                VALUES (?, ?, ?, ?, ?)
+            ''', params)
+            if any(outcomes):
+                self._rebuild_alert_state(conn, user_id, 'weight')
+                self._notify_change(user_id, 'weight', [p[1] for p, ok in zip(params, outcomes) if ok])
+            
+            self.logger.info(f"Weight records bulk added: user={user_id}, rows={sum(outcomes)}/{len(records)}")
+            return [bmi if ok else None for bmi, ok in zip(bmis, outcomes)]
+            
+        except Exception as e:
+            self.logger.error(f"Error bulk adding weight records: {e}")
+            return [None] * len(records)
+        finally:
+            if conn:
+                conn.close()
+    
+    def add_activities_bulk(self, user_id: int, records: Iterable[Dict]) -> List[bool]:
+        """
+        Thêm nhiều bản ghi hoạt động trong một giao dịch
+        
+        Args:
+            user_id: ID người dùng
+            records: Các dict có khóa 'activity_type', 'duration' và tùy chọn
+                'calories_burned', 'intensity', 'date', 'notes'
+            
+        Returns:
+            Kết quả lưu của từng bản ghi
+        """
+        records = list(records)
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        
+        params = []
+        for record in records:
+            try:
+                params.append((user_id, record.get('date') or today, record['activity_type'],
+                               int(record['duration']), record.get('calories_burned'),
+                               record.get('intensity') or "medium", record.get('notes')))
+            except (KeyError, TypeError, ValueError):
+                params.append(None)
+        
+        return self._bulk_insert('''
+            INSERT INTO activities 
+            (user_id, activity_date, activity_type, duration, calories_burned, intensity, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', params, "activities", user_id, 'activity')
+    
+    def add_sleep_records_bulk(self, user_id: int, records: Iterable[Dict]) -> List[bool]:
+        """
+        Thêm nhiều bản ghi giấc ngủ trong một giao dịch
+        
+        Args:
+            user_id: ID người dùng
+            records: Các dict có khóa 'record_date', 'sleep_hours' và tùy chọn
+                'sleep_quality', 'notes'
+            
+        Returns:
+            Kết quả lưu của từng bản ghi
+        """
+        params = []
+        for record in records:
+            try:
+                params.append((user_id, record['record_date'], float(record['sleep_hours']),
+                               record.get('sleep_quality') or "Trung bình", record.get('notes', "")))
+            except (KeyError, TypeError, ValueError):
+                params.append(None)
+        
+        return self._bulk_insert('''
+            INSERT OR REPLACE INTO sleep_records 
+            (user_id, record_date, sleep_hours, sleep_quality, notes)
+            VALUES (?, ?, ?, ?, ?)
+        ''', params, "sleep records", user_id, 'sleep')
+    
+    def add_heart_rate_records_bulk(self, user_id: int, records: Iterable[Dict]) -> List[bool]:
+        """
+        Thêm nhiều bản ghi nhịp tim trong một giao dịch
+        
+        Args:
+            user_id: ID người dùng
+            records: Các dict có khóa 'record_date', 'record_time', 'bpm' và tùy chọn
+                'activity_type', 'notes'
+            
+        Returns:
+            Kết quả lưu của từng bản ghi
+        """
+        params = []
+        for record in records:
+            try:
+                params.append((user_id, record['record_date'], record['record_time'], int(record['bpm']),
+                               record.get('activity_type') or "Nghỉ ngơi", record.get('notes', "")))
+            except (KeyError, TypeError, ValueError):
+                params.append(None)
+        
+        return self._bulk_insert('''
+            INSERT INTO heart_rate_records 
+            (user_id, record_date, record_time, bpm, activity_type, notes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', params, "heart rate records", user_id, 'heart_rate')
+    
+    def _bulk_insert(self, sql: str, params: List[Optional[tuple]], label: str, user_id: int,
+                     record_type: str) -> List[bool]:
+        """Mượn một kết nối và ghi cả lô, trả về kết quả từng dòng"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            outcomes = self._executemany_outcomes(conn, sql, params)
+            if any(outcomes):
+                self._rebuild_alert_state(conn, user_id, record_type)
+                # Tham số của mọi bảng bản ghi có dạng (user_id, ngày, ...)
+                self._notify_change(user_id, record_type, [p[1] for p, ok in zip(params, outcomes) if ok])
+            self.logger.info(f"Bulk added {label}: user={user_id}, rows={sum(outcomes)}/{len(params)}")
+            return outcomes
+            
+        except Exception as e:
+            self.logger.error(f"Error bulk adding {label}: {e}")
+            return [False] * len(params)
+        finally:
+            if conn:
+                conn.close()
\ No newline at end of file
@@ -0,0 +1,193 @@
+# database/migrations.py
+import sqlite3
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Nguồn của bảng daily_summary: (bảng, cột ngày, các cột tổng hợp, giá trị khi thêm
+# một dòng, cách cộng dồn khi ngày đã có, biểu thức tính lại cả ngày từ bảng nguồn)
+DAILY_SUMMARY_SOURCES = (
+    ("weight_records", "record_date", ("weight", "bmi"),
+     "NEW.weight, NEW.bmi",
+     "weight = excluded.weight, bmi = excluded.bmi",
+     "MAX(weight), MAX(bmi)"),
+    ("activities", "activity_date", ("activity_minutes", "calories"),
+     "NEW.duration, COALESCE(NEW.calories_burned, 0)",
+     "activity_minutes = COALESCE(activity_minutes, 0) + excluded.activity_minutes, "
+     "calories = COALESCE(calories, 0) + excluded.calories",
+     "SUM(duration), CASE WHEN COUNT(*) > 0 THEN TOTAL(calories_burned) END"),
+    ("sleep_records", "record_date", ("sleep_hours",),
+     "NEW.sleep_hours",
+     "sleep_hours = excluded.sleep_hours",
+     "MAX(sleep_hours)"),
+    ("heart_rate_records", "record_date", ("hr_min", "hr_max", "hr_sum", "hr_count"),
+     "NEW.bpm, NEW.bpm, NEW.bpm, 1",
+     "hr_min = MIN(COALESCE(hr_min, excluded.hr_min), excluded.hr_min), "
+     "hr_max = MAX(COALESCE(hr_max, excluded.hr_max), excluded.hr_max), "
+     "hr_sum = COALESCE(hr_sum, 0) + excluded.hr_sum, "
+     "hr_count = COALESCE(hr_count, 0) + 1",
+     "MIN(bpm), MAX(bpm), SUM(bpm), COUNT(*)"),
+)
+
+def _daily_summary_statements() -> List[str]:
+    """
+    Tạo bảng daily_summary, điền từ dữ liệu sẵn có và tạo trigger giữ bảng luôn khớp
+    
+    Thêm dòng: cộng dồn vào ngày tương ứng (INSERT OR REPLACE của cân nặng /
+    giấc ngủ ghi đè giá trị của ngày). Xóa / sửa dòng: tính lại ngày bị ảnh
+    hưởng từ bảng nguồn (dùng index theo user/ngày).
+    """
+    statements = [
+        '''CREATE TABLE IF NOT EXISTS daily_summary (
+               user_id INTEGER NOT NULL,
+               summary_date DATE NOT NULL,
+               weight REAL,
+               bmi REAL,
+               activity_minutes INTEGER,
+               calories REAL,
+               sleep_hours REAL,
+               hr_min INTEGER,
+               hr_max INTEGER,
+               hr_sum INTEGER,
+               hr_count INTEGER,
+               PRIMARY KEY (user_id, summary_date)
+           ) WITHOUT ROWID''',
+        # Chạy lại migration (database nâng cấp lại) thì điền lại từ đầu
+        "DELETE FROM daily_summary",
+    ]
+    
+    for table, date_column, columns, new_values, accumulate, aggregates in DAILY_SUMMARY_SOURCES:
+        column_list = ", ".join(columns)
+        replace = ", ".join(f"{column} = excluded.{column}" for column in columns)
+        
+        def recompute(ref: str) -> str:
+            return f'''UPDATE daily_summary SET ({column_list}) = (
+                       SELECT {aggregates} FROM {table}
+                       WHERE user_id = {ref}.user_id AND {date_column} = {ref}.{date_column})
+                   WHERE user_id = {ref}.user_id AND summary_date = {ref}.{date_column};'''
+        
+        statements += [
+            f'''INSERT INTO daily_summary (user_id, summary_date, {column_list})
+               SELECT user_id, {date_column}, {aggregates} FROM {table}
+               WHERE true GROUP BY user_id, {date_column}
+               ON CONFLICT (user_id, summary_date) DO UPDATE SET {replace}''',
+            f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_insert
+               AFTER INSERT ON {table} BEGIN
+                   INSERT INTO daily_summary (user_id, summary_date, {column_list})
+                   VALUES (NEW.user_id, NEW.{date_column}, {new_values})
+                   ON CONFLICT (user_id, summary_date) DO UPDATE SET {accumulate};
+               END''',
+            f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_delete
+               AFTER DELETE ON {table} BEGIN
+                   {recompute("OLD")}
+               END''',
+            f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_update
+               AFTER UPDATE ON {table} BEGIN
+                   {recompute("OLD")}
+                   INSERT INTO daily_summary (user_id, summary_date)
+                   VALUES (NEW.user_id, NEW.{date_column})
+                   ON CONFLICT (user_id, summary_date) DO NOTHING;
+                   {recompute("NEW")}
+               END''',
+        ]
+    return statements
+
+# Danh sách migration theo thứ tự: (version, mô tả, các câu lệnh SQL)
+# Chỉ được thêm migration mới vào cuối, không sửa migration đã phát hành.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Index theo user/ngày cho các bảng bản ghi", [
+        '''CREATE INDEX IF NOT EXISTS idx_heart_rate_user_date_time
+           ON heart_rate_records (user_id, record_date, record_time, bpm)''',
+        '''CREATE INDEX IF NOT EXISTS idx_activities_user_date
+           ON activities (user_id, activity_date, duration)''',
+        '''CREATE INDEX IF NOT EXISTS idx_health_goals_user
+           ON health_goals (user_id, status)''',
+    ]),
+    (2, "Bảng trạng thái cửa sổ trượt cho cảnh báo", [
+        '''CREATE TABLE IF NOT EXISTS alert_state (
+               user_id INTEGER NOT NULL,
+               record_type TEXT NOT NULL,
+               state TEXT NOT NULL,
+               updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (user_id, record_type),
+               FOREIGN KEY (user_id) REFERENCES users(user_id)
+           )''',
+    ]),
+    (3, "Bảng tổng hợp theo ngày (daily_summary) cập nhật bằng trigger", _daily_summary_statements()),
+    (4, "Bảng mẫu nhịp tim theo giây và tổng hợp theo phút từ thiết bị", [
+        # sample_time / minute_start: Unix timestamp (giây)
+        '''CREATE TABLE IF NOT EXISTS heart_rate_samples (
+               user_id INTEGER NOT NULL,
+               sample_time INTEGER NOT NULL,
+               bpm INTEGER NOT NULL,
+               PRIMARY KEY (user_id, sample_time),
+               FOREIGN KEY (user_id) REFERENCES users(user_id)
+           ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS heart_rate_minutes (
+               user_id INTEGER NOT NULL,
+               minute_start INTEGER NOT NULL,
+               bpm_min INTEGER NOT NULL,
+               bpm_max INTEGER NOT NULL,
+               bpm_sum INTEGER NOT NULL,
+               sample_count INTEGER NOT NULL,
+               PRIMARY KEY (user_id, minute_start),
+               FOREIGN KEY (user_id) REFERENCES users(user_id)
+           ) WITHOUT ROWID''',
+    ]),
+    (5, "Index cho phân trang nhịp tim (giờ đo NULL coi như '')", [
+        '''CREATE INDEX IF NOT EXISTS idx_heart_rate_user_page
+           ON heart_rate_records (user_id, record_date, COALESCE(record_time, ''), heart_rate_id)''',
+    ]),
+    (6, "Liên kết tổng hợp phút của thiết bị với bản ghi nhịp tim", [
+        # heart_rate_id: bản ghi heart_rate_records đại diện cho phút (xem add_heart_rate_samples)
+        '''CREATE TABLE IF NOT EXISTS heart_rate_minute_records (
+               user_id INTEGER NOT NULL,
+               minute_start INTEGER NOT NULL,
+               heart_rate_id INTEGER NOT NULL,
+               PRIMARY KEY (user_id, minute_start),
+               FOREIGN KEY (user_id) REFERENCES users(user_id)
+           ) WITHOUT ROWID''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Đọc phiên bản schema hiện tại (PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Áp dụng các migration chưa chạy lên database
+    
+    Mỗi migration chạy trong một giao dịch riêng cùng với việc cập nhật
+    user_version, nên database luôn ở một phiên bản nhất quán.
+    
+    Args:
+        conn: Kết nối tới database đã có các bảng cơ bản
+        
+    Returns:
+        Phiên bản schema sau khi migrate
+    """
+    current = get_schema_version(conn)
+    
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration {version} failed ({description}): {e}")
+            raise
+        
+        logger.info(f"Applied migration {version}: {description}")
+        current = version
+    
+    return current
@@ -0,0 +1,138 @@
+# gui/background_loader.py
+import logging
+import queue
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+class BackgroundLoader:
+    """
+    Chạy các tác vụ tải dữ liệu trên thread nền và trả kết quả về main thread
+
+    Mỗi tab gửi job theo một "kênh" (vd: 'charts'). Job mới trên cùng kênh làm
+    job cũ trở thành lỗi thời: job chưa chạy bị hủy, job đang chạy thì kết quả
+    bị bỏ qua. Kết quả được đưa về main thread qua queue và root.after, vì
+    Tkinter chỉ được thao tác từ main thread.
+    """
+
+    def __init__(self, root: tk.Misc, max_workers: int = 2, poll_interval: int = 30,
+                 on_busy_changed: Optional[Callable[[bool], None]] = None):
+        """
+        Args:
+            root: Cửa sổ Tk dùng để lập lịch callback
+            max_workers: Số thread nền tối đa
+            poll_interval: Chu kỳ kiểm tra kết quả (ms)
+            on_busy_changed: Callback(busy) khi trạng thái bận thay đổi
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_busy_changed = on_busy_changed
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="loader")
+        self._results = queue.Queue()
+        self._generations: Dict[str, int] = {}
+        self._futures: Dict[str, Any] = {}
+        self._poll_job = None
+        self._busy = False
+
+    def submit(self, channel: str, job: Callable[[], Any], on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[Exception], None]] = None) -> int:
+        """
+        Gửi một job tải dữ liệu
+
+        Args:
+            channel: Tên kênh (mỗi kênh chỉ giữ kết quả của job mới nhất)
+            job: Hàm chạy trên thread nền, không được đụng tới widget
+            on_done: Callback(kết quả) chạy trên main thread
+            on_error: Callback(lỗi) chạy trên main thread
+
+        Returns:
+            Số thứ tự (generation) của job trên kênh
+        """
+        self.cancel(channel)
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+
+        def run():
+            try:
+                result = job()
+                self._results.put((channel, generation, result, None, on_done, on_error))
+            except Exception as e:
+                self._results.put((channel, generation, None, e, on_done, on_error))
+
+        self._futures[channel] = self._executor.submit(run)
+        self._set_busy(True)
+        self._schedule_poll()
+        return generation
+
+    def cancel(self, channel: str):
+        """Hủy job đang chờ của một kênh; kết quả của job đang chạy sẽ bị bỏ qua"""
+        future = self._futures.pop(channel, None)
+        if future is not None:
+            future.cancel()
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+        self._update_busy()
+
+    def cancel_all(self, keep: Union[str, Iterable[str], None] = None):
+        """Hủy job của mọi kênh trừ kênh (hoặc các kênh) keep"""
+        keep = {keep} if isinstance(keep, str) or keep is None else set(keep)
+        for channel in list(self._futures):
+            if channel not in keep:
+                self.cancel(channel)
+
+    def is_pending(self, channel: str) -> bool:
+        """Kênh còn job chưa trả kết quả hay không"""
+        return channel in self._futures
+
+    def shutdown(self):
+        """Dừng loader (gọi trước khi hủy cửa sổ)"""
+        self.cancel_all()
+        if self._poll_job is not None:
+            try:
+                self.root.after_cancel(self._poll_job)
+            except tk.TclError:
+                pass
+            self._poll_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        """Nhận kết quả từ thread nền và gọi callback trên main thread"""
+        self._poll_job = None
+        while True:
+            try:
+                channel, generation, result, error, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            # Bỏ qua kết quả lỗi thời
+            if generation != self._generations.get(channel):
+                continue
+            self._futures.pop(channel, None)
+
+            try:
+                if error is None:
+                    on_done(result)
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    self.logger.error(f"Background job '{channel}' failed: {error}")
+            except Exception as e:
+                self.logger.error(f"Error handling result of '{channel}': {e}")
+
+        self._update_busy()
+        if self._futures:
+            self._schedule_poll()
+
+    def _update_busy(self):
+        self._set_busy(bool(self._futures))
+
+    def _set_busy(self, busy: bool):
+        if busy != self._busy:
+            self._busy = busy
+            if self.on_busy_changed is not None:
+                self.on_busy_changed(busy)
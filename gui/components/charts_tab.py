@@ -1,10 +1,33 @@
 ﻿# gui/components/charts_tab.py
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import logging
 from datetime import datetime, timedelta
+from utils.chart_generator import CHART_RECORD_TYPES
+from utils.downsampling import downsample_min_max
+
+# Chữ trên combobox -> loại biểu đồ / khoảng thời gian
+CHART_OPTIONS = {
+    "📊 Cân nặng": "weight_trend",
+    "🎯 BMI": "bmi",
+    "🏃 Hoạt động": "activity",
+    "😴 Giấc ngủ": "sleep_trend",
+    "❤️ Nhịp tim": "heart_rate_trend",
+    "😴 Chất lượng": "sleep_quality",
+    "❤️ Phân bố": "heart_rate_distribution",
+    "📈 Tổng quan": "weekly_summary"
+}
+PERIOD_OPTIONS = {
+    "1 Tuần": "week",
+    "1 Tháng": "month",
+    "3 Tháng": "3months",
+    "6 Tháng": "6months"
+}
+
+# Khoảng thời gian dài: vẽ từ dữ liệu đã gộp trong SQLite thay vì từng bản ghi
+SERIES_BUCKETS = {'3months': 'day', '6months': 'week'}
+SERIES_CHARTS = ('activity', 'sleep_trend', 'heart_rate_trend')
 
 class ChartsTab:
     """Tab biểu đồ và phân tích"""
@@ -18,6 +41,11 @@ class ChartsTab:
         self.logger = logging.getLogger(__name__)
         
         self.current_figures = []
+        # Một canvas duy nhất cho vùng biểu đồ, đổi figure thay vì tạo widget mới
+        self.chart_slot = None
+        self.figure_canvas = None
+        # Khóa cache và dữ liệu của lần vẽ hiện tại (xem build_figure)
+        self._render_context = (None, None)
         self.setup_ui()
     
     def setup_ui(self):
@@ -41,16 +69,7 @@ class ChartsTab:
         
         self.chart_combo = ttk.Combobox(
             control_frame,
-            values=[
-                "📊 Cân nặng",
-                "🎯 BMI",
-                "🏃 Hoạt động",
-                "😴 Giấc ngủ",
-                "❤️ Nhịp tim",
-                "😴 Chất lượng",
-                "❤️ Phân bố",
-                "📈 Tổng quan"
-            ],
+            values=list(CHART_OPTIONS),
             state='readonly',
             width=18,
             font=('Arial', 10)
@@ -66,7 +85,7 @@ class ChartsTab:
         
         self.period_combo = ttk.Combobox(
             control_frame,
-            values=["1 Tuần", "1 Tháng", "3 Tháng", "6 Tháng"],
+            values=list(PERIOD_OPTIONS),
             state='readonly',
             width=12,
             font=('Arial', 10)
@@ -91,8 +110,7 @@ class ChartsTab:
     
     def show_empty_chart(self):
         """Hiển thị trống"""
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
+        self.clear_charts()
         
         empty_frame = ttk.Frame(self.chart_frame)
         empty_frame.pack(fill=tk.BOTH, expand=True, pady=150)
@@ -101,68 +119,188 @@ class ChartsTab:
         ttk.Label(empty_frame, text="Chọn biểu đồ để bắt đầu", font=('Arial', 14), foreground='gray').pack(pady=10)
     
     def on_chart_changed(self, event=None):
-        """Khi thay đổi loại biểu đồ"""
-        self.refresh_charts()
+        """Khi thay đổi loại biểu đồ (đổi liên tục chỉ vẽ lần cuối)"""
+        self.main_window.scheduler.request('charts', self.refresh_charts)
     
     def on_period_changed(self, event=None):
         """Khi thay đổi khoảng thời gian"""
+        self.main_window.scheduler.request('charts', self.refresh_charts)
+    
+    def selected_chart(self):
+        """(loại biểu đồ, khoảng thời gian) đang chọn trên combobox"""
+        return (CHART_OPTIONS.get(self.chart_combo.get(), "weight_trend"),
+                PERIOD_OPTIONS.get(self.period_combo.get(), "week"))
+    
+    def is_affected(self, change):
+        """Chỉ biểu đồ đang chọn cần vẽ lại; biểu đồ khác tự nhận ra qua khóa cache khi được chọn"""
+        chart_type, _ = self.selected_chart()
+        return change.record_type in CHART_RECORD_TYPES.get(chart_type, ())
+    
+    def apply_changes(self, record_types):
+        """Vẽ lại sau khi dữ liệu của biểu đồ thay đổi"""
         self.refresh_charts()
     
     def refresh_charts(self):
-        """Tải biểu đồ"""
+        """Tải biểu đồ (đọc dữ liệu trên thread nền)"""
         try:
-            chart_text = self.chart_combo.get()
-            period_text = self.period_combo.get()
+            chart_type, period = self.selected_chart()
             
-            # Map dropdown text to chart type
-            chart_map = {
-                "📊 Cân nặng": "weight_trend",
-                "🎯 BMI": "bmi",
-                "🏃 Hoạt động": "activity",
-                "😴 Giấc ngủ": "sleep_trend",
-                "❤️ Nhịp tim": "heart_rate_trend",
-                "😴 Chất lượng": "sleep_quality",
-                "❤️ Phân bố": "heart_rate_distribution",
-                "📈 Tổng quan": "weekly_summary"
-            }
+            days_map = {'week': 7, 'month': 30, '3months': 90, '6months': 180}
+            days = days_map.get(period, 30)
             
-            period_map = {
-                "1 Tuần": "week",
-                "1 Tháng": "month",
-                "3 Tháng": "3months",
-                "6 Tháng": "6months"
-            }
+            # Đang hiển thị đúng biểu đồ này với dữ liệu hiện tại
+            cache_key = self.get_cache_key(chart_type, period)
+            if self.main_window.scheduler.is_rendered('charts', cache_key):
+                self.main_window.loader.cancel('charts')
+                return
             
-            chart_type = chart_map.get(chart_text, "weight_trend")
-            period = period_map.get(period_text, "week")
+            # Dữ liệu chưa đổi: dùng lại biểu đồ đã dựng, không truy vấn lại
+            cached = self.chart_generator.get_cached_figure(cache_key)
+            if cached is not None:
+                self.main_window.loader.cancel('charts')
+                self.render_charts(chart_type, period, cached[1], cache_key)
+                return
             
-            # Clear existing
-            for widget in self.chart_frame.winfo_children():
-                widget.destroy()
-            for fig in self.current_figures:
-                plt.close(fig)
-            self.current_figures.clear()
+            self.status_label.config(text="⏳ Đang tải...", foreground='blue')
             
+            # Biểu đồ cũ vẫn hiển thị cho tới khi dữ liệu mới về
+            self.main_window.loader.submit(
+                'charts',
+                lambda: self.load_chart_data(chart_type, days, period),
+                lambda data: self.render_charts(chart_type, period, data, cache_key),
+                self.on_load_error
+            )
+        except Exception as e:
+            self.logger.error(f"Error: {e}")
+            self.status_label.config(text="❌ Lỗi", foreground='red')
+            self.show_error_message(str(e))
+    
+    def get_cache_key(self, chart_type, period):
+        """Khóa cache: đổi khi dữ liệu liên quan được ghi hoặc sang ngày mới"""
+        user_id = self.user['user_id']
+        versions = self.db.get_data_versions(user_id, CHART_RECORD_TYPES.get(chart_type, ()))
+        today = datetime.now().strftime("%Y-%m-%d")
+        return (user_id, chart_type, period, versions, today)
+    
+    def build_figure(self, builder, update=None):
+        """
+        Lấy biểu đồ từ cache theo lần vẽ hiện tại, hoặc dựng mới và lưu vào cache
+        
+        Args:
+            builder: Hàm dựng Figure mới
+            update: Hàm(fig) -> bool cập nhật dữ liệu của figure đang hiển thị;
+                    nếu thành công thì dùng lại figure đó thay vì dựng mới
+        """
+        cache_key, data = self._render_context
+        if cache_key is not None:
+            cached = self.chart_generator.get_cached_figure(cache_key)
+            if cached is not None:
+                return cached[0]
+        
+        current = self.figure_canvas.figure if self.figure_canvas is not None else None
+        if update is not None and current is not None and update(current):
+            # Figure đổi dữ liệu nên không còn khớp khóa cache cũ
+            self.chart_generator.forget_figure(current)
+            fig = current
+        else:
+            fig = builder()
+        if cache_key is not None:
+            self.chart_generator.cache_figure(cache_key, fig, data)
+        return fig
+    
+    def load_chart_data(self, chart_type, days, period=None):
+        """
+        Đọc dữ liệu biểu đồ - chạy trên thread nền, không đụng tới widget
+        
+        Chỉ truy vấn các loại bản ghi mà biểu đồ cần (CHART_RECORD_TYPES). Khi
+        các loại đó trống, một truy vấn EXISTS cho biết còn dữ liệu nào khác
+        không, để chọn đúng thông báo.
+        """
+        user_id = self.user['user_id']
+        
+        bucket = SERIES_BUCKETS.get(period) if chart_type in SERIES_CHARTS else None
+        if bucket:
+            return self.load_series_data(chart_type, days, bucket)
+        
+        fetchers = {
+            'weight': self.db.get_weight_records,
+            'activity': self.db.get_activities,
+            'sleep': self.db.get_sleep_records,
+            'heart_rate': self.db.get_heart_rate_records,
+        }
+        
+        data = {record_type: fetchers[record_type](user_id, days=days)
+                for record_type in CHART_RECORD_TYPES.get(chart_type, ())}
+        
+        if any(data.values()):
+            data['has_data'] = True
+        else:
+            others = [t for t in fetchers if t not in data]
+            data['has_data'] = self.db.has_records(user_id, others, days=days)
+        return data
+    
+    def load_series_data(self, chart_type, days, bucket):
+        """Đọc dữ liệu đã gộp theo ngày/tuần cho các biểu đồ khoảng thời gian dài"""
+        user_id = self.user['user_id']
+        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        today = datetime.now().strftime("%Y-%m-%d")
+        record_type = CHART_RECORD_TYPES[chart_type][0]
+        
+        data = {'series': self.db.get_aggregated_series(record_type, user_id, start_date, bucket=bucket)}
+        if chart_type == 'activity':
+            data['totals'] = self.db.get_activity_totals_by_type(user_id, start_date)
+        elif chart_type == 'sleep_trend':
+            latest = self.db.get_sleep_history(user_id, start_date, today, limit=1, columns=['sleep_hours'])
+            data['latest'] = latest[0]['sleep_hours'] if latest else None
+        elif chart_type == 'heart_rate_trend':
+            latest = self.db.get_records_page('heart_rate', user_id, start_date, limit=1)
+            data['latest'] = latest[0]['bpm'] if latest else None
+        
+        others = [t for t in ('weight', 'activity', 'sleep', 'heart_rate') if t != record_type]
+        data['has_data'] = bool(data['series']) or self.db.has_records(user_id, others, days=days)
+        return data
+    
+    def on_load_error(self, error):
+        """Xử lý lỗi khi tải dữ liệu nền"""
+        self.logger.error(f"Error loading chart data: {error}")
+        self.status_label.config(text="❌ Lỗi", foreground='red')
+        self.main_window.scheduler.invalidate('charts')
+        self.clear_charts()
+        self.show_error_message(str(error))
+    
+    def clear_charts(self):
+        """Xóa các biểu đồ đang hiển thị (canvas được ẩn đi để dùng lại)"""
+        for widget in self.chart_frame.winfo_children():
+            if widget is self.chart_slot:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+        self.current_figures.clear()
+    
+    def render_charts(self, chart_type, period, data, cache_key=None):
+        """Vẽ biểu đồ từ dữ liệu đã tải (main thread - Tkinter không an toàn đa luồng)"""
+        try:
+            # Vùng biểu đồ bị xóa: chỉ ghi nhận lại khi vẽ xong
+            self.main_window.scheduler.invalidate('charts')
+            self.clear_charts()
+            self._render_context = (cache_key, data)
             self.status_label.config(text="⏳ Đang tạo...", foreground='blue')
-            self.chart_frame.update()
             
-            # Get data
-            days_map = {'week': 7, 'month': 30, '3months': 90, '6months': 180}
-            days = days_map.get(period, 30)
-            
-            weight_data = self.db.get_weight_records(self.user['user_id'], days=days)
-            activity_data = self.db.get_activities(self.user['user_id'], days=days)
-            sleep_data = self.db.get_sleep_records(self.user['user_id'], days=days)
-            hr_data = self.db.get_heart_rate_records(self.user['user_id'], days=days)
-            
-            has_data = bool(weight_data or activity_data or sleep_data or hr_data)
+            weight_data = data.get('weight', [])
+            activity_data = data.get('activity', [])
+            sleep_data = data.get('sleep', [])
+            hr_data = data.get('heart_rate', [])
             
-            if not has_data:
+            if not data['has_data']:
                 self.show_no_data_message()
+                self.status_label.config(text="✅ Hoàn thành", foreground='green')
+                self.main_window.scheduler.mark_rendered('charts', cache_key)
                 return
             
             # Render chart
-            if chart_type == "weight_trend":
+            if 'series' in data:
+                self.show_series_chart(chart_type, period, data)
+            elif chart_type == "weight_trend":
                 if weight_data:
                     self.show_weight_trend_chart(weight_data, period)
                 else:
@@ -204,6 +342,7 @@ class ChartsTab:
                     self.show_no_data_message("Không có dữ liệu")
             
             self.status_label.config(text="✅ Hoàn thành", foreground='green')
+            self.main_window.scheduler.mark_rendered('charts', cache_key)
             
         except Exception as e:
             self.logger.error(f"Error: {e}")
@@ -211,52 +350,109 @@ class ChartsTab:
             self.show_error_message(str(e))
     
     def show_weight_trend_chart(self, weight_data, period):
-        fig = self.chart_generator.create_weight_trend_chart(weight_data, period)
+        fig = self.build_figure(
+            lambda: self.chart_generator.create_weight_trend_chart(weight_data, period),
+            update=lambda f: self.chart_generator.update_trend_chart(f, 'weight_trend', weight_data, period))
         self.display_figure(fig, "📊 Xu hướng Cân nặng")
         self.show_weight_statistics(weight_data)
     
     def show_bmi_chart(self, weight_data):
-        fig = self.chart_generator.create_bmi_chart(weight_data)
+        fig = self.build_figure(lambda: self.chart_generator.create_bmi_chart(weight_data))
         self.display_figure(fig, "🎯 Chỉ số BMI")
         self.show_bmi_statistics(weight_data)
     
     def show_activity_chart(self, activity_data):
-        fig = self.chart_generator.create_activity_chart(activity_data)
+        fig = self.build_figure(lambda: self.chart_generator.create_activity_chart(activity_data))
         self.display_figure(fig, "🏃 Hoạt động")
         self.show_activity_statistics(activity_data)
     
     def show_sleep_trend_chart(self, sleep_data, period):
-        fig = self.chart_generator.create_sleep_trend_chart(sleep_data, period)
+        fig = self.build_figure(
+            lambda: self.chart_generator.create_sleep_trend_chart(sleep_data, period),
+            update=lambda f: self.chart_generator.update_trend_chart(f, 'sleep_trend', sleep_data, period))
         self.display_figure(fig, "😴 Giấc ngủ")
         self.show_sleep_statistics(sleep_data)
     
     def show_heart_rate_trend_chart(self, hr_data, period):
-        fig = self.chart_generator.create_heart_rate_trend_chart(hr_data, period)
+        # Không vẽ nhiều điểm hơn số pixel; giữ min/max mỗi nhóm để không mất đỉnh bất thường
+        ordered = sorted(hr_data, key=lambda r: (r['record_date'], r['record_time'] or ''))
+        points = downsample_min_max(ordered, self.get_plot_capacity(), value=lambda r: r['bpm'])
+        fig = self.build_figure(
+            lambda: self.chart_generator.create_heart_rate_trend_chart(points, period),
+            update=lambda f: self.chart_generator.update_trend_chart(f, 'heart_rate_trend', points, period))
         self.display_figure(fig, "❤️ Nhịp tim")
         self.show_heart_rate_statistics(hr_data)
     
     def show_sleep_quality_chart(self, sleep_data):
-        fig = self.chart_generator.create_sleep_quality_chart(sleep_data)
+        fig = self.build_figure(lambda: self.chart_generator.create_sleep_quality_chart(sleep_data))
         self.display_figure(fig, "😴 Chất lượng")
         self.show_sleep_statistics(sleep_data)
     
     def show_heart_rate_distribution_chart(self, hr_data):
-        fig = self.chart_generator.create_heart_rate_distribution_chart(hr_data)
+        fig = self.build_figure(lambda: self.chart_generator.create_heart_rate_distribution_chart(hr_data))
         self.display_figure(fig, "❤️ Phân bố")
         self.show_heart_rate_statistics(hr_data)
     
+    def show_series_chart(self, chart_type, period, data):
+        """Vẽ biểu đồ từ dữ liệu đã gộp (khoảng thời gian dài)"""
+        series = data['series']
+        if chart_type == "activity":
+            if not data['totals']:
+                self.show_no_data_message("Không có dữ liệu hoạt động")
+                return
+            fig = self.build_figure(lambda: self.chart_generator.create_activity_series_chart(
+                data['totals'], series, period))
+            self.display_figure(fig, "🏃 Hoạt động")
+            totals = data['totals']
+            self.show_activity_summary(sum(t['duration'] for t in totals),
+                                       sum(t['calories_burned'] for t in totals),
+                                       sum(t['count'] for t in totals))
+        elif not series:
+            message = "Không có dữ liệu giấc ngủ" if chart_type == "sleep_trend" else "Không có dữ liệu nhịp tim"
+            self.show_no_data_message(message)
+        else:
+            min_v = min(item['min'] for item in series)
+            max_v = max(item['max'] for item in series)
+            avg_v = sum(item['sum'] for item in series) / sum(item['count'] for item in series)
+            if chart_type == "sleep_trend":
+                fig = self.build_figure(lambda: self.chart_generator.create_sleep_series_chart(series, period))
+                self.display_figure(fig, "😴 Giấc ngủ")
+                self.show_sleep_summary(min_v, max_v, avg_v, data['latest'] or 0)
+            else:
+                fig = self.build_figure(lambda: self.chart_generator.create_heart_rate_series_chart(series, period))
+                self.display_figure(fig, "❤️ Nhịp tim")
+                self.show_heart_rate_summary(min_v, max_v, avg_v, data['latest'] or 0)
+    
     def show_weekly_summary_chart(self, weight_data, activity_data):
-        fig = self.chart_generator.create_weekly_summary_chart(weight_data, activity_data)
+        fig = self.build_figure(lambda: self.chart_generator.create_weekly_summary_chart(weight_data, activity_data))
         self.display_figure(fig, "📈 Tổng quan")
     
+    def get_plot_capacity(self):
+        """Số điểm tối đa nên vẽ: bằng độ rộng vùng biểu đồ (pixel)"""
+        width = self.chart_frame.winfo_width()
+        return width if width > 1 else 1000
+    
     def display_figure(self, fig, title):
-        chart_frame = ttk.LabelFrame(self.chart_frame, text=title, padding="10")
-        chart_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        canvas = FigureCanvasTkAgg(fig, chart_frame)
-        canvas.draw()
-        widget = canvas.get_tk_widget()
-        widget.pack(fill=tk.BOTH, expand=True)
+        """Hiển thị figure trên canvas dùng chung (chỉ tạo widget ở lần đầu)"""
+        if self.figure_canvas is None:
+            self.chart_slot = ttk.LabelFrame(self.chart_frame, text=title, padding="10")
+            self.figure_canvas = FigureCanvasTkAgg(fig, self.chart_slot)
+            self.figure_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        else:
+            self.chart_slot.config(text=title)
+            canvas = self.figure_canvas
+            if canvas.figure is not fig:
+                canvas.figure = fig
+                fig.set_canvas(canvas)
+            # Figure trong cache có thể được dựng với kích thước khác
+            widget = canvas.get_tk_widget()
+            width, height = widget.winfo_width(), widget.winfo_height()
+            if width > 1 and height > 1:
+                fig.set_size_inches(width / fig.dpi, height / fig.dpi, forward=False)
+        
+        # Thống kê được pack sau nên luôn nằm dưới biểu đồ
+        self.chart_slot.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.figure_canvas.draw_idle()
         
         self.current_figures.append(fig)
     
@@ -303,32 +499,37 @@ class ChartsTab:
         if not activity_data:
             return
         
+        total_d = sum(item['duration'] for item in activity_data)
+        total_c = sum(item['calories_burned'] for item in activity_data)
+        self.show_activity_summary(total_d, total_c, len(activity_data))
+    
+    def show_activity_summary(self, total_d, total_c, count):
         stats_frame = ttk.LabelFrame(self.chart_frame, text="📊 Thống kê Hoạt động", padding="10")
         stats_frame.pack(fill=tk.X, padx=5, pady=5)
         
-        total_d = sum(item['duration'] for item in activity_data)
-        total_c = sum(item['calories_burned'] for item in activity_data)
-        avg_d = total_d / len(activity_data) if activity_data else 0
+        avg_d = total_d / count if count else 0
         
         s1 = f"⏱️ Tổng thời gian: {total_d}p | Trung bình: {avg_d:.0f}p/lần | 🔥 Calories: {total_c:.0f}"
         ttk.Label(stats_frame, text=s1, font=('Arial', 10)).pack(anchor=tk.W, pady=3)
         
-        s2 = f"🏃 Số lần hoạt động: {len(activity_data)} lần"
+        s2 = f"🏃 Số lần hoạt động: {count} lần"
         ttk.Label(stats_frame, text=s2, font=('Arial', 10)).pack(anchor=tk.W, pady=3)
     
     def show_sleep_statistics(self, sleep_data):
         if not sleep_data:
             return
         
-        stats_frame = ttk.LabelFrame(self.chart_frame, text="📊 Thống kê Giấc ngủ", padding="10")
-        stats_frame.pack(fill=tk.X, padx=5, pady=5)
-        
         sleep_h = [item['sleep_hours'] for item in sleep_data]
         
         min_s = min(sleep_h)
         max_s = max(sleep_h)
         avg_s = sum(sleep_h) / len(sleep_h)
         latest_s = sleep_h[-1] if sleep_h else 0
+        self.show_sleep_summary(min_s, max_s, avg_s, latest_s)
+    
+    def show_sleep_summary(self, min_s, max_s, avg_s, latest_s):
+        stats_frame = ttk.LabelFrame(self.chart_frame, text="📊 Thống kê Giấc ngủ", padding="10")
+        stats_frame.pack(fill=tk.X, padx=5, pady=5)
         
         if avg_s < 6:
             status = "⚠️ Thiếu ngủ"
@@ -349,15 +550,17 @@ class ChartsTab:
         if not hr_data:
             return
         
-        stats_frame = ttk.LabelFrame(self.chart_frame, text="📊 Thống kê Nhịp tim", padding="10")
-        stats_frame.pack(fill=tk.X, padx=5, pady=5)
-        
         bpm_list = [item['bpm'] for item in hr_data]
         
         min_bpm = min(bpm_list)
         max_bpm = max(bpm_list)
         avg_bpm = sum(bpm_list) / len(bpm_list)
         latest_bpm = bpm_list[-1] if bpm_list else 0
+        self.show_heart_rate_summary(min_bpm, max_bpm, avg_bpm, latest_bpm)
+    
+    def show_heart_rate_summary(self, min_bpm, max_bpm, avg_bpm, latest_bpm):
+        stats_frame = ttk.LabelFrame(self.chart_frame, text="📊 Thống kê Nhịp tim", padding="10")
+        stats_frame.pack(fill=tk.X, padx=5, pady=5)
         
         if latest_bpm < 40:
             st = "⚠️ Quá chậm"
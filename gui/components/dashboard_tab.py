@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
 import logging
+from database.change_bus import RECORD_TYPES
 
 class DashboardTab:
     """Tab tổng quan dashboard (Giao diện thu gọn)"""
@@ -325,22 +326,70 @@ class DashboardTab:
 
     # --- CÁC HÀM LOGIC (GIỮ NGUYÊN) ---
     
+    def data_version(self):
+        """Phiên bản dữ liệu của dashboard: mọi loại bản ghi và ngày hiện tại (cửa sổ 7 ngày)"""
+        versions = self.db.get_data_versions(self.user['user_id'], RECORD_TYPES)
+        return (versions, datetime.now().strftime("%Y-%m-%d"))
+    
     def refresh_data(self):
-        """Làm mới dữ liệu dashboard"""
+        """Làm mới dữ liệu dashboard (tải trên thread nền, bỏ qua nếu dữ liệu chưa đổi)"""
+        version = self.data_version()
+        if self.main_window.scheduler.is_rendered('dashboard', version):
+            return
+        self.main_window.loader.submit('dashboard', self.load_data,
+                                       lambda snapshot: self.show_data(snapshot, version),
+                                       self.on_load_error)
+    
+    def is_affected(self, change):
+        """Dashboard tổng hợp mọi loại bản ghi"""
+        return True
+    
+    def apply_changes(self, record_types):
+        """Tải lại sau khi dữ liệu thay đổi"""
+        self.refresh_data()
+    
+    def load_data(self):
+        """Đọc dữ liệu dashboard - chạy trên thread nền, không đụng tới widget"""
+        # Một lần truy cập database cho toàn bộ dashboard
+        snapshot = self.db.get_dashboard_snapshot(self.user['user_id'])
+        
+        current_weight = snapshot['current_weight']
+        current_bmi = None
+        if current_weight:
+            from utils.bmi_calculator import BMICalculator
+            height_m = self.user['height'] / 100
+            current_bmi = BMICalculator.calculate_bmi(current_weight, height_m)
+        
+        snapshot['alerts'] = self.alert_system.get_all_alerts(
+            self.user['user_id'], current_weight, current_bmi
+        )
+        return snapshot
+    
+    def show_data(self, snapshot, version=None):
+        """Hiển thị dữ liệu đã tải lên giao diện"""
         try:
-            self.update_stats()
-            self.update_alerts()
-            self.update_bmi_info()
-            self.update_recent_activity()
+            self.update_stats(snapshot)
+            self.update_alerts(snapshot)
+            self.update_bmi_info(snapshot)
+            self.update_recent_activity(snapshot)
+            self.update_sleep_info(snapshot)
+            self.update_heart_rate_info(snapshot)
+            self.main_window.update_current_stats(snapshot)
+            self.main_window.scheduler.mark_rendered('dashboard', version)
             self.logger.info("Dashboard data refreshed")
         except Exception as e:
             self.logger.error(f"Error refreshing dashboard: {e}")
             self.main_window.show_alert("Lỗi", f"Không thể làm mới dashboard: {e}", "error")
     
-    def update_stats(self):
+    def on_load_error(self, error):
+        """Xử lý lỗi khi tải dữ liệu nền"""
+        self.logger.error(f"Error loading dashboard: {error}")
+        self.main_window.show_alert("Lỗi", f"Không thể làm mới dashboard: {error}", "error")
+    
+    def update_stats(self, snapshot):
         """Cập nhật thống kê"""
-        current_weight = self.db.get_current_weight(self.user['user_id'])
-        weekly_activity = self.db.get_weekly_activity_minutes(self.user['user_id'])
+        current_weight = snapshot['current_weight']
+        weekly_activity = snapshot['weekly_activity_minutes']
         
         if current_weight:
             from utils.bmi_calculator import BMICalculator
@@ -363,25 +412,14 @@ class DashboardTab:
         last_update = datetime.now().strftime("%H:%M %d/%m")
         self.stats_labels['last_update'].config(text=last_update)
     
-    def update_alerts(self):
+    def update_alerts(self, snapshot):
         """Cập nhật cảnh báo"""
         # Clear existing alerts
         for widget in self.alerts_content.winfo_children():
             widget.destroy()
         
-        # Get current data for alerts
-        current_weight = self.db.get_current_weight(self.user['user_id'])
-        current_bmi = None
-        
-        if current_weight:
-            from utils.bmi_calculator import BMICalculator
-            height_m = self.user['height'] / 100
-            current_bmi = BMICalculator.calculate_bmi(current_weight, height_m)
-        
-        # Get alerts
-        alerts = self.alert_system.get_all_alerts(
-            self.user['user_id'], current_weight, current_bmi
-        )
+        # Cảnh báo đã được tính sẵn trên thread nền
+        alerts = snapshot['alerts']
         
         if not alerts:
             empty_frame = ttk.Frame(self.alerts_content)
@@ -440,13 +478,13 @@ class DashboardTab:
             message_label.config(foreground=colors.get(alert['level'], 'black'))
             icon_label.config(foreground=colors.get(alert['level'], 'black'))
     
-    def update_bmi_info(self):
+    def update_bmi_info(self, snapshot):
         """Cập nhật thông tin BMI"""
         # Clear existing content
         for widget in self.bmi_content.winfo_children():
             widget.destroy()
         
-        current_weight = self.db.get_current_weight(self.user['user_id'])
+        current_weight = snapshot['current_weight']
         
         if not current_weight:
             empty_frame = ttk.Frame(self.bmi_content)
@@ -519,13 +557,13 @@ class DashboardTab:
                 ttk.Label(rec_frame, text=recommendation, font=('Arial', 10),
                          wraplength=800, justify=tk.LEFT).pack(side=tk.LEFT, fill=tk.X, expand=True)
     
-    def update_recent_activity(self):
+    def update_recent_activity(self, snapshot):
         """Cập nhật hoạt động gần đây"""
         # Clear existing content
         for widget in self.activity_content.winfo_children():
             widget.destroy()
         
-        activities = self.db.get_activities(self.user['user_id'], days=7)
+        activities = snapshot['recent_activities']
         
         if not activities:
             empty_frame = ttk.Frame(self.activity_content)
@@ -603,8 +641,20 @@ class DashboardTab:
     
     def setup_sleep_content(self, parent):
         """Thiết lập nội dung giấc ngủ"""
+        self.sleep_content = ttk.Frame(parent)
+        self.sleep_content.pack(fill=tk.X)
+        
+        ttk.Label(self.sleep_content, text="⏳ Đang tải dữ liệu giấc ngủ...",
+                 font=('Arial', 10), foreground='gray').pack(pady=20)
+    
+    def update_sleep_info(self, snapshot):
+        """Cập nhật nội dung giấc ngủ"""
+        parent = self.sleep_content
+        for widget in parent.winfo_children():
+            widget.destroy()
+        
         try:
-            sleep_records = self.db.get_sleep_records(self.user['user_id'], days=7)
+            sleep_records = snapshot['sleep_records']
             
             if not sleep_records:
                 ttk.Label(parent, text="Chưa có dữ liệu giấc ngủ", 
@@ -665,13 +715,25 @@ class DashboardTab:
                          font=('Arial', 10)).pack(anchor=tk.W)
                 
         except Exception as e:
-            self.logger.error(f"Error setting up sleep content: {e}")
+            self.logger.error(f"Error updating sleep content: {e}")
             ttk.Label(parent, text=f"Lỗi: {e}", foreground='red').pack()
     
     def setup_heart_rate_content(self, parent):
         """Thiết lập nội dung nhịp tim"""
+        self.heart_rate_content = ttk.Frame(parent)
+        self.heart_rate_content.pack(fill=tk.X)
+        
+        ttk.Label(self.heart_rate_content, text="⏳ Đang tải dữ liệu nhịp tim...",
+                 font=('Arial', 10), foreground='gray').pack(pady=20)
+    
+    def update_heart_rate_info(self, snapshot):
+        """Cập nhật nội dung nhịp tim"""
+        parent = self.heart_rate_content
+        for widget in parent.winfo_children():
+            widget.destroy()
+        
         try:
-            latest_hr = self.db.get_latest_heart_rate(self.user['user_id'])
+            latest_hr = snapshot['latest_heart_rate']
             
             if not latest_hr:
                 ttk.Label(parent, text="Chưa có dữ liệu nhịp tim", 
@@ -713,7 +775,7 @@ class DashboardTab:
                      f"📍 {latest_hr['activity_type']}", 
                      font=('Arial', 10)).pack(anchor=tk.W)
             
-            avg_hr = self.db.get_average_heart_rate(self.user['user_id'], days=7)
+            avg_hr = snapshot['average_heart_rate']
             if avg_hr > 0:
                 avg_frame = ttk.LabelFrame(parent, text="Thống kê tuần", padding="10")
                 avg_frame.pack(fill=tk.X, pady=5)
@@ -721,7 +783,7 @@ class DashboardTab:
                 ttk.Label(avg_frame, text=f"Trung bình: {int(avg_hr)} BPM", 
                          font=('Arial', 10)).pack(anchor=tk.W)
             
-            recent_records = self.db.get_heart_rate_records(self.user['user_id'], days=7)
+            recent_records = snapshot['recent_heart_rates']
             if recent_records:
                 recent_frame = ttk.LabelFrame(parent, text="Đo gần đây (7 ngày)", padding="10")
                 recent_frame.pack(fill=tk.X, pady=5)
@@ -733,5 +795,5 @@ class DashboardTab:
                              font=('Arial', 9)).pack(anchor=tk.W, pady=2)
                 
         except Exception as e:
-            self.logger.error(f"Error setting up heart rate content: {e}")
+            self.logger.error(f"Error updating heart rate content: {e}")
             ttk.Label(parent, text=f"Lỗi: {e}", foreground='red').pack()
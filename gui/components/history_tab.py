@@ -1,12 +1,21 @@
 ﻿# gui/components/history_tab.py
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 from datetime import datetime, timedelta
 import logging
-import csv
-import json
 import os
-from utils.bmi_calculator import BMICalculator
+from database.change_bus import RECORD_TYPES
+from utils.bmi_calculator import BMI_CATEGORIES, BMICalculator
+from utils.data_exporter import DataExporter
+from utils.data_importer import DataImporter
+from utils import columnar_io
+from .paged_treeview import PagedTreeview
+
+# Số bản ghi mỗi trang của bảng cân nặng / nhịp tim
+HISTORY_PAGE_SIZE = 200
+
+# Cột của bảng hoạt động (activity_id làm iid của dòng)
+ACTIVITY_COLUMNS = ('activity_id', 'date', 'activity_type', 'duration', 'calories_burned', 'intensity', 'notes')
 
 class HistoryTab:
     """Tab lịch sử và xuất dữ liệu"""
@@ -17,10 +26,22 @@ class HistoryTab:
         self.db = main_window.db
         self.user = main_window.user
         self.logger = logging.getLogger(__name__)
+        self.exporter = DataExporter(self.db)
+        self.importer = DataImporter(self.db)
+        self._import_progress = (0, 0)
         
         # Khởi tạo biến định dạng xuất file (Mặc định CSV)
         self.export_format_var = tk.StringVar(value="csv")
         
+        # Khoảng ngày đang hiển thị của các bảng phân trang
+        self.page_ranges = {'weight': (None, None), 'heart_rate': (None, None)}
+        
+        # Bộ lọc (loại dữ liệu, từ ngày, đến ngày) của lần tải gần nhất
+        self.shown_filter = ('all', None, None)
+        
+        # Bản ghi của các bảng không phân trang, theo iid (= khóa chính)
+        self.row_records = {'activity': {}, 'sleep': {}}
+        
         self.setup_ui()
     
     def setup_ui(self):
@@ -63,17 +84,17 @@ class HistoryTab:
         self.data_type_var = tk.StringVar(value="weight")
         # Radio buttons nhỏ gọn
         ttk.Radiobutton(action_frame, text="Cân nặng", variable=self.data_type_var, 
-                       value="weight", command=self.refresh_data).pack(side=tk.LEFT, padx=2)
+                       value="weight", command=self.request_refresh).pack(side=tk.LEFT, padx=2)
         ttk.Radiobutton(action_frame, text="Hoạt động", variable=self.data_type_var, 
-                       value="activity", command=self.refresh_data).pack(side=tk.LEFT, padx=2)
+                       value="activity", command=self.request_refresh).pack(side=tk.LEFT, padx=2)
         ttk.Radiobutton(action_frame, text="Giấc ngủ", variable=self.data_type_var, 
-                       value="sleep", command=self.refresh_data).pack(side=tk.LEFT, padx=2)
+                       value="sleep", command=self.request_refresh).pack(side=tk.LEFT, padx=2)
         ttk.Radiobutton(action_frame, text="Nhịp tim", variable=self.data_type_var, 
-                       value="heart_rate", command=self.refresh_data).pack(side=tk.LEFT, padx=2)
+                       value="heart_rate", command=self.request_refresh).pack(side=tk.LEFT, padx=2)
         
         # Nút lọc và xóa nằm cùng hàng để tiết kiệm chỗ
         ttk.Button(action_frame, text="Tải lại", width=8,
-                  command=self.refresh_data).pack(side=tk.LEFT, padx=(10, 2))
+                  command=lambda: self.request_refresh(force=True)).pack(side=tk.LEFT, padx=(10, 2))
         ttk.Button(action_frame, text="Xóa lọc", width=8,
                   command=self.clear_filters).pack(side=tk.LEFT, padx=2)
 
@@ -81,13 +102,15 @@ class HistoryTab:
         export_frame = ttk.LabelFrame(top_container, text="💾 Xuất file", padding="5")
         export_frame.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(5, 0))
         
-        # Chọn định dạng (CSV/JSON)
+        # Chọn định dạng (CSV/JSON/NDJSON)
         format_frame = ttk.Frame(export_frame)
         format_frame.pack(fill=tk.X)
         ttk.Radiobutton(format_frame, text="CSV (Excel)", variable=self.export_format_var, 
                        value="csv").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(format_frame, text="JSON", variable=self.export_format_var, 
                        value="json").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(format_frame, text="NDJSON", variable=self.export_format_var, 
+                       value="ndjson").pack(side=tk.LEFT, padx=5)
         
         # NÚT MENU XUẤT DỮ LIỆU (1 Nút duy nhất xổ xuống)
         self.export_btn = ttk.Menubutton(export_frame, text="⬇️ Tải xuống dữ liệu", direction='below', style='Accent.TButton')
@@ -101,6 +124,14 @@ class HistoryTab:
         export_menu.add_separator()
         export_menu.add_command(label="📦 Xuất Tất cả (.zip)", command=lambda: self.export_data('all'))
         
+        export_menu.add_command(label="📥 Nhập CSV/JSON (loại đang chọn)", command=self.import_data)
+        
+        # Định dạng cột NumPy cho phân tích (cần cài numpy)
+        npz_state = tk.NORMAL if columnar_io.HAS_NUMPY else tk.DISABLED
+        export_menu.add_separator()
+        export_menu.add_command(label="🧮 Xuất dạng cột (.npz)", command=self.export_npz, state=npz_state)
+        export_menu.add_command(label="📥 Nhập dạng cột (.npz)", command=self.import_npz, state=npz_state)
+        
         # Gán menu vào nút
         self.export_btn.configure(menu=export_menu)
         self.export_btn.pack(fill=tk.X, pady=(5, 0))
@@ -155,7 +186,16 @@ class HistoryTab:
         self.weight_tree.column('notes', width=200)
         
         weight_scrollbar = ttk.Scrollbar(self.weight_tab, orient="vertical", command=self.weight_tree.yview)
-        self.weight_tree.configure(yscrollcommand=weight_scrollbar.set)
+        self.weight_pager = PagedTreeview(
+            self.weight_tree, weight_scrollbar,
+            fetch_page=lambda **kw: self.fetch_page('weight', **kw),
+            format_row=self.format_weight_row,
+            key_func=lambda record: self.db.get_record_key('weight', record),
+            iid_func=lambda record: str(record['record_id']),
+            page_size=HISTORY_PAGE_SIZE,
+            loader=self.main_window.loader,
+            channel='history-page-weight'
+        )
         
         self.weight_tree.pack(side="left", fill="both", expand=True)
         weight_scrollbar.pack(side="right", fill="y")
@@ -166,8 +206,10 @@ class HistoryTab:
         """Thiết lập menu ngữ cảnh cho cân nặng"""
         self.weight_context_menu = tk.Menu(self.weight_tree, tearoff=0)
         self.weight_context_menu.add_command(label="Xem chi tiết", command=self.view_weight_details)
+        self.weight_context_menu.add_command(label="Sửa ghi chú", command=lambda: self.edit_notes('weight'))
         self.weight_context_menu.add_command(label="Xóa bản ghi", command=self.delete_weight_record)
         self.weight_tree.bind("<Button-3>", self.show_weight_context_menu)
+        self.weight_tree.bind("<Delete>", lambda event: self.delete_weight_record())
     
     def setup_activity_tab(self):
         activity_columns = ('date', 'type', 'duration', 'calories', 'intensity', 'notes')
@@ -240,38 +282,60 @@ class HistoryTab:
         self.heart_rate_tree.column('notes', width=150)
         
         hr_scrollbar = ttk.Scrollbar(self.heart_rate_tab, orient="vertical", command=self.heart_rate_tree.yview)
-        self.heart_rate_tree.configure(yscrollcommand=hr_scrollbar.set)
+        self.heart_rate_pager = PagedTreeview(
+            self.heart_rate_tree, hr_scrollbar,
+            fetch_page=lambda **kw: self.fetch_page('heart_rate', **kw),
+            format_row=self.format_heart_rate_row,
+            key_func=lambda record: self.db.get_record_key('heart_rate', record),
+            iid_func=lambda record: str(record['heart_rate_id']),
+            page_size=HISTORY_PAGE_SIZE,
+            loader=self.main_window.loader,
+            channel='history-page-heart_rate'
+        )
         
         self.heart_rate_tree.pack(side="left", fill="both", expand=True)
         hr_scrollbar.pack(side="right", fill="y")
         
         self.setup_heart_rate_context_menu()
     
-        self.weight_context_menu = tk.Menu(self.weight_tree, tearoff=0)
-        self.weight_context_menu.add_command(label="Xem chi tiết", command=self.view_weight_details)
-        self.weight_context_menu.add_command(label="Xóa bản ghi", command=self.delete_weight_record)
-        self.weight_tree.bind("<Button-3>", self.show_weight_context_menu)
-    
     def setup_activity_context_menu(self):
         self.activity_context_menu = tk.Menu(self.activity_tree, tearoff=0)
         self.activity_context_menu.add_command(label="Xem chi tiết", command=self.view_activity_details)
+        self.activity_context_menu.add_command(label="Sửa ghi chú", command=lambda: self.edit_notes('activity'))
         self.activity_context_menu.add_command(label="Xóa bản ghi", command=self.delete_activity_record)
         self.activity_tree.bind("<Button-3>", self.show_activity_context_menu)
+        self.activity_tree.bind("<Delete>", lambda event: self.delete_activity_record())
     
     def setup_sleep_context_menu(self):
         self.sleep_context_menu = tk.Menu(self.sleep_tree, tearoff=0)
         self.sleep_context_menu.add_command(label="Xem chi tiết", command=self.view_sleep_details)
+        self.sleep_context_menu.add_command(label="Sửa ghi chú", command=lambda: self.edit_notes('sleep'))
         self.sleep_context_menu.add_command(label="Xóa bản ghi", command=self.delete_sleep_record)
         self.sleep_tree.bind("<Button-3>", self.show_sleep_context_menu)
+        self.sleep_tree.bind("<Delete>", lambda event: self.delete_sleep_record())
     
     def setup_heart_rate_context_menu(self):
         self.heart_rate_context_menu = tk.Menu(self.heart_rate_tree, tearoff=0)
         self.heart_rate_context_menu.add_command(label="Xem chi tiết", command=self.view_heart_rate_details)
+        self.heart_rate_context_menu.add_command(label="Sửa ghi chú", command=lambda: self.edit_notes('heart_rate'))
         self.heart_rate_context_menu.add_command(label="Xóa bản ghi", command=self.delete_heart_rate_record)
         self.heart_rate_tree.bind("<Button-3>", self.show_heart_rate_context_menu)
+        self.heart_rate_tree.bind("<Delete>", lambda event: self.delete_heart_rate_record())
 
     # --- CÁC HÀM LOGIC (GIỮ NGUYÊN) ---
 
+    def request_refresh(self, force=False):
+        """Làm mới sau một khoảng trễ ngắn; đổi bộ lọc liên tục chỉ dẫn tới một lần tải"""
+        if force:
+            self.main_window.scheduler.invalidate('history')
+        self.main_window.scheduler.request('history', self.refresh_data)
+    
+    def data_version(self, data_type, from_date, to_date):
+        """Phiên bản của một lần tải: bộ lọc, phiên bản dữ liệu các loại được tải và ngày hiện tại"""
+        record_types = RECORD_TYPES if data_type == 'all' else [data_type]
+        versions = self.db.get_data_versions(self.user['user_id'], record_types)
+        return (data_type, from_date, to_date, versions, datetime.now().strftime("%Y-%m-%d"))
+    
     def refresh_data(self):
         try:
             from_date = self.from_date_entry.get().strip()
@@ -290,17 +354,65 @@ class HistoryTab:
                     messagebox.showerror("Lỗi", "Định dạng ngày không hợp lệ (YYYY-MM-DD)")
                     return
             
-            if data_type in ['weight', 'all']:
-                self.load_weight_data(from_date, to_date)
+            # Bộ lọc và dữ liệu chưa đổi từ lần hiển thị trước
+            version = self.data_version(data_type, from_date, to_date)
+            if self.main_window.scheduler.is_rendered('history', version):
+                return
+            
+            self.filter_status.config(text="Đang tải...", foreground='blue')
+            self.main_window.loader.submit(
+                'history',
+                lambda: self.load_data(data_type, from_date, to_date),
+                lambda data: self.show_data(data_type, data, (from_date, to_date), version),
+                self.on_load_error
+            )
             
-            if data_type in ['activity', 'all']:
-                self.load_activity_data(from_date, to_date)
+        except Exception as e:
+            self.logger.error(f"Error refreshing: {e}")
+            self.filter_status.config(text="Lỗi tải dữ liệu", foreground='red')
+
+    def is_affected(self, change):
+        """Thay đổi có thuộc loại dữ liệu và khoảng ngày đang hiển thị không"""
+        data_type, from_date, to_date = self.shown_filter
+        return data_type in ('all', change.record_type) and change.overlaps(from_date, to_date)
+    
+    def apply_changes(self, record_types):
+        """Tải lại theo bộ lọc hiện tại"""
+        self.refresh_data()
+    
+    def load_data(self, data_type, from_date=None, to_date=None):
+        """Đọc dữ liệu lịch sử - chạy trên thread nền, không đụng tới widget"""
+        loaders = {
+            'weight': self.load_weight_data,
+            'activity': self.load_activity_data,
+            'sleep': self.load_sleep_data,
+            'heart_rate': self.load_heart_rate_data,
+        }
+        return {
+            name: loader(from_date, to_date)
+            for name, loader in loaders.items()
+            if data_type in [name, 'all']
+        }
+
+    def show_data(self, data_type, data, date_range=(None, None), version=None):
+        """Hiển thị dữ liệu đã tải lên các bảng"""
+        try:
+            self.shown_filter = (data_type, date_range[0] or None, date_range[1] or None)
+            for name in self.page_ranges:
+                if name in data:
+                    self.page_ranges[name] = date_range
             
-            if data_type in ['sleep', 'all']:
-                self.load_sleep_data(from_date, to_date)
+            if 'weight' in data:
+                self.show_weight_data(data['weight'])
             
-            if data_type in ['heart_rate', 'all']:
-                self.load_heart_rate_data(from_date, to_date)
+            if 'activity' in data:
+                self.show_activity_data(data['activity'])
+            
+            if 'sleep' in data:
+                self.show_sleep_data(data['sleep'])
+            
+            if 'heart_rate' in data:
+                self.show_heart_rate_data(data['heart_rate'])
             
             # Select appropriate tab
             if data_type == 'weight':
@@ -316,116 +428,143 @@ class HistoryTab:
             total_count = sum(len(self.data_notebook.winfo_children()[i].winfo_children()[0].get_children()) 
                             for i in range(min(self.data_notebook.index('end'), 4)))
             self.filter_status.config(text=f"Tải dữ liệu", foreground='green')
+            self.main_window.scheduler.mark_rendered('history', version)
             self.logger.info(f"Refreshed history data: {data_type}")
             
         except Exception as e:
             self.logger.error(f"Error refreshing: {e}")
             self.filter_status.config(text="Lỗi tải dữ liệu", foreground='red')
 
+    def on_load_error(self, error):
+        """Xử lý lỗi khi tải dữ liệu nền"""
+        self.logger.error(f"Error loading history: {error}")
+        self.filter_status.config(text="Lỗi tải dữ liệu", foreground='red')
+
+    def fetch_page(self, record_type, after=None, before=None, limit=HISTORY_PAGE_SIZE,
+                   date_range=None):
+        """Lấy một trang bản ghi theo khoảng ngày (mặc định: khoảng đang hiển thị)"""
+        from_date, to_date = date_range or self.page_ranges[record_type]
+        if not (from_date and to_date):
+            # Không lọc: giới hạn 1 năm gần nhất như trước
+            from_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+            to_date = None
+        records = self.db.get_records_page(record_type, self.user['user_id'], from_date, to_date,
+                                           after=after, before=before, limit=limit)
+        if record_type == 'weight' and records:
+            # Phân loại BMI cho cả trang một lần thay vì từng dòng
+            codes = BMICalculator.categorize_many([record['bmi'] for record in records])
+            for record, code in zip(records, codes):
+                record['bmi_category'] = BMI_CATEGORIES[code]['category'] if code is not None else ''
+        return records
+
     def load_weight_data(self, from_date=None, to_date=None):
-        for item in self.weight_tree.get_children():
-            self.weight_tree.delete(item)
-        
-        if from_date and to_date:
-            weight_data = self.db.get_weight_history(self.user['user_id'], from_date, to_date)
-        else:
-            weight_data = self.db.get_weight_records(self.user['user_id'], days=365)
-        
-        for record in weight_data:
-            category = BMICalculator.get_bmi_category(record['bmi'])
-            self.weight_tree.insert('', 'end', values=(
-                record['date'],
-                record['weight'],
-                record['bmi'],
-                category['category'],
-                record['notes'] or ''
-            ))
+        """Tải trang đầu tiên dữ liệu cân nặng"""
+        return self.fetch_page('weight', date_range=(from_date, to_date))
+
+    def show_weight_data(self, weight_data):
+        self.weight_pager.reset(weight_data)
+
+    def format_weight_row(self, record):
+        return (
+            record['record_date'],
+            record['weight'],
+            record['bmi'],
+            record['bmi_category'],
+            record['notes'] or ''
+        )
 
     def load_activity_data(self, from_date=None, to_date=None):
-        for item in self.activity_tree.get_children():
-            self.activity_tree.delete(item)
-        
         if from_date and to_date:
-            activity_data = self.db.get_activities(self.user['user_id'], days=365)
-            activity_data = [act for act in activity_data if from_date <= act['date'] <= to_date]
-        else:
-            activity_data = self.db.get_activities(self.user['user_id'], days=365)
+            return self.db.get_activity_history(self.user['user_id'], from_date, to_date,
+                                                columns=ACTIVITY_COLUMNS)
+        from_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+        return list(self.db.iter_records('activity', self.user['user_id'], from_date,
+                                         columns=ACTIVITY_COLUMNS))
+
+    def show_activity_data(self, activity_data):
+        self.activity_tree.delete(*self.activity_tree.get_children())
+        self.row_records['activity'] = {}
         
         for activity in activity_data:
-            self.activity_tree.insert('', 'end', values=(
-                activity['date'],
-                activity['activity_type'],
-                activity['duration'],
-                activity['calories_burned'] or '--',
-                activity['intensity'] or 'medium',
-                activity['notes'] or ''
-            ))
+            iid = self.activity_tree.insert('', 'end', iid=str(activity['activity_id']),
+                                            values=self.format_activity_row(activity))
+            self.row_records['activity'][iid] = activity
+    
+    def format_activity_row(self, activity):
+        return (
+            activity['date'],
+            activity['activity_type'],
+            activity['duration'],
+            activity['calories_burned'] or '--',
+            activity['intensity'] or 'medium',
+            activity['notes'] or ''
+        )
     
     def load_sleep_data(self, from_date=None, to_date=None):
         """Tải dữ liệu giấc ngủ"""
-        from models.sleep import SleepRecord
-        
-        for item in self.sleep_tree.get_children():
-            self.sleep_tree.delete(item)
-        
-        # Get sleep records (all available)
-        sleep_data = self.db.get_sleep_records(self.user['user_id'], days=365)
-        
-        # Filter by date if provided
         if from_date and to_date:
-            sleep_data = [sleep for sleep in sleep_data if from_date <= sleep['record_date'] <= to_date]
+            return self.db.get_sleep_history(self.user['user_id'], from_date, to_date)
+        return self.db.get_sleep_records(self.user['user_id'], days=365)
+    
+    def show_sleep_data(self, sleep_data):
+        """Hiển thị dữ liệu giấc ngủ"""
+        self.sleep_tree.delete(*self.sleep_tree.get_children())
+        self.row_records['sleep'] = {}
         
         for sleep in sleep_data:
-            # Get health status
-            sleep_rec = SleepRecord(
-                user_id=sleep['user_id'],
-                record_date=sleep['record_date'],
-                sleep_hours=sleep['sleep_hours'],
-                sleep_quality=sleep['sleep_quality']
-            )
-            status = sleep_rec.get_health_status()
-            
-            self.sleep_tree.insert('', 'end', values=(
-                sleep['record_date'],
-                f"{sleep['sleep_hours']:.1f}h",
-                sleep['sleep_quality'],
-                status,
-                sleep.get('notes', '') or ''
-            ))
+            iid = self.sleep_tree.insert('', 'end', iid=str(sleep['sleep_id']),
+                                         values=self.format_sleep_row(sleep))
+            self.row_records['sleep'][iid] = sleep
+    
+    def format_sleep_row(self, sleep):
+        from models.sleep import SleepRecord
+        
+        # Get health status
+        sleep_rec = SleepRecord(
+            user_id=sleep['user_id'],
+            record_date=sleep['record_date'],
+            sleep_hours=sleep['sleep_hours'],
+            sleep_quality=sleep['sleep_quality']
+        )
+        status = sleep_rec.get_health_status()
+        
+        return (
+            sleep['record_date'],
+            f"{sleep['sleep_hours']:.1f}h",
+            sleep['sleep_quality'],
+            status,
+            sleep.get('notes', '') or ''
+        )
     
     def load_heart_rate_data(self, from_date=None, to_date=None):
-        """Tải dữ liệu nhịp tim"""
+        """Tải trang đầu tiên dữ liệu nhịp tim"""
+        return self.fetch_page('heart_rate', date_range=(from_date, to_date))
+    
+    def show_heart_rate_data(self, hr_data):
+        """Hiển thị dữ liệu nhịp tim (các trang sau được tải khi cuộn)"""
+        self.heart_rate_pager.reset(hr_data)
+    
+    def format_heart_rate_row(self, hr):
         from models.heart_rate import HeartRateRecord
         
-        for item in self.heart_rate_tree.get_children():
-            self.heart_rate_tree.delete(item)
-        
-        # Get heart rate records (all available)
-        hr_data = self.db.get_heart_rate_records(self.user['user_id'], days=365)
-        
-        # Filter by date if provided
-        if from_date and to_date:
-            hr_data = [hr for hr in hr_data if from_date <= hr['record_date'] <= to_date]
-        
-        for hr in hr_data:
-            # Get health status
-            hr_rec = HeartRateRecord(
-                user_id=hr['user_id'],
-                record_date=hr['record_date'],
-                record_time=hr['record_time'],
-                bpm=hr['bpm'],
-                activity_type=hr['activity_type']
-            )
-            status = hr_rec.get_health_status()
-            
-            self.heart_rate_tree.insert('', 'end', values=(
-                hr['record_date'],
-                hr['record_time'],
-                f"{hr['bpm']} BPM",
-                hr['activity_type'],
-                status,
-                hr.get('notes', '') or ''
-            ))
+        # Get health status
+        hr_rec = HeartRateRecord(
+            user_id=hr['user_id'],
+            record_date=hr['record_date'],
+            record_time=hr['record_time'],
+            bpm=hr['bpm'],
+            activity_type=hr['activity_type']
+        )
+        status = hr_rec.get_health_status()
+        
+        return (
+            hr['record_date'],
+            hr['record_time'],
+            f"{hr['bpm']} BPM",
+            hr['activity_type'],
+            status,
+            hr.get('notes', '') or ''
+        )
     
     def clear_filters(self):
         self.from_date_entry.delete(0, tk.END)
@@ -433,7 +572,7 @@ class HistoryTab:
         self.to_date_entry.delete(0, tk.END)
         self.to_date_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
         self.data_type_var.set("weight")
-        self.refresh_data()
+        self.request_refresh()
 
     def on_data_tab_changed(self, event):
         pass
@@ -441,13 +580,17 @@ class HistoryTab:
     def show_weight_context_menu(self, event):
         item = self.weight_tree.identify_row(event.y)
         if item:
-            self.weight_tree.selection_set(item)
+            # Giữ vùng chọn nhiều dòng nếu nhấn chuột phải vào một dòng đã chọn
+            if item not in self.weight_tree.selection():
+                self.weight_tree.selection_set(item)
             self.weight_context_menu.post(event.x_root, event.y_root)
 
     def show_activity_context_menu(self, event):
         item = self.activity_tree.identify_row(event.y)
         if item:
-            self.activity_tree.selection_set(item)
+            # Giữ vùng chọn nhiều dòng nếu nhấn chuột phải vào một dòng đã chọn
+            if item not in self.activity_tree.selection():
+                self.activity_tree.selection_set(item)
             self.activity_context_menu.post(event.x_root, event.y_root)
 
     def view_weight_details(self):
@@ -459,12 +602,7 @@ class HistoryTab:
         messagebox.showinfo("Chi tiết Cân nặng", details)
 
     def delete_weight_record(self):
-        selection = self.weight_tree.selection()
-        if not selection: return
-        item = selection[0]
-        if messagebox.askyesno("Xác nhận xóa", "Bạn có chắc muốn xóa bản ghi này?"):
-            self.weight_tree.delete(item)
-            # Note: Cần implement db.delete_weight(id) để xóa thật trong DB
+        self.delete_selected('weight')
 
     def view_activity_details(self):
         selection = self.activity_tree.selection()
@@ -475,11 +613,7 @@ class HistoryTab:
         messagebox.showinfo("Chi tiết Hoạt động", details)
 
     def delete_activity_record(self):
-        selection = self.activity_tree.selection()
-        if not selection: return
-        item = selection[0]
-        if messagebox.askyesno("Xác nhận xóa", "Bạn có chắc muốn xóa bản ghi này?"):
-            self.activity_tree.delete(item)
+        self.delete_selected('activity')
     
     def view_sleep_details(self):
         """Xem chi tiết bản ghi giấc ngủ"""
@@ -491,16 +625,14 @@ class HistoryTab:
     
     def delete_sleep_record(self):
         """Xóa bản ghi giấc ngủ"""
-        selection = self.sleep_tree.selection()
-        if not selection: return
-        item = selection[0]
-        if messagebox.askyesno("Xác nhận xóa", "Bạn có chắc muốn xóa bản ghi này?"):
-            self.sleep_tree.delete(item)
+        self.delete_selected('sleep')
     
     def show_sleep_context_menu(self, event):
         item = self.sleep_tree.identify_row(event.y)
         if item:
-            self.sleep_tree.selection_set(item)
+            # Giữ vùng chọn nhiều dòng nếu nhấn chuột phải vào một dòng đã chọn
+            if item not in self.sleep_tree.selection():
+                self.sleep_tree.selection_set(item)
             self.sleep_context_menu.post(event.x_root, event.y_root)
     
     def view_heart_rate_details(self):
@@ -513,18 +645,74 @@ class HistoryTab:
     
     def delete_heart_rate_record(self):
         """Xóa bản ghi nhịp tim"""
-        selection = self.heart_rate_tree.selection()
-        if not selection: return
-        item = selection[0]
-        if messagebox.askyesno("Xác nhận xóa", "Bạn có chắc muốn xóa bản ghi này?"):
-            self.heart_rate_tree.delete(item)
+        self.delete_selected('heart_rate')
     
     def show_heart_rate_context_menu(self, event):
         item = self.heart_rate_tree.identify_row(event.y)
         if item:
-            self.heart_rate_tree.selection_set(item)
+            # Giữ vùng chọn nhiều dòng nếu nhấn chuột phải vào một dòng đã chọn
+            if item not in self.heart_rate_tree.selection():
+                self.heart_rate_tree.selection_set(item)
             self.heart_rate_context_menu.post(event.x_root, event.y_root)
 
+    def record_view(self, record_type):
+        """(Treeview, PagedTreeview hoặc None, hàm định dạng dòng) của một loại bản ghi"""
+        return {
+            'weight': (self.weight_tree, self.weight_pager, self.format_weight_row),
+            'activity': (self.activity_tree, None, self.format_activity_row),
+            'sleep': (self.sleep_tree, None, self.format_sleep_row),
+            'heart_rate': (self.heart_rate_tree, self.heart_rate_pager, self.format_heart_rate_row),
+        }[record_type]
+
+    def delete_selected(self, record_type):
+        """Xóa các dòng đang chọn (iid = khóa chính) khỏi database và chỉ bỏ các dòng đó khỏi bảng"""
+        tree, pager, _ = self.record_view(record_type)
+        selection = tree.selection()
+        if not selection: return
+        message = ("Bạn có chắc muốn xóa bản ghi này?" if len(selection) == 1
+                   else f"Bạn có chắc muốn xóa {len(selection)} bản ghi đã chọn?")
+        if not messagebox.askyesno("Xác nhận xóa", message):
+            return
+        
+        deleted = self.db.delete_records(record_type, self.user['user_id'], [int(iid) for iid in selection])
+        if not deleted:
+            messagebox.showerror("Lỗi", "Không thể xóa bản ghi")
+            return
+        
+        if pager is not None:
+            pager.remove(selection)
+        else:
+            tree.delete(*selection)
+            for iid in selection:
+                self.row_records[record_type].pop(iid, None)
+        # Bảng đã được sửa tại chỗ, chỉ các tab khác cần tải lại
+        self.main_window.flush_changes(handled_by=self)
+        self.filter_status.config(text=f"Đã xóa {deleted} bản ghi", foreground='green')
+
+    def edit_notes(self, record_type):
+        """Sửa ghi chú của dòng đang chọn và vẽ lại đúng dòng đó"""
+        tree, pager, format_row = self.record_view(record_type)
+        selection = tree.selection()
+        if not selection: return
+        iid = selection[0]
+        record = pager.get_record(iid) if pager is not None else self.row_records[record_type].get(iid)
+        if record is None: return
+        
+        notes = simpledialog.askstring("Sửa ghi chú", "Ghi chú:", initialvalue=record.get('notes') or '',
+                                       parent=self.frame)
+        if notes is None: return
+        if not self.db.update_record(record_type, self.user['user_id'], int(iid), {'notes': notes}):
+            messagebox.showerror("Lỗi", "Không thể cập nhật bản ghi")
+            return
+        
+        record = dict(record, notes=notes)
+        if pager is not None:
+            pager.update(iid, record)
+        else:
+            self.row_records[record_type][iid] = record
+            tree.item(iid, values=format_row(record))
+        self.main_window.flush_changes(handled_by=self)
+
     def export_data(self, data_type):
         try:
             export_format = self.export_format_var.get()
@@ -534,6 +722,9 @@ class HistoryTab:
             if export_format == 'csv':
                 file_types = [('CSV files', '*.csv'), ('All files', '*.*')]
                 default_ext = '.csv'
+            elif export_format == 'ndjson':
+                file_types = [('NDJSON files', '*.ndjson'), ('All files', '*.*')]
+                default_ext = '.ndjson'
             else:
                 file_types = [('JSON files', '*.json'), ('All files', '*.*')]
                 default_ext = '.json'
@@ -577,112 +768,148 @@ class HistoryTab:
             messagebox.showerror("Lỗi", f"Lỗi xuất file: {e}")
 
     def export_weight_data(self, file_path, format):
-        try:
-            weight_data = self.db.get_weight_records(self.user['user_id'], days=365)
-            if not weight_data: return False
-            
-            if format == 'csv':
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['Ngày', 'Cân nặng', 'BMI', 'Phân loại', 'Ghi chú'])
-                    for r in weight_data:
-                        cat = BMICalculator.get_bmi_category(r['bmi'])['category']
-                        writer.writerow([r['date'], r['weight'], r['bmi'], cat, r['notes'] or ''])
-            else:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(weight_data, file, ensure_ascii=False, indent=2)
-            return True
-        except Exception: return False
+        """Xuất dữ liệu cân nặng"""
+        return self.export_records('weight', file_path, format)
 
     def export_sleep_data(self, file_path, format):
         """Xuất dữ liệu giấc ngủ"""
-        try:
-            sleep_data = self.db.get_sleep_records(self.user['user_id'], days=365)
-            if not sleep_data:
-                return False
-            
-            if format == 'csv':
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['Ngày', 'Giờ ngủ', 'Chất lượng', 'Ghi chú'])
-                    for sleep in sleep_data:
-                        writer.writerow([sleep['record_date'], sleep['sleep_hours'], 
-                                       sleep['sleep_quality'], sleep.get('notes', '') or ''])
-            else:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(sleep_data, file, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            self.logger.error(f"Error exporting sleep data: {e}")
-            return False
+        return self.export_records('sleep', file_path, format)
 
     def export_activity_data(self, file_path, format):
         """Xuất dữ liệu hoạt động"""
-        try:
-            activity_data = self.db.get_activities(self.user['user_id'], days=365)
-            if not activity_data:
-                return False
-            
-            if format == 'csv':
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['Ngày', 'Loại hoạt động', 'Khoảng thời gian', 'Calo', 'Ghi chú'])
-                    for activity in activity_data:
-                        writer.writerow([activity['date'], activity['activity_type'], 
-                                       activity['duration_minutes'], activity['calories'], 
-                                       activity['notes'] or ''])
-            else:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(activity_data, file, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            self.logger.error(f"Error exporting activity data: {e}")
-            return False
+        return self.export_records('activity', file_path, format)
 
     def export_heart_rate_data(self, file_path, format):
         """Xuất dữ liệu nhịp tim"""
+        return self.export_records('heart_rate', file_path, format)
+    
+    def export_records(self, record_type, file_path, format):
+        """Xuất toàn bộ lịch sử một loại bản ghi (ghi dần từng lô, không giới hạn 365 ngày)"""
         try:
-            hr_data = self.db.get_heart_rate_records(self.user['user_id'], days=365)
-            if not hr_data:
-                return False
-            
-            if format == 'csv':
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['Ngày', 'Thời gian', 'BPM', 'Hoạt động', 'Ghi chú'])
-                    for hr in hr_data:
-                        writer.writerow([hr['record_date'], hr['record_time'], hr['bpm'], 
-                                       hr['activity_type'], hr.get('notes', '') or ''])
-            else:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(hr_data, file, ensure_ascii=False, indent=2)
-            return True
+            return self.exporter.export_records(self.user['user_id'], record_type, file_path, format) > 0
         except Exception as e:
-            self.logger.error(f"Error exporting heart rate data: {e}")
+            self.logger.error(f"Error exporting {record_type} data: {e}")
             return False
     
     def export_all_data(self, file_path, format):
-        """Xuất tất cả dữ liệu"""
+        """Xuất tất cả dữ liệu vào một file ZIP (ghi thẳng vào từng entry, không dùng file tạm)"""
         try:
-            import zipfile, tempfile
-            with tempfile.TemporaryDirectory() as temp_dir:
-                ts = datetime.now().strftime("%Y%m%d")
-                w_path = os.path.join(temp_dir, f"weight_{ts}.{format}")
-                a_path = os.path.join(temp_dir, f"activity_{ts}.{format}")
-                s_path = os.path.join(temp_dir, f"sleep_{ts}.{format}")
-                h_path = os.path.join(temp_dir, f"heart_rate_{ts}.{format}")
-                
-                self.export_weight_data(w_path, format)
-                self.export_activity_data(a_path, format)
-                self.export_sleep_data(s_path, format)
-                self.export_heart_rate_data(h_path, format)
-                
-                with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    zipf.write(w_path, os.path.basename(w_path))
-                    zipf.write(a_path, os.path.basename(a_path))
-                    zipf.write(s_path, os.path.basename(s_path))
-                    zipf.write(h_path, os.path.basename(h_path))
-            return True
+            counts = self.exporter.export_all(self.user['user_id'], file_path, format)
+            return any(counts.values())
         except Exception as e:
             self.logger.error(f"Error exporting all data: {e}")
             return False
+    
+    def export_npz(self):
+        """Xuất mọi loại bản ghi ra file NumPy .npz (chạy nền)"""
+        if self.main_window.loader.is_pending('npz'):
+            self.main_window.show_alert("Thông báo", "Đang xử lý file dạng cột, vui lòng đợi", "warning")
+            return
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = filedialog.asksaveasfilename(
+            title="Lưu dữ liệu dạng cột",
+            defaultextension='.npz',
+            initialfile=f"health_all_{timestamp}.npz",
+            filetypes=[('NumPy files', '*.npz'), ('All files', '*.*')]
+        )
+        if not file_path:
+            return
+        
+        user_id = self.user['user_id']
+        filename = os.path.basename(file_path)
+        self.filter_status.config(text=f"Đang xuất: {filename}", foreground='blue')
+        self.main_window.loader.submit(
+            'npz',
+            lambda: columnar_io.export_npz(self.db, user_id, file_path),
+            lambda counts: self.show_npz_result("Đã xuất", counts, filename),
+            lambda error: self.on_npz_error("xuất", error)
+        )
+    
+    def import_npz(self):
+        """Nhập dữ liệu từ file NumPy .npz (chạy nền)"""
+        if self.main_window.loader.is_pending('npz'):
+            self.main_window.show_alert("Thông báo", "Đang xử lý file dạng cột, vui lòng đợi", "warning")
+            return
+        
+        file_path = filedialog.askopenfilename(
+            title="Chọn file dữ liệu dạng cột",
+            filetypes=[('NumPy files', '*.npz'), ('All files', '*.*')]
+        )
+        if not file_path:
+            return
+        
+        user_id = self.user['user_id']
+        filename = os.path.basename(file_path)
+        self.filter_status.config(text=f"Đang nhập: {filename}", foreground='blue')
+        self.main_window.loader.submit(
+            'npz',
+            lambda: columnar_io.import_npz(self.db, user_id, file_path),
+            lambda counts: self.show_npz_result("Đã nhập", counts, filename),
+            lambda error: self.on_npz_error("nhập", error)
+        )
+    
+    def show_npz_result(self, action, counts, filename):
+        """Hiển thị kết quả xuất / nhập file .npz (main thread)"""
+        self.main_window.show_alert("Thành công", f"{action} {sum(counts.values())} bản ghi:\n{filename}")
+        self.filter_status.config(text=f"{action}: {filename}", foreground='green')
+        # Thay đổi do thread nền phát ra: làm mới ngay thay vì chờ lần poll kế tiếp
+        self.main_window.flush_changes()
+    
+    def on_npz_error(self, action, error):
+        """Xử lý lỗi khi xuất / nhập file .npz"""
+        self.logger.error(f"Error processing npz file: {error}")
+        self.filter_status.config(text=f"Lỗi {action} file", foreground='red')
+        self.main_window.show_alert("Lỗi", f"Lỗi {action} file: {error}", "error")
+    
+    def import_data(self):
+        """Nhập file CSV/JSON/NDJSON cho loại dữ liệu đang chọn (chạy nền)"""
+        if self.main_window.loader.is_pending('import'):
+            self.main_window.show_alert("Thông báo", "Đang nhập dữ liệu, vui lòng đợi", "warning")
+            return
+        
+        file_path = filedialog.askopenfilename(
+            title="Chọn file dữ liệu",
+            filetypes=[('Dữ liệu', '*.csv *.json *.ndjson *.jsonl'), ('All files', '*.*')]
+        )
+        if not file_path:
+            return
+        
+        record_type = self.data_type_var.get()
+        user_id = self.user['user_id']
+        self._import_progress = (0, 0)
+        
+        def progress(total, imported):
+            # Chạy trên thread nền: chỉ lưu lại, main thread đọc trong poll_import_progress
+            self._import_progress = (total, imported)
+        
+        self.main_window.loader.submit(
+            'import',
+            lambda: self.importer.import_file(user_id, record_type, file_path, progress=progress),
+            lambda result: self.show_import_result(result, os.path.basename(file_path)),
+            self.on_import_error
+        )
+        self.poll_import_progress()
+    
+    def poll_import_progress(self):
+        """Cập nhật tiến độ nhập file trên thanh trạng thái"""
+        if not self.main_window.loader.is_pending('import'):
+            return
+        total, imported = self._import_progress
+        self.filter_status.config(text=f"Đang nhập: {imported}/{total} dòng", foreground='blue')
+        self.frame.after(200, self.poll_import_progress)
+    
+    def show_import_result(self, result, filename):
+        """Hiển thị kết quả nhập file"""
+        message = f"{filename}\nĐã nhập {result['imported']}/{result['total']} dòng"
+        if result['rejected']:
+            details = "\n".join(f"Dòng {line}: {reason}" for line, reason in result['errors'][:10])
+            message += f"\nBị loại {result['rejected']} dòng:\n{details}"
+        self.filter_status.config(text=f"Đã nhập: {result['imported']} dòng", foreground='green')
+        self.main_window.show_alert("Nhập dữ liệu", message, "warning" if result['rejected'] else "info")
+    
+    def on_import_error(self, error):
+        """Xử lý lỗi khi nhập file"""
+        self.logger.error(f"Error importing data: {error}")
+        self.filter_status.config(text="Lỗi nhập file", foreground='red')
+        self.main_window.show_alert("Lỗi", f"Lỗi nhập file: {error}", "error")
\ No newline at end of file
@@ -5,7 +5,7 @@ from datetime import datetime
 import logging
 import random
 from utils.validators import HealthDataValidator
-from utils.bmi_calculator import BMICalculator
+from utils.bmi_calculator import BMI_CATEGORIES, BMICalculator
 
 class InputTab:
     """Tab nhập liệu"""
@@ -500,8 +500,6 @@ class InputTab:
             if success:
                 messagebox.showinfo("Thành công", f"Đã lưu cân nặng: {weight} kg")
                 self.clear_weight_form()
-                self.load_recent_weights()
-                self.main_window.refresh_all()
             else:
                 messagebox.showerror("Lỗi", "Không thể lưu cân nặng")
         except Exception as e:
@@ -557,8 +555,6 @@ class InputTab:
             if success:
                 messagebox.showinfo("Thành công", f"Đã lưu: {activity_type} - {duration} phút")
                 self.clear_activity_form()
-                self.load_recent_activities()
-                self.main_window.refresh_all()
             else:
                 messagebox.showerror("Lỗi", "Không thể lưu hoạt động")
         except Exception as e:
@@ -580,6 +576,22 @@ class InputTab:
         self.intensity_combo.set("medium")
         self.activity_notes_entry.delete("1.0", tk.END)
     
+    def is_affected(self, change):
+        """Mỗi loại bản ghi có một danh sách gần đây trên tab này"""
+        return True
+    
+    def apply_changes(self, record_types):
+        """Chỉ tải lại danh sách gần đây của các loại bản ghi đã thay đổi"""
+        loaders = {
+            'weight': self.load_recent_weights,
+            'activity': self.load_recent_activities,
+            'sleep': self.load_recent_sleep,
+            'heart_rate': self.load_recent_heart_rate,
+        }
+        for record_type in record_types:
+            if record_type in loaders:
+                loaders[record_type]()
+    
     def load_recent_weights(self):
         """Tải cân nặng gần đây"""
         try:
@@ -588,13 +600,13 @@ class InputTab:
             
             records = self.db.get_weight_records(self.user['user_id'], days=30)
             if records:
-                for record in records:
-                    category = BMICalculator.get_bmi_category(record['bmi'])['category']
+                codes = BMICalculator.categorize_many([record['bmi'] for record in records])
+                for record, code in zip(records, codes):
                     self.weight_tree.insert('', 0, values=(
                         record['date'],
                         record['weight'],
                         record['bmi'],
-                        category
+                        BMI_CATEGORIES[code]['category'] if code is not None else ''
                     ))
         except Exception as e:
             self.logger.error(f"Error loading weights: {e}")
@@ -634,8 +646,6 @@ class InputTab:
                     text=f"Đã tạo cân nặng: {measurement['weight']} kg {measurement['trend']}",
                     foreground='green'
                 )
-                self.load_recent_weights()
-                self.main_window.refresh_all()
             else:
                 self.device_status.config(text="Lỗi khi lưu cân nặng", foreground='red')
         except Exception as e:
@@ -661,8 +671,6 @@ class InputTab:
                     text=f"Đã tạo hoạt động: {activity_data['activity_type']} - {activity_data['duration']} phút",
                     foreground='green'
                 )
-                self.load_recent_activities()
-                self.main_window.refresh_all()
             else:
                 self.device_status.config(text="Lỗi khi lưu hoạt động", foreground='red')
         except Exception as e:
@@ -695,8 +703,6 @@ class InputTab:
                     text=f"Đã tạo giấc ngủ: {sleep_data['sleep_hours']:.1f} giờ - {sleep_quality}",
                     foreground='green'
                 )
-                self.load_recent_sleep()
-                self.main_window.refresh_all()
             else:
                 self.device_status.config(text="Lỗi khi lưu giấc ngủ", foreground='red')
         except Exception as e:
@@ -722,8 +728,6 @@ class InputTab:
                     text=f"Đã tạo nhịp tim: {hr_data['resting_heart_rate']} BPM",
                     foreground='green'
                 )
-                self.load_recent_heart_rate()
-                self.main_window.refresh_all()
             else:
                 self.device_status.config(text="Lỗi khi lưu nhịp tim", foreground='red')
         except Exception as e:
@@ -750,68 +754,55 @@ class InputTab:
                 'excellent': 'Rất tốt'
             }
             
+            user_id = self.user['user_id']
+            weight_rows, activity_rows, sleep_rows, hr_rows = [], [], [], []
+            
             for day_data in historical_data:
-                # Save weight
-                weight_bmi = self.db.add_weight_record(
-                    user_id=self.user['user_id'],
-                    weight=day_data['weight_data']['weight'],
-                    date=day_data['date']
-                )
+                weight_rows.append({
+                    'weight': day_data['weight_data']['weight'],
+                    'date': day_data['date']
+                })
                 
-                # Save activity if exists
+                # Activity if exists
                 if day_data['activity_data']:
-                    activity_success = self.db.add_activity(
-                        user_id=self.user['user_id'],
-                        activity_type=day_data['activity_data']['activity_type'],
-                        duration=day_data['activity_data']['duration'],
-                        calories_burned=day_data['activity_data']['calories_burned'],
-                        intensity=day_data['activity_data']['intensity'],
-                        date=day_data['date']
-                    )
-                    if activity_success:
-                        saved_count += 1
+                    activity_rows.append({
+                        'activity_type': day_data['activity_data']['activity_type'],
+                        'duration': day_data['activity_data']['duration'],
+                        'calories_burned': day_data['activity_data']['calories_burned'],
+                        'intensity': day_data['activity_data']['intensity'],
+                        'date': day_data['date']
+                    })
                 
-                # Generate and save sleep data
+                # Generate sleep data
                 sleep_data = self.device_simulator.generate_sleep_data()
-                sleep_quality = quality_map.get(sleep_data['sleep_quality'], 'Trung bình')
-                sleep_success = self.db.add_sleep_record(
-                    user_id=self.user['user_id'],
-                    record_date=day_data['date'],
-                    sleep_hours=sleep_data['sleep_hours'],
-                    sleep_quality=sleep_quality,
-                    notes=f"Mẫu - Ngủ sâu: {sleep_data['deep_sleep_hours']}h, REM: {sleep_data['rem_sleep_hours']}h"
-                )
-                if sleep_success:
-                    saved_count += 1
+                sleep_rows.append({
+                    'record_date': day_data['date'],
+                    'sleep_hours': sleep_data['sleep_hours'],
+                    'sleep_quality': quality_map.get(sleep_data['sleep_quality'], 'Trung bình'),
+                    'notes': f"Mẫu - Ngủ sâu: {sleep_data['deep_sleep_hours']}h, REM: {sleep_data['rem_sleep_hours']}h"
+                })
                 
-                # Generate and save heart rate data
+                # Generate heart rate data
                 hr_data = self.device_simulator.generate_heart_rate_data()
-                hr_success = self.db.add_heart_rate_record(
-                    user_id=self.user['user_id'],
-                    record_date=day_data['date'],
-                    record_time=f"{random.randint(6, 22):02d}:{random.randint(0, 59):02d}",
-                    bpm=hr_data['resting_heart_rate'],
-                    activity_type='Nghỉ ngơi',
-                    notes=f"Mẫu - Zone: {hr_data['heart_rate_zone']}, Tối đa: {hr_data['max_heart_rate']}"
-                )
-                if hr_success:
-                    saved_count += 1
-                
-                if weight_bmi:
-                    saved_count += 1
+                hr_rows.append({
+                    'record_date': day_data['date'],
+                    'record_time': f"{random.randint(6, 22):02d}:{random.randint(0, 59):02d}",
+                    'bpm': hr_data['resting_heart_rate'],
+                    'activity_type': 'Nghỉ ngơi',
+                    'notes': f"Mẫu - Zone: {hr_data['heart_rate_zone']}, Tối đa: {hr_data['max_heart_rate']}"
+                })
+            
+            # Save each record type in a single transaction
+            saved_count += sum(1 for bmi in self.db.add_weight_records_bulk(user_id, weight_rows) if bmi)
+            saved_count += sum(self.db.add_activities_bulk(user_id, activity_rows))
+            saved_count += sum(self.db.add_sleep_records_bulk(user_id, sleep_rows))
+            saved_count += sum(self.db.add_heart_rate_records_bulk(user_id, hr_rows))
             
             self.hist_status.config(
                 text=f"Đã tạo {saved_count} bản ghi dữ liệu mẫu cho 30 ngày (cân nặng, hoạt động, giấc ngủ, nhịp tim)",
                 foreground='green'
             )
             
-            # Refresh data
-            self.load_recent_weights()
-            self.load_recent_activities()
-            self.load_recent_sleep()
-            self.load_recent_heart_rate()
-            self.main_window.refresh_all()
-            
         except Exception as e:
             self.logger.error(f"Error generating sample data: {e}")
             self.hist_status.config(text=f"Lỗi: {e}", foreground='red')
@@ -853,8 +844,6 @@ class InputTab:
             if success:
                 messagebox.showinfo("Thành công", f"Đã lưu: {sleep_hours:.1f} giờ - {quality}")
                 self.clear_sleep_form()
-                self.load_recent_sleep()
-                self.main_window.refresh_all()
             else:
                 messagebox.showerror("Lỗi", "Không thể lưu giấc ngủ")
         except Exception as e:
@@ -900,8 +889,6 @@ class InputTab:
             if success:
                 messagebox.showinfo("Thành công", f"Đã lưu nhịp tim: {bpm} BPM\nHoạt động: {activity}")
                 self.clear_heart_rate_form()
-                self.load_recent_heart_rate()
-                self.main_window.refresh_all()
             else:
                 messagebox.showerror("Lỗi", "Không thể lưu nhịp tim")
         except Exception as e:
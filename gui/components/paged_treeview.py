@@ -0,0 +1,222 @@
+# gui/components/paged_treeview.py
+import tkinter as tk
+from tkinter import ttk
+import logging
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+class PagedTreeview:
+    """
+    Gắn vào một ttk.Treeview để chỉ giữ một cửa sổ vài trang bản ghi
+
+    Khi cuộn gần cuối, trang cũ hơn được tải (keyset theo khóa của bản ghi
+    cuối cùng) và trang đầu bị bỏ đi; cuộn gần đầu thì ngược lại. Nhờ vậy số
+    dòng thật sự nằm trong Treeview luôn bị giới hạn dù dữ liệu có hàng trăm
+    nghìn bản ghi.
+
+    Nếu có loader, truy vấn trang chạy trên thread nền (kênh channel) và
+    trang được chèn vào Treeview trong callback trên main thread.
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar,
+                 fetch_page: Callable[..., List[Dict]],
+                 format_row: Callable[[Dict], Tuple],
+                 key_func: Callable[[Dict], Tuple],
+                 iid_func: Callable[[Dict], str] = None,
+                 page_size: int = 200, max_pages: int = 3, threshold: float = 0.1,
+                 loader=None, channel: str = None):
+        """
+        Args:
+            tree: Treeview hiển thị dữ liệu
+            scrollbar: Thanh cuộn dọc của tree
+            fetch_page: Hàm(after=None, before=None, limit=...) trả về một trang, mới nhất trước
+            format_row: Chuyển bản ghi thành tuple values của Treeview
+            key_func: Khóa keyset của bản ghi
+            iid_func: ID dòng trong Treeview (mặc định để Treeview tự sinh)
+            page_size: Số bản ghi mỗi trang
+            max_pages: Số trang tối đa giữ trong Treeview
+            threshold: Khoảng cách (tỉ lệ) tới mép để tải trang tiếp
+            loader: BackgroundLoader chạy fetch_page (None = tải ngay trên main thread)
+            channel: Kênh của loader dành riêng cho Treeview này
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.format_row = format_row
+        self.key_func = key_func
+        self.iid_func = iid_func
+        self.page_size = page_size
+        self.max_pages = max(max_pages, 2)
+        self.threshold = threshold
+        self.loader = loader
+        self.channel = channel or f"page-{id(self)}"
+        self.logger = logging.getLogger(__name__)
+
+        # Mỗi trang: danh sách (iid, bản ghi)
+        self._pages = deque()
+        self._has_older = False
+        self._has_newer = False
+        self._scheduled = None
+        # Tăng mỗi lần reset: trang tải cho lần hiển thị trước bị bỏ qua
+        self._generation = 0
+
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+
+    def reset(self, first_page: List[Dict]):
+        """Hiển thị lại từ đầu với trang đầu tiên đã tải sẵn"""
+        if self._scheduled is not None:
+            self.tree.after_cancel(self._scheduled)
+            self._scheduled = None
+        if self.loader is not None:
+            self.loader.cancel(self.channel)
+        self._generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self._pages.clear()
+        self._has_newer = False
+        self._has_older = len(first_page) >= self.page_size
+        page = self._insert_rows(first_page, 'end')
+        if page:
+            self._pages.append(page)
+        self.tree.yview_moveto(0)
+
+    def records(self) -> List[Dict]:
+        """Các bản ghi đang được giữ trong Treeview"""
+        return [record for page in self._pages for _, record in page]
+
+    def get_record(self, iid: str) -> Optional[Dict]:
+        """Bản ghi của một dòng đang hiển thị (None nếu không còn trong Treeview)"""
+        for page in self._pages:
+            for row_iid, record in page:
+                if row_iid == iid:
+                    return record
+        return None
+
+    def update(self, iid: str, record: Dict):
+        """Thay bản ghi của một dòng và vẽ lại đúng dòng đó"""
+        for page in self._pages:
+            for index, (row_iid, _) in enumerate(page):
+                if row_iid == iid:
+                    page[index] = (iid, record)
+                    self.tree.item(iid, values=self.format_row(record))
+                    return
+
+    def remove(self, iids: Iterable[str]):
+        """Bỏ các dòng (vd: bản ghi đã xóa) mà không tải lại trang"""
+        iids = set(iids)
+        pages = ([(iid, record) for iid, record in page if iid not in iids] for page in self._pages)
+        self._pages = deque(page for page in pages if page)
+        existing = [iid for iid in iids if self.tree.exists(iid)]
+        if existing:
+            self.tree.delete(*existing)
+        if not self._pages and (self._has_older or self._has_newer):
+            # Không còn bản ghi nào làm khóa keyset: tải lại trang đầu tiên
+            self._request(lambda: self.fetch_page(limit=self.page_size), self.reset)
+
+    @property
+    def loading(self) -> bool:
+        """Đang chờ tải một trang"""
+        return self._scheduled is not None or (self.loader is not None and self.loader.is_pending(self.channel))
+
+    @property
+    def materialized_count(self) -> int:
+        """Số dòng đang nằm trong Treeview"""
+        return sum(len(page) for page in self._pages)
+
+    def _insert_rows(self, records: List[Dict], position):
+        rows = []
+        for offset, record in enumerate(records):
+            index = position if position == 'end' else position + offset
+            iid = self.iid_func(record) if self.iid_func else None
+            if iid is not None and self.tree.exists(iid):
+                continue
+            iid = self.tree.insert('', index, iid=iid, values=self.format_row(record))
+            rows.append((iid, record))
+        return rows
+
+    def _drop_page(self, page) -> int:
+        for iid, _ in page:
+            if self.tree.exists(iid):
+                self.tree.delete(iid)
+        return len(page)
+
+    def _request(self, job: Callable[[], List[Dict]], apply: Callable[[List[Dict]], None]):
+        """Chạy truy vấn trang (trên loader nếu có) rồi áp dụng kết quả trên main thread"""
+        generation = self._generation
+
+        def done(records):
+            if generation == self._generation:
+                apply(records)
+
+        if self.loader is None:
+            try:
+                done(job())
+            except Exception as e:
+                self._on_load_error(e)
+        else:
+            self.loader.submit(self.channel, job, done, self._on_load_error)
+
+    def _on_load_error(self, error):
+        self.logger.error(f"Error loading page: {error}")
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if not self._pages or self.loading:
+            return
+
+        first, last = float(first), float(last)
+        if last >= 1 - self.threshold and self._has_older:
+            self._scheduled = self.tree.after_idle(self._load_older)
+        elif first <= self.threshold and self._has_newer:
+            self._scheduled = self.tree.after_idle(self._load_newer)
+
+    def _load_older(self):
+        """Tải trang cũ hơn (keyset sau bản ghi cuối cùng)"""
+        self._scheduled = None
+        if self._pages:
+            after = self.key_func(self._pages[-1][-1][1])
+            self._request(lambda: self.fetch_page(after=after, limit=self.page_size), self._append_older)
+
+    def _load_newer(self):
+        """Tải trang mới hơn (keyset trước bản ghi đầu tiên)"""
+        self._scheduled = None
+        if self._pages:
+            before = self.key_func(self._pages[0][0][1])
+            self._request(lambda: self.fetch_page(before=before, limit=self.page_size), self._prepend_newer)
+
+    def _append_older(self, records: List[Dict]):
+        """Chèn trang cũ hơn vào cuối, bỏ trang đầu nếu vượt giới hạn"""
+        try:
+            self._has_older = len(records) >= self.page_size
+            if not records:
+                return
+
+            page = self._insert_rows(records, 'end')
+            if not page:
+                return
+            self._pages.append(page)
+            if len(self._pages) > self.max_pages:
+                dropped = self._drop_page(self._pages.popleft())
+                self._has_newer = True
+                # Giữ nguyên các dòng đang nhìn thấy
+                self.tree.yview_scroll(-dropped, 'units')
+        except tk.TclError as e:
+            self.logger.error(f"Error loading older page: {e}")
+
+    def _prepend_newer(self, records: List[Dict]):
+        """Chèn trang mới hơn vào đầu, bỏ trang cuối nếu vượt giới hạn"""
+        try:
+            self._has_newer = len(records) >= self.page_size
+            if not records:
+                return
+
+            page = self._insert_rows(records, 0)
+            if not page:
+                return
+            self._pages.appendleft(page)
+            if len(self._pages) > self.max_pages:
+                self._drop_page(self._pages.pop())
+                self._has_older = True
+            # Giữ nguyên các dòng đang nhìn thấy
+            self.tree.yview_scroll(len(page), 'units')
+        except tk.TclError as e:
+            self.logger.error(f"Error loading newer page: {e}")
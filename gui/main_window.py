@@ -2,6 +2,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import logging
+import queue
+import threading
+from database.change_bus import RECORD_TYPES
 from database.db_manager import DatabaseManager
 from utils.alert_system import AlertSystem
 from utils.chart_generator import ChartGenerator
@@ -10,8 +13,16 @@ from .components.dashboard_tab import DashboardTab
 from .components.input_tab import InputTab
 from .components.charts_tab import ChartsTab
 from .components.history_tab import HistoryTab
+from .background_loader import BackgroundLoader
+from .refresh_scheduler import RefreshScheduler
 from .theme import AppTheme
 
+# Khóa làm mới của các tab, theo thứ tự trên notebook (trùng tên kênh của loader)
+TAB_KEYS = ('dashboard', 'input', 'charts', 'history')
+
+# Chu kỳ (ms) nhận thay đổi dữ liệu do thread nền ghi (ví dụ nhập file)
+CHANGE_POLL_INTERVAL = 500
+
 class MainWindow:
     """Cửa sổ chính của ứng dụng"""
     
@@ -29,8 +40,23 @@ class MainWindow:
         )
         
         self.setup_window()
+        
+        # Tải dữ liệu trên thread nền, giao diện không bị treo
+        self.loader = BackgroundLoader(self.root, on_busy_changed=self.set_busy)
+        # Gộp các yêu cầu làm mới dồn dập (chuyển tab, đổi bộ lọc)
+        self.scheduler = RefreshScheduler(self.root)
+        
+        # Thay đổi dữ liệu từ DatabaseManager: tab bị ảnh hưởng được đánh dấu
+        # cần tải lại và chỉ được làm mới khi đang hiển thị
+        self._changes = queue.Queue()
+        self._dirty = {}
+        self._flush_job = None
+        self._poll_job = None
+        self._unsubscribe = self.db.changes.subscribe(self.on_data_changed, user_id=user['user_id'])
+        
         self.setup_ui()
         self.load_initial_data()
+        self._poll_changes()
     
     def setup_window(self):
         """Thiết lập cửa sổ chính"""
@@ -114,6 +140,11 @@ class MainWindow:
         self.input_tab = InputTab(self.notebook, self)
         self.charts_tab = ChartsTab(self.notebook, self)
         self.history_tab = HistoryTab(self.notebook, self)
+        # Theo thứ tự trên notebook
+        self.tabs = [self.dashboard_tab, self.input_tab, self.charts_tab, self.history_tab]
+        # Biểu đồ và lịch sử được tải lần đầu khi mở tab
+        self._dirty = {2: set(RECORD_TYPES), 3: set(RECORD_TYPES)}
+        self.scheduler.invalidate()
         
         # Add tabs to notebook
         self.notebook.add(self.dashboard_tab.frame, text="🏠 Tổng quan")
@@ -129,8 +160,11 @@ class MainWindow:
         status_frame = ttk.Frame(parent, relief=tk.SUNKEN, borderwidth=1)
         status_frame.pack(fill=tk.X, pady=(10, 0))
         
+        # Chỉ báo đang tải (ẩn khi rảnh)
+        self.busy_bar = ttk.Progressbar(status_frame, mode='indeterminate', length=120)
+        
         self.status_label = ttk.Label(status_frame, text="Sẵn sàng", relief=tk.SUNKEN, anchor=tk.W)
-        self.status_label.pack(fill=tk.X, padx=5, pady=2)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=2)
     
     def get_bmi_classification(self):
         """Lấy phân loại BMI hiện tại"""
@@ -145,13 +179,16 @@ class MainWindow:
     
     def load_initial_data(self):
         """Tải dữ liệu ban đầu"""
-        self.update_current_stats()
+        # Dashboard cập nhật luôn thống kê ở header từ cùng một snapshot
         self.dashboard_tab.refresh_data()
         self.set_status("Tải dữ liệu thành công")
     
-    def update_current_stats(self):
-        """Cập nhật thống kê hiện tại"""
-        current_weight = self.db.get_current_weight(self.user['user_id'])
+    def update_current_stats(self, snapshot: dict = None):
+        """Cập nhật thống kê hiện tại (dùng snapshot của dashboard nếu có)"""
+        if snapshot is not None:
+            current_weight = snapshot['current_weight']
+        else:
+            current_weight = self.db.get_current_weight(self.user['user_id'])
         
         if current_weight:
             from utils.bmi_calculator import BMICalculator
@@ -172,19 +209,95 @@ class MainWindow:
         if tab_index < len(tab_names):
             self.set_status(f"Đang xem: {tab_names[tab_index]}")
             
-            # Refresh tab data when selected
-            if tab_index == 0:  # Dashboard
-                self.dashboard_tab.refresh_data()
-            elif tab_index == 2:  # Charts
-                self.charts_tab.refresh_charts()
-            elif tab_index == 3:  # History
-                self.history_tab.refresh_data()
+            # Bỏ các job tải của tab khác còn đang chờ (nhập / xuất file vẫn tiếp tục);
+            # tab bị hủy tải được đánh dấu để tải lại khi mở lại
+            for index, key in enumerate(TAB_KEYS):
+                if index != tab_index and self.loader.is_pending(key):
+                    self._dirty.setdefault(index, set()).update(RECORD_TYPES)
+            self.loader.cancel_all(keep=(TAB_KEYS[tab_index], 'import', 'npz'))
+            
+            # Chỉ tải lại khi dữ liệu của tab đã thay đổi từ lần hiển thị trước
+            self.refresh_current_tab()
+    
+    def on_data_changed(self, change):
+        """Nhận DataChange từ DatabaseManager (có thể gọi trên thread nền)"""
+        self._changes.put(change)
+        if threading.current_thread() is threading.main_thread() and self._flush_job is None:
+            # Gộp các lần ghi của cùng một thao tác thành một lần làm mới
+            self._flush_job = self.root.after_idle(self.flush_changes)
+    
+    def _poll_changes(self):
+        """Định kỳ xử lý thay đổi do thread nền phát ra"""
+        self.flush_changes()
+        self._poll_job = self.root.after(CHANGE_POLL_INTERVAL, self._poll_changes)
+    
+    def flush_changes(self, handled_by=None):
+        """
+        Đánh dấu các tab bị ảnh hưởng bởi các thay đổi đang chờ và làm mới tab đang xem
+        
+        Args:
+            handled_by: Tab đã tự cập nhật theo thay đổi của chính nó (không đánh dấu)
+        """
+        if self._flush_job is not None:
+            self.root.after_cancel(self._flush_job)
+            self._flush_job = None
+        
+        changed_types = set()
+        while True:
+            try:
+                change = self._changes.get_nowait()
+            except queue.Empty:
+                break
+            changed_types.add(change.record_type)
+            for index, tab in enumerate(self.tabs):
+                if tab is not handled_by and tab.is_affected(change):
+                    self._dirty.setdefault(index, set()).add(change.record_type)
+        
+        if not changed_types:
+            return
+        if 'weight' in changed_types:
+            self.update_current_stats()
+        self.refresh_current_tab()
+    
+    def current_tab_index(self):
+        """Vị trí tab đang hiển thị (None nếu notebook chưa sẵn sàng)"""
+        try:
+            return self.notebook.index(self.notebook.select())
+        except tk.TclError:
+            return None
+    
+    def refresh_current_tab(self):
+        """Lên lịch làm mới tab đang hiển thị nếu nó đang bị đánh dấu cần tải lại"""
+        tab_index = self.current_tab_index()
+        if tab_index in self._dirty:
+            self.scheduler.request(TAB_KEYS[tab_index], lambda: self._refresh_tab(tab_index))
+    
+    def _refresh_tab(self, tab_index):
+        """Làm mới tab nếu vẫn đang hiển thị; nếu đã chuyển đi thì tab vẫn giữ dấu cần tải lại"""
+        if self.current_tab_index() != tab_index:
+            return
+        record_types = self._dirty.pop(tab_index, None)
+        if record_types:
+            self.tabs[tab_index].apply_changes(record_types)
     
     def set_status(self, message: str):
         """Thiết lập trạng thái"""
         self.status_label.config(text=message)
         self.logger.info(f"Status: {message}")
     
+    def set_busy(self, busy: bool):
+        """Hiện/ẩn chỉ báo đang tải ở status bar"""
+        try:
+            if busy:
+                self.busy_bar.pack(side=tk.RIGHT, padx=5, pady=2)
+                self.busy_bar.start(10)
+            else:
+                self.busy_bar.stop()
+                self.busy_bar.pack_forget()
+        except (AttributeError, tk.TclError):
+            # Status bar chưa được tạo hoặc cửa sổ đã đóng
+            pass
+    
     def show_alert(self, title: str, message: str, alert_type: str = "info"):
         """Hiển thị thông báo"""
         if alert_type == "error":
@@ -195,11 +308,10 @@ class MainWindow:
             messagebox.showinfo(title, message)
     
     def refresh_all(self):
-        """Làm mới tất cả dữ liệu"""
-        self.update_current_stats()
-        self.dashboard_tab.refresh_data()
-        self.charts_tab.refresh_charts()
-        self.history_tab.refresh_data()
+        """Đánh dấu mọi tab cần tải lại; tab đang xem được làm mới ngay, các tab khác khi được mở"""
+        self._dirty = {index: set(RECORD_TYPES) for index in range(len(self.tabs))}
+        self.scheduler.invalidate()
+        self.refresh_current_tab()
         self.set_status("Đã làm mới tất cả dữ liệu")
     
     def run(self):
@@ -213,6 +325,9 @@ class MainWindow:
             self.logger.info(f"User logged out: {self.user['username']}")
             self.cleanup()
             
+            # cleanup() đã đóng pool; màn hình đăng nhập dùng lại database này
+            self.db.reopen()
+            
             # Open login window again
             from .login_window import LoginWindow
             login_window = LoginWindow(self.db)
@@ -238,5 +353,12 @@ class MainWindow:
     
     def cleanup(self):
         """Dọn dẹp tài nguyên"""
+        self._unsubscribe()
+        if hasattr(self, 'scheduler'):
+            self.scheduler.cancel()
+        if hasattr(self, 'loader'):
+            self.loader.shutdown()
         if hasattr(self, 'root'):
-            self.root.destroy()
\ No newline at end of file
+            self.root.destroy()
+        # Trả lại các kết nối đang giữ trong pool
+        self.db.close()
\ No newline at end of file
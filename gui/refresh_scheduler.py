@@ -0,0 +1,83 @@
+# gui/refresh_scheduler.py
+import logging
+import tkinter as tk
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class RefreshScheduler:
+    """
+    Gộp và trì hoãn các yêu cầu làm mới tab
+
+    Mỗi tab gửi yêu cầu theo một khóa (vd: 'charts'). Yêu cầu được chạy sau
+    một khoảng trễ bằng root.after; yêu cầu mới trên cùng khóa thay thế yêu
+    cầu đang chờ và đặt lại thời gian trễ, nên bấm chuyển tab / đổi combobox
+    liên tục chỉ dẫn tới một lần tải.
+
+    Ngoài ra scheduler ghi nhớ phiên bản dữ liệu của lần hiển thị gần nhất
+    của mỗi khóa (mark_rendered) để tab bỏ qua lần tải khi dữ liệu và bộ lọc
+    chưa đổi (is_rendered).
+    """
+
+    def __init__(self, root: tk.Misc, delay: int = 150):
+        """
+        Args:
+            root: Cửa sổ Tk dùng để lập lịch callback
+            delay: Thời gian trễ mặc định (ms)
+        """
+        self.root = root
+        self.delay = delay
+        self.logger = logging.getLogger(__name__)
+
+        self._pending: Dict[str, Tuple[Any, Callable[[], None]]] = {}
+        self._rendered: Dict[str, Hashable] = {}
+
+    def request(self, key: str, callback: Callable[[], None], delay: Optional[int] = None):
+        """
+        Yêu cầu làm mới; thay thế yêu cầu đang chờ của cùng khóa
+
+        Args:
+            key: Khóa của tab
+            callback: Hàm làm mới, chạy trên main thread sau thời gian trễ
+            delay: Thời gian trễ (ms), mặc định self.delay
+        """
+        self.cancel(key)
+        job = self.root.after(self.delay if delay is None else delay, lambda: self._run(key))
+        self._pending[key] = (job, callback)
+
+    def cancel(self, key: str = None):
+        """Hủy yêu cầu đang chờ của một khóa (None = mọi khóa)"""
+        keys = list(self._pending) if key is None else [key]
+        for name in keys:
+            entry = self._pending.pop(name, None)
+            if entry is not None:
+                try:
+                    self.root.after_cancel(entry[0])
+                except tk.TclError:
+                    pass
+
+    def is_pending(self, key: str) -> bool:
+        """Khóa còn yêu cầu đang chờ hay không"""
+        return key in self._pending
+
+    def mark_rendered(self, key: str, version: Hashable):
+        """Ghi nhận phiên bản dữ liệu vừa được hiển thị"""
+        self._rendered[key] = version
+
+    def is_rendered(self, key: str, version: Hashable) -> bool:
+        """Phiên bản này đã được hiển thị ở lần gần nhất chưa"""
+        return version is not None and self._rendered.get(key) == version
+
+    def invalidate(self, key: str = None):
+        """Quên phiên bản đã hiển thị để lần làm mới sau luôn tải lại (None = mọi khóa)"""
+        if key is None:
+            self._rendered.clear()
+        else:
+            self._rendered.pop(key, None)
+
+    def _run(self, key: str):
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return
+        try:
+            entry[1]()
+        except Exception as e:
+            self.logger.error(f"Error refreshing '{key}': {e}")
@@ -20,14 +20,17 @@ def main():
     try:
         logging.info("Khởi động ứng dụng Theo dõi Sức khỏe")
         
-        # Khởi tạo database
-        db_manager = DatabaseManager()
+        # Khởi tạo database; ứng dụng chủ động chuyển file của mình sang WAL
+        # (profile "performance", xem PRAGMA_PROFILES)
+        db_manager = DatabaseManager(profile="performance")
         db_manager.init_database()
         
         # Hiển thị màn hình đăng nhập
         login_window = LoginWindow(db_manager)
         login_window.run()
         
+        db_manager.close()
+        
     except Exception as e:
         logging.error(f"Lỗi khởi chạy ứng dụng: {e}")
         messagebox.showerror("Lỗi", f"Không thể khởi chạy ứng dụng: {e}")
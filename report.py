@@ -0,0 +1,42 @@
+# report.py
+"""
+Xuất báo cáo biểu đồ cho một hoặc nhiều user, không cần màn hình
+
+Chạy: python report.py --output reports [--users 1 2] [--period week] [--formats png pdf]
+"""
+import argparse
+import logging
+import sys
+
+from utils.chart_generator import CHART_RECORD_TYPES
+from utils.report_renderer import REPORT_FORMATS, REPORT_PERIODS, render_reports
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def main(argv=None) -> int:
+    """Hàm chính của công cụ xuất báo cáo"""
+    parser = argparse.ArgumentParser(description="Xuất báo cáo biểu đồ sức khỏe")
+    parser.add_argument("--db", default="health_app.db", help="File database SQLite")
+    parser.add_argument("--output", default="reports", help="Thư mục lưu báo cáo")
+    parser.add_argument("--users", type=int, nargs="+", help="ID user (mặc định tất cả)")
+    parser.add_argument("--charts", nargs="+", choices=list(CHART_RECORD_TYPES),
+                        help="Loại biểu đồ (mặc định tất cả)")
+    parser.add_argument("--period", choices=list(REPORT_PERIODS), default="week", help="Khoảng thời gian")
+    parser.add_argument("--formats", nargs="+", choices=REPORT_FORMATS, default=["png"], help="Định dạng file")
+    parser.add_argument("--dpi", type=int, default=150, help="Độ phân giải ảnh PNG")
+    parser.add_argument("--workers", type=int, help="Số process song song (mặc định số CPU)")
+    args = parser.parse_args(argv)
+
+    results = render_reports(args.db, args.output, user_ids=args.users, chart_types=args.charts,
+                             period=args.period, formats=args.formats, dpi=args.dpi,
+                             workers=args.workers)
+
+    files = sum(len(paths) for paths in results.values())
+    logging.info(f"Rendered {files} files for {len(results)} users into {args.output}")
+    return 0 if results else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
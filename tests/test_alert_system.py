@@ -0,0 +1,107 @@
+# tests/test_alert_system.py
+import unittest
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.alert_state import build_alert_state, merge_alert_state
+from database.db_manager import DatabaseManager
+from utils.alert_system import AlertSystem
+
+def days_ago(n: int) -> str:
+    return (date.today() - timedelta(days=n)).isoformat()
+
+class TestAlertSystem(unittest.TestCase):
+    """Test cases cho cảnh báo dựa trên trạng thái cửa sổ trượt"""
+
+    def setUp(self):
+        self.test_db_file = tempfile.mktemp(suffix='.db')
+        self.db = DatabaseManager(self.test_db_file)
+        self.db.init_database()
+        self.db.create_user("alerter", "password", "Alert User", 170.0)
+        self.user_id = self.db.authenticate_user("alerter", "password")['user_id']
+        self.alerts = AlertSystem(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.test_db_file + suffix):
+                os.unlink(self.test_db_file + suffix)
+
+    def alert_types(self, **kwargs):
+        return {alert['type'] for alert in self.alerts.get_all_alerts(self.user_id, **kwargs)}
+
+    def test_state_updated_on_add(self):
+        """Test mỗi add_* cập nhật trạng thái, bản ghi ngoài cửa sổ bị bỏ"""
+        self.db.add_weight_record(self.user_id, 70.0, days_ago(30))
+        self.db.add_weight_record(self.user_id, 72.0, days_ago(1))
+        self.db.add_weight_record(self.user_id, 71.0, days_ago(1))
+        self.db.add_activity(self.user_id, "Đi bộ", 100, date=days_ago(0))
+        self.db.add_activity(self.user_id, "Chạy bộ", 80, date=days_ago(0))
+        self.db.add_heart_rate_record(self.user_id, days_ago(0), "08:00", 70)
+        self.db.add_heart_rate_record(self.user_id, days_ago(0), "07:00", 65)
+        self.db.add_heart_rate_record(self.user_id, days_ago(1), "09:00", 60)
+
+        state = self.db.get_alert_state(self.user_id)
+        self.assertEqual(state['weight']['days'], {days_ago(1): 71.0})
+        self.assertEqual(state['activity']['days'], {days_ago(0): 180})
+        self.assertEqual([r[1] for r in state['heart_rate']['latest']], ["08:00", "07:00"])
+        self.assertEqual(state['sleep']['days'], {})
+
+        # Trạng thái cập nhật dần phải khớp với dựng lại từ bảng
+        conn = self.db.get_connection()
+        try:
+            for record_type, expected in state.items():
+                self.assertEqual(build_alert_state(conn, self.user_id, record_type), expected)
+        finally:
+            conn.close()
+
+    def test_alerts_from_state(self):
+        """Test các cảnh báo cũ vẫn được phát hiện"""
+        self.assertEqual(self.alert_types(), {'no_activity', 'no_data_week'})
+
+        for i, weight in enumerate([66.0, 67.0, 68.0, 69.0, 70.0, 71.0, 74.0]):
+            self.db.add_weight_record(self.user_id, weight, days_ago(6 - i))
+        for i in range(3):
+            self.db.add_sleep_record(self.user_id, days_ago(i), 5.0, "Không tốt")
+        self.db.add_activity(self.user_id, "Chạy bộ", 320, date=days_ago(2))
+        self.db.add_heart_rate_record(self.user_id, days_ago(0), "07:00", 65)
+        self.db.add_heart_rate_record(self.user_id, days_ago(0), "08:00", 125)
+
+        types = self.alert_types(current_weight=74.0, current_bmi=25.6)
+        self.assertTrue({'weight_change', 'insufficient_sleep', 'poor_sleep_quality',
+                         'active_achievement', 'tachycardia', 'heart_rate_spike'} <= types)
+        self.assertTrue(types & {'rapid_weight_loss', 'rapid_weight_gain'})
+        self.assertNotIn('no_data_week', types)
+
+    def test_bulk_and_direct_writes_rebuild_state(self):
+        """Test bulk insert và dữ liệu ghi thẳng vào bảng đều được tính"""
+        self.db.add_sleep_records_bulk(self.user_id, [
+            {'record_date': days_ago(i), 'sleep_hours': 10.0} for i in range(10)
+        ])
+        self.assertIn('excessive_sleep', self.alert_types())
+
+        conn = self.db.get_connection()
+        try:
+            conn.execute("DELETE FROM alert_state")
+            conn.execute("INSERT INTO heart_rate_records (user_id, record_date, record_time, bpm) "
+                         "VALUES (?, ?, '08:00', 35)", (self.user_id, days_ago(0)))
+            conn.commit()
+        finally:
+            conn.close()
+        types = self.alert_types()
+        self.assertIn('bradycardia', types)
+        self.assertIn('excessive_sleep', types)
+
+    def test_merge_prunes_window(self):
+        """Test merge bỏ các ngày đã ra khỏi cửa sổ"""
+        today = date(2024, 1, 10)
+        state = {'days': {'2024-01-01': 30, '2024-01-05': 20}}
+        merged = merge_alert_state('activity', state, ('2024-01-05', 10), today)
+        self.assertEqual(merged, {'days': {'2024-01-05': 30}})
+        self.assertEqual(merge_alert_state('activity', merged, ('2023-12-01', 10), today), merged)
+
+if __name__ == '__main__':
+    unittest.main()
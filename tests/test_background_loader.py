@@ -0,0 +1,113 @@
+# tests/test_background_loader.py
+import unittest
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gui.background_loader import BackgroundLoader
+
+class FakeRoot:
+    """Thay cho tk.Tk trong test: chỉ ghi lại các callback của after()"""
+
+    def __init__(self):
+        self.pending = {}
+        self._next_id = 0
+
+    def after(self, delay, callback):
+        self._next_id += 1
+        job_id = f"after#{self._next_id}"
+        self.pending[job_id] = callback
+        return job_id
+
+    def after_cancel(self, job_id):
+        self.pending.pop(job_id, None)
+
+    def run_pending(self):
+        jobs, self.pending = self.pending, {}
+        for callback in jobs.values():
+            callback()
+
+class TestBackgroundLoader(unittest.TestCase):
+    """Test cases cho BackgroundLoader"""
+
+    def setUp(self):
+        self.root = FakeRoot()
+        self.busy_states = []
+        self.loader = BackgroundLoader(self.root, on_busy_changed=self.busy_states.append)
+
+    def tearDown(self):
+        self.loader.shutdown()
+
+    def wait_for(self, channel, timeout=5):
+        """Chạy vòng poll cho tới khi kênh không còn job"""
+        deadline = time.time() + timeout
+        while self.loader.is_pending(channel) and time.time() < deadline:
+            time.sleep(0.01)
+            self.root.run_pending()
+
+    def test_result_delivered_on_main_thread(self):
+        """Test kết quả được trả về qua vòng poll của main thread"""
+        results = []
+        main_thread = threading.current_thread()
+
+        self.loader.submit('charts', lambda: threading.current_thread(),
+                           lambda worker: results.append((worker, threading.current_thread())))
+        self.wait_for('charts')
+
+        self.assertEqual(len(results), 1)
+        worker, caller = results[0]
+        self.assertIsNot(worker, main_thread)
+        self.assertIs(caller, main_thread)
+        self.assertEqual(self.busy_states, [True, False])
+
+    def test_stale_result_dropped(self):
+        """Test job cũ trên cùng kênh bị bỏ qua khi có job mới"""
+        release = threading.Event()
+        results = []
+
+        def slow_job():
+            release.wait(5)
+            return 'old'
+
+        self.loader.submit('history', slow_job, results.append)
+        self.loader.submit('history', lambda: 'new', results.append)
+        release.set()
+        self.wait_for('history')
+        time.sleep(0.05)
+        self.root.run_pending()
+
+        self.assertEqual(results, ['new'])
+
+    def test_cancel_all_keeps_channel(self):
+        """Test hủy các kênh khác khi chuyển tab"""
+        release = threading.Event()
+        results = []
+
+        self.loader.submit('charts', lambda: release.wait(5) and 'charts', results.append)
+        self.loader.submit('dashboard', lambda: 'dashboard', results.append)
+        self.loader.cancel_all(keep='dashboard')
+        release.set()
+        self.wait_for('dashboard')
+        time.sleep(0.05)
+        self.root.run_pending()
+
+        self.assertEqual(results, ['dashboard'])
+        self.assertFalse(self.loader.is_pending('charts'))
+
+    def test_error_callback(self):
+        """Test lỗi trong job được chuyển tới on_error"""
+        errors = []
+
+        def failing_job():
+            raise ValueError("boom")
+
+        self.loader.submit('dashboard', failing_job, lambda r: None, errors.append)
+        self.wait_for('dashboard')
+
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ValueError)
+
+if __name__ == '__main__':
+    unittest.main()
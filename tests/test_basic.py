@@ -1,12 +1,13 @@
 # tests/test_basic.py
 import unittest
+import unittest.mock
 import os
 import tempfile
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.db_manager import DatabaseManager
-from utils.bmi_calculator import BMICalculator
+from utils.bmi_calculator import BMI_CATEGORIES, BMICalculator
 from utils.validators import HealthDataValidator
 
 class TestHealthApp(unittest.TestCase):
@@ -112,6 +113,27 @@ class TestHealthApp(unittest.TestCase):
             category_info = BMICalculator.get_bmi_category(bmi)
             self.assertEqual(category_info['category'], expected_category)
     
+    def test_bmi_many_matches_scalar(self):
+        """Test API mảng cho cùng kết quả với từng giá trị"""
+        weights = [50, 65, 72.4, 80, 110]
+        bmis = BMICalculator.calculate_bmi_many(weights, 1.70)
+        self.assertEqual([float(b) for b in bmis],
+                         [BMICalculator.calculate_bmi(w, 1.70) for w in weights])
+        
+        # Giá trị đúng ngưỡng thuộc nhóm cao hơn
+        values = [17.0, 18.5, 22.9, 23.0, 25.0, 30.0, 35.0]
+        codes = [int(c) for c in BMICalculator.categorize_many(values)]
+        self.assertEqual(codes, [0, 1, 1, 2, 3, 4, 4])
+        for bmi, code in zip(values, codes):
+            self.assertIs(BMICalculator.get_bmi_category(bmi), BMI_CATEGORIES[code])
+        
+        # BMI thiếu / không hữu hạn không được xếp vào nhóm nào
+        self.assertEqual(BMICalculator.categorize_many([None, 22.0, float('nan'), float('inf')]),
+                         [None, 1, None, None])
+        with unittest.mock.patch('utils.bmi_calculator.np', None):
+            self.assertEqual(BMICalculator.categorize_many([None, 22.0, float('nan'), 30.0]),
+                             [None, 1, None, 4])
+    
     def test_weight_validation(self):
         """Test validation cân nặng"""
         # Valid weights
@@ -148,6 +170,29 @@ class TestHealthApp(unittest.TestCase):
         self.assertFalse(HealthDataValidator.validate_activity_duration(500)[0])  # Too high
         self.assertFalse(HealthDataValidator.validate_activity_duration(-10)[0])  # Negative
     
+    def test_records_batch_validation(self):
+        """Test validate theo lô chỉ trả thông báo cho dòng lỗi"""
+        rows = [
+            {'record_date': '2024-01-01', 'record_time': '08:00', 'bpm': 72},
+            {'record_date': '2024-02-30', 'record_time': '08:00', 'bpm': 72},
+            {'record_date': '2024-01-01', 'record_time': '8h', 'bpm': 72},
+            {'record_date': '2024-01-01', 'record_time': '08:01', 'bpm': 250},
+            {'record_date': '2024-01-01', 'record_time': '08:02', 'bpm': 'abc'},
+        ]
+        error_mask, messages = HealthDataValidator.validate_records_batch('heart_rate', rows)
+        self.assertEqual(list(error_mask), [False, True, True, True, True])
+        self.assertEqual(sorted(messages), [1, 2, 3, 4])
+        self.assertIn("ngày", messages[1])
+        self.assertIn("30-220", messages[3])
+        
+        activities = [
+            {'date': '2024-01-01', 'activity_type': 'Yoga', 'duration': 30, 'intensity': None},
+            {'date': '2024-01-01', 'activity_type': 'Golf', 'duration': 30, 'intensity': 'low'},
+            {'date': '2024-01-01', 'activity_type': 'Gym', 'duration': 0, 'intensity': 'low'},
+        ]
+        error_mask, messages = HealthDataValidator.validate_records_batch('activity', activities)
+        self.assertEqual(list(error_mask), [False, True, True])
+    
     def test_username_validation(self):
         """Test validation username"""
         # Valid usernames
@@ -0,0 +1,96 @@
+# tests/test_change_bus.py
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.change_bus import DataChange, DataChangeBus
+from database.db_manager import DatabaseManager
+
+class TestDataChangeBus(unittest.TestCase):
+    """Test cases cho bus thông báo thay đổi dữ liệu"""
+
+    def test_subscribe_filters_and_unsubscribe(self):
+        """Test lọc theo loại bản ghi / user và hủy đăng ký"""
+        bus = DataChangeBus()
+        received, weights = [], []
+        unsubscribe = bus.subscribe(received.append, user_id=1)
+        bus.subscribe(weights.append, record_types=['weight'])
+
+        bus.publish(DataChange(1, 'weight', '2024-01-01', '2024-01-01'))
+        bus.publish(DataChange(2, 'weight'))
+        bus.publish(DataChange(1, 'sleep'))
+        self.assertEqual([c.record_type for c in received], ['weight', 'sleep'])
+        self.assertEqual([c.user_id for c in weights], [1, 2])
+
+        unsubscribe()
+        bus.publish(DataChange(1, 'activity'))
+        self.assertEqual(len(received), 2)
+
+    def test_subscriber_error_does_not_stop_others(self):
+        """Test lỗi trong một subscriber không ảnh hưởng subscriber khác"""
+        bus = DataChangeBus()
+        received = []
+
+        def broken(change):
+            raise RuntimeError("boom")
+
+        bus.subscribe(broken)
+        bus.subscribe(received.append)
+        with self.assertLogs('database.change_bus', level='ERROR'):
+            bus.publish(DataChange(1, 'weight'))
+        self.assertEqual(len(received), 1)
+
+    def test_overlaps(self):
+        """Test so khớp khoảng ngày (None = không giới hạn)"""
+        change = DataChange(1, 'sleep', '2024-01-05', '2024-01-10')
+        self.assertTrue(change.overlaps('2024-01-10', None))
+        self.assertTrue(change.overlaps(None, '2024-01-05'))
+        self.assertFalse(change.overlaps('2024-01-11', '2024-02-01'))
+        self.assertFalse(change.overlaps(None, '2024-01-04'))
+        self.assertTrue(DataChange(1, 'sleep').overlaps('2030-01-01', '2030-01-02'))
+
+class TestDatabaseChanges(unittest.TestCase):
+    """Test DatabaseManager phát thay đổi sau mỗi lần ghi"""
+
+    def setUp(self):
+        self.test_db_file = tempfile.mktemp(suffix='.db')
+        self.db = DatabaseManager(self.test_db_file)
+        self.db.init_database()
+        self.db.create_user("notifier", "password", "Notify User", 170.0)
+        self.user_id = self.db.authenticate_user("notifier", "password")['user_id']
+        self.changes = []
+        self.db.changes.subscribe(self.changes.append)
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.test_db_file + suffix):
+                os.unlink(self.test_db_file + suffix)
+
+    def test_writes_publish_changes(self):
+        """Test thêm / bulk / sửa / xóa đều phát DataChange với khoảng ngày đã ghi"""
+        self.db.add_weight_record(self.user_id, 70.0, '2024-01-03')
+        self.db.add_sleep_records_bulk(self.user_id, [
+            {'record_date': '2024-01-05', 'sleep_hours': 7.0},
+            {'record_date': '2024-01-01', 'sleep_hours': 8.0},
+        ])
+        self.assertEqual(self.changes, [
+            DataChange(self.user_id, 'weight', '2024-01-03', '2024-01-03'),
+            DataChange(self.user_id, 'sleep', '2024-01-01', '2024-01-05'),
+        ])
+
+        record_id = self.db.get_sleep_records(self.user_id, days=100000)[0]['sleep_id']
+        self.db.update_record('sleep', self.user_id, record_id, {'notes': 'ok'})
+        self.db.delete_record('sleep', self.user_id, record_id)
+        self.assertEqual([c.record_type for c in self.changes[2:]], ['sleep', 'sleep'])
+
+    def test_failed_write_publishes_nothing(self):
+        """Test lần ghi không thay đổi gì thì không phát thông báo"""
+        self.db.add_sleep_records_bulk(self.user_id, [])
+        self.assertEqual(self.db.delete_records('sleep', self.user_id, [12345]), 0)
+        self.assertEqual(self.changes, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_chart_generator.py
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    from utils.chart_generator import ChartGenerator
+    HAS_MATPLOTLIB = True
+except ImportError:
+    HAS_MATPLOTLIB = False
+
+@unittest.skipUnless(HAS_MATPLOTLIB, "matplotlib chưa được cài đặt")
+class TestChartGeneratorCache(unittest.TestCase):
+    """Test cases cho cache biểu đồ"""
+    
+    def setUp(self):
+        self.generator = ChartGenerator(cache_size=2)
+        self.weight_data = [
+            {'date': '2024-01-01', 'weight': 65.0, 'bmi': 22.5, 'notes': None},
+            {'date': '2024-01-02', 'weight': 64.8, 'bmi': 22.4, 'notes': None},
+        ]
+    
+    def tearDown(self):
+        self.generator.invalidate_cache()
+    
+    def test_cache_hit_returns_same_figure(self):
+        """Test lấy lại đúng figure và dữ liệu đã lưu"""
+        fig = self.generator.create_weight_trend_chart(self.weight_data)
+        key = (1, 'weight_trend', 'week', (1,))
+        self.generator.cache_figure(key, fig, self.weight_data)
+        
+        cached_fig, payload = self.generator.get_cached_figure(key)
+        self.assertIs(cached_fig, fig)
+        self.assertIs(payload, self.weight_data)
+        self.assertIsNone(self.generator.get_cached_figure((1, 'weight_trend', 'week', (2,))))
+    
+    def test_lru_eviction(self):
+        """Test loại bỏ biểu đồ ít dùng nhất khi vượt số lượng"""
+        keys = [(1, 'bmi', 'week', (v,)) for v in range(3)]
+        for key in keys[:2]:
+            self.generator.cache_figure(key, self.generator.create_bmi_chart(self.weight_data))
+        self.generator.get_cached_figure(keys[0])
+        self.generator.cache_figure(keys[2], self.generator.create_bmi_chart(self.weight_data))
+        
+        self.assertIsNotNone(self.generator.get_cached_figure(keys[0]))
+        self.assertIsNone(self.generator.get_cached_figure(keys[1]))
+        self.assertIsNotNone(self.generator.get_cached_figure(keys[2]))
+    
+    def test_memory_cap_and_invalidate(self):
+        """Test giới hạn bộ nhớ và xóa cache theo user"""
+        generator = ChartGenerator(cache_size=10, cache_memory_mb=0.001)
+        generator.cache_figure((1, 'bmi', 'week', (0,)), generator.create_bmi_chart(self.weight_data))
+        generator.cache_figure((2, 'bmi', 'week', (0,)), generator.create_bmi_chart(self.weight_data))
+        # Luôn giữ lại figure vừa thêm dù vượt giới hạn
+        self.assertIsNone(generator.get_cached_figure((1, 'bmi', 'week', (0,))))
+        self.assertIsNotNone(generator.get_cached_figure((2, 'bmi', 'week', (0,))))
+        
+        generator.invalidate_cache(user_id=2)
+        self.assertIsNone(generator.get_cached_figure((2, 'bmi', 'week', (0,))))
+    
+    def test_trend_ticks_follow_span(self):
+        """Test trục thời gian của biểu đồ nhịp tim / giấc ngủ không chồng nhãn khi khoảng dài"""
+        from datetime import date, timedelta
+        for days, max_ticks in ((7, 8), (30, 6), (90, 13)):
+            start = date(2024, 1, 1)
+            hr_data = [{'record_date': (start + timedelta(days=i)).isoformat(), 'bpm': 70}
+                       for i in range(days)]
+            sleep_data = [{'record_date': r['record_date'], 'sleep_hours': 7.5} for r in hr_data]
+            for fig in (self.generator.create_heart_rate_trend_chart(hr_data, 'month'),
+                        self.generator.create_sleep_trend_chart(sleep_data, 'month')):
+                ticks = fig.axes[0].get_xticks()
+                self.assertLessEqual(len(ticks), max_ticks, (days, len(ticks)))
+                self.assertGreaterEqual(len(ticks), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# tests/test_columnar_io.py
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+from utils import columnar_io
+
+@unittest.skipUnless(columnar_io.HAS_NUMPY, "numpy chưa được cài đặt")
+class TestColumnarIO(unittest.TestCase):
+    """Test cases cho xuất/nhập dạng cột .npz"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'columnar.db'))
+        self.db.init_database()
+        for name in ("source", "target"):
+            self.db.create_user(name, "password", name.title(), 170.0)
+        self.source_id = self.db.authenticate_user("source", "password")['user_id']
+        self.target_id = self.db.authenticate_user("target", "password")['user_id']
+
+        self.db.add_weight_records_bulk(self.source_id, [
+            {'date': '2020-01-01', 'weight': 70.0, 'notes': 'cũ'},
+            {'date': '2024-01-01', 'weight': 68.5},
+        ])
+        self.db.add_sleep_records_bulk(self.source_id, [
+            {'record_date': '2024-01-01', 'sleep_hours': 7.5, 'sleep_quality': 'Tốt'},
+        ])
+        self.db.add_heart_rate_records_bulk(self.source_id, [
+            {'record_date': '2024-01-01', 'record_time': f'08:{m:02d}', 'bpm': 60 + m} for m in range(10)
+        ])
+        self.file_path = os.path.join(self.temp_dir, 'data.npz')
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_export_typed_columns(self):
+        """Test các cột được lưu đúng kiểu"""
+        import numpy as np
+        counts = columnar_io.export_npz(self.db, self.source_id, self.file_path)
+        self.assertEqual(counts, {'weight': 2, 'activity': 0, 'sleep': 1, 'heart_rate': 10})
+
+        tables = columnar_io.load_npz(self.file_path)
+        self.assertEqual(tables['weight']['date'].dtype, np.dtype('datetime64[D]'))
+        self.assertEqual(tables['heart_rate']['bpm'].dtype, np.dtype('int64'))
+        self.assertAlmostEqual(float(tables['weight']['weight'].mean()), 69.25)
+
+    def test_round_trip_import(self):
+        """Test nhập lại file .npz cho user khác"""
+        columnar_io.export_npz(self.db, self.source_id, self.file_path)
+        counts = columnar_io.import_npz(self.db, self.target_id, self.file_path)
+        self.assertEqual(counts, {'weight': 2, 'activity': 0, 'sleep': 1, 'heart_rate': 10})
+
+        weights = self.db.get_weight_history(self.target_id, '2000-01-01', '2100-01-01')
+        self.assertEqual([w['date'] for w in weights], ['2024-01-01', '2020-01-01'])
+        self.assertEqual(weights[1]['notes'], 'cũ')
+
+if __name__ == '__main__':
+    unittest.main()
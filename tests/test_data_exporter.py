@@ -0,0 +1,109 @@
+# tests/test_data_exporter.py
+import unittest
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+from utils.bmi_calculator import BMICalculator
+from utils.data_exporter import DataExporter
+
+class TestDataExporter(unittest.TestCase):
+    """Test cases cho xuất dữ liệu streaming"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'export.db'))
+        self.db.init_database()
+        self.db.create_user("exporter", "password", "Export User", 170.0)
+        self.user_id = self.db.authenticate_user("exporter", "password")['user_id']
+        # Dữ liệu cũ hơn 365 ngày vẫn phải được xuất
+        self.db.add_weight_records_bulk(self.user_id, [
+            {'date': f"20{10 + i // 12:02d}-{i % 12 + 1:02d}-01", 'weight': 60.0 + i * 0.1}
+            for i in range(30)
+        ])
+        self.db.add_activity(self.user_id, "Đi bộ", 30, 150.0, date="2024-01-01")
+        self.exporter = DataExporter(self.db, batch_size=7)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_iter_records_batches_full_history(self):
+        """Test duyệt theo lô trả về toàn bộ lịch sử, mới nhất trước"""
+        records = list(self.db.iter_records('weight', self.user_id, batch_size=4))
+        self.assertEqual(len(records), 30)
+        self.assertEqual(records[0]['date'], "2012-06-01")
+        self.assertEqual(records[-1]['date'], "2010-01-01")
+
+        ranged = list(self.db.iter_records('weight', self.user_id, from_date="2011-01-01", to_date="2011-12-31"))
+        self.assertEqual(len(ranged), 12)
+
+    def test_export_csv_and_ndjson(self):
+        """Test xuất CSV và NDJSON đủ số bản ghi"""
+        csv_path = os.path.join(self.temp_dir, 'weight.csv')
+        self.assertEqual(self.exporter.export_records(self.user_id, 'weight', csv_path, 'csv'), 30)
+        with open(csv_path, newline='', encoding='utf-8-sig') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0][0], 'Ngày')
+        self.assertEqual(len(rows), 31)
+        # Phân loại theo lô khớp với từng giá trị (lô 7 dòng, 30 dòng)
+        for row in rows[1:]:
+            self.assertEqual(row[3], BMICalculator.get_bmi_category(float(row[2]))['category'])
+
+        ndjson_path = os.path.join(self.temp_dir, 'weight.ndjson')
+        self.exporter.export_records(self.user_id, 'weight', ndjson_path, 'ndjson')
+        with open(ndjson_path, encoding='utf-8') as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(len(lines), 30)
+        self.assertEqual(lines[0]['weight'], 62.9)
+
+    def test_weight_csv_categories_by_batch(self):
+        """Test phân loại BMI theo lô, kể cả bản ghi chưa có BMI"""
+        values = [17.0, None, 18.5, 23.0, 25.0, None, 30.0, 35.0, 22.9]
+        records = [{'date': f"2024-01-{i + 1:02d}", 'weight': 60.0, 'bmi': bmi, 'notes': None}
+                   for i, bmi in enumerate(values)]
+        stream = io.StringIO()
+        self.assertEqual(self.exporter.write_records(stream, 'weight', iter(records), 'csv'), 9)
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))[1:]
+        self.assertEqual([row[3] for row in rows],
+                         [BMICalculator.get_bmi_category(bmi)['category'] if bmi is not None else ''
+                          for bmi in values])
+
+    def test_json_array_and_empty_type(self):
+        """Test mảng JSON hợp lệ và không tạo file khi không có dữ liệu"""
+        json_path = os.path.join(self.temp_dir, 'activity.json')
+        self.assertEqual(self.exporter.export_records(self.user_id, 'activity', json_path, 'json'), 1)
+        with open(json_path, encoding='utf-8') as file:
+            data = json.load(file)
+        self.assertEqual(data[0]['duration'], 30)
+
+        sleep_path = os.path.join(self.temp_dir, 'sleep.json')
+        self.assertEqual(self.exporter.export_records(self.user_id, 'sleep', sleep_path, 'json'), 0)
+        self.assertFalse(os.path.exists(sleep_path))
+
+        empty = io.StringIO()
+        self.exporter.write_records(empty, 'sleep', iter(()), 'json')
+        self.assertEqual(json.loads(empty.getvalue()), [])
+
+    def test_export_all_streams_into_zip(self):
+        """Test xuất ZIP có một entry cho mỗi loại bản ghi"""
+        zip_path = os.path.join(self.temp_dir, 'all.zip')
+        counts = self.exporter.export_all(self.user_id, zip_path, 'csv')
+        self.assertEqual(counts, {'weight': 30, 'activity': 1, 'sleep': 0, 'heart_rate': 0})
+
+        with zipfile.ZipFile(zip_path) as zipf:
+            names = zipf.namelist()
+            self.assertEqual(len(names), 4)
+            activity_name = next(name for name in names if name.startswith('activity_'))
+            text = zipf.read(activity_name).decode('utf-8-sig')
+        self.assertIn('Đi bộ', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# tests/test_data_importer.py
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+from utils.data_exporter import DataExporter
+from utils.data_importer import DataImporter
+
+class TestDataImporter(unittest.TestCase):
+    """Test cases cho nhập dữ liệu hàng loạt"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'import.db'))
+        self.db.init_database()
+        for name in ("source", "target"):
+            self.db.create_user(name, "password", name.title(), 170.0)
+        self.source_id = self.db.authenticate_user("source", "password")['user_id']
+        self.target_id = self.db.authenticate_user("target", "password")['user_id']
+        self.importer = DataImporter(self.db, batch_size=50, workers=1)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_json(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        return path
+
+    def test_round_trip_history_csv(self):
+        """Test nhập lại file CSV do HistoryTab xuất"""
+        self.db.add_heart_rate_records_bulk(self.source_id, [
+            {'record_date': '2024-01-01', 'record_time': f'{m // 60:02d}:{m % 60:02d}', 'bpm': 60 + m % 40}
+            for m in range(120)
+        ])
+        path = os.path.join(self.temp_dir, 'hr.csv')
+        DataExporter(self.db).export_records(self.source_id, 'heart_rate', path, 'csv')
+
+        progress = []
+        result = self.importer.import_file(self.target_id, 'heart_rate', path,
+                                           progress=lambda total, imported: progress.append(total))
+        self.assertEqual((result['total'], result['imported'], result['rejected']), (120, 120, 0))
+        self.assertEqual(progress, [50, 100, 120])
+        self.assertEqual(len(self.db.get_heart_rate_history(self.target_id, '2024-01-01', '2024-01-01')), 120)
+
+    def test_rejected_rows_reported(self):
+        """Test dòng sai bị loại kèm số dòng và lý do"""
+        path = self.write_json('weight.json', [
+            {'date': '2024-01-01', 'weight': 65.0},
+            {'date': '2024-13-01', 'weight': 65.0},
+            {'date': '2024-01-03', 'weight': 500},
+            {'date': '2024-01-04', 'weight': 'abc'},
+            {'date': '2024-01-05'},
+        ])
+        result = self.importer.import_file(self.target_id, 'weight', path)
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual([line for line, _ in result['errors']], [2, 3, 4, 5])
+
+    def test_device_dump_and_ndjson(self):
+        """Test dữ liệu thiết bị lồng nhau và file NDJSON"""
+        path = self.write_json('device.json', [
+            {'date': '2024-01-01', 'weight_data': {'weight': 65.2},
+             'activity_data': {'activity_type': 'Đi bộ', 'duration': 30, 'calories_burned': 120.0,
+                               'intensity': 'low', 'date': '2024-01-01'}},
+            {'date': '2024-01-02', 'weight_data': {'weight': 65.0}, 'activity_data': None},
+        ])
+        self.assertEqual(self.importer.import_file(self.target_id, 'activity', path)['imported'], 1)
+        self.assertEqual(self.importer.import_file(self.target_id, 'weight', path)['imported'], 2)
+
+        ndjson_path = os.path.join(self.temp_dir, 'sleep.ndjson')
+        with open(ndjson_path, 'w', encoding='utf-8') as file:
+            file.write('{"record_date": "2024-01-01", "sleep_hours": 7.5}\n\n{"date": "2024-01-02", "sleep_hours": 30}\n')
+        result = self.importer.import_file(self.target_id, 'sleep', ndjson_path)
+        self.assertEqual((result['imported'], result['rejected']), (1, 1))
+
+    def test_process_pool_validation(self):
+        """Test validate song song cho kết quả giống chạy tuần tự"""
+        rows = [{'record_date': '2024-02-01', 'record_time': f'{m // 60:02d}:{m % 60:02d}',
+                 'bpm': 20 if m % 10 == 0 else 70} for m in range(300)]
+        path = self.write_json('hr.json', rows)
+        importer = DataImporter(self.db, batch_size=40, workers=2)
+        result = importer.import_file(self.target_id, 'heart_rate', path)
+        self.assertEqual((result['total'], result['imported'], result['rejected']), (300, 270, 30))
+        self.assertEqual(result['errors'][0][0], 1)
+
+if __name__ == '__main__':
+    unittest.main()
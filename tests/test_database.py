@@ -0,0 +1,495 @@
+# tests/test_database.py
+import unittest
+import os
+import tempfile
+import threading
+import sys
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+from database.migrations import LATEST_VERSION, get_schema_version, run_migrations
+
+class TestDatabaseManager(unittest.TestCase):
+    """Test cases cho tầng database"""
+    
+    def setUp(self):
+        """Thiết lập trước mỗi test"""
+        self.test_db_file = tempfile.mktemp(suffix='.db')
+        self.db = DatabaseManager(self.test_db_file)
+        self.db.init_database()
+        self.db.create_user("dbuser", "password", "Db User", 170.0)
+        self.user_id = self.db.authenticate_user("dbuser", "password")['user_id']
+    
+    def tearDown(self):
+        """Dọn dẹp sau mỗi test"""
+        self.db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.test_db_file + suffix):
+                os.unlink(self.test_db_file + suffix)
+    
+    def test_pool_reuses_connections(self):
+        """Test pool dùng lại kết nối giữa các truy vấn"""
+        first = self.db.get_connection()
+        raw = first.raw
+        first.close()
+        
+        second = self.db.get_connection()
+        self.assertIs(second.raw, raw)
+        second.close()
+    
+    def test_pool_rolls_back_uncommitted_work(self):
+        """Test kết nối trả về pool không giữ giao dịch dở dang"""
+        conn = self.db.get_connection()
+        conn.execute("INSERT INTO weight_records (user_id, record_date, weight) VALUES (?, '2024-01-01', 60)",
+                     (self.user_id,))
+        conn.close()
+        
+        self.assertIsNone(self.db.get_current_weight(self.user_id))
+    
+    def test_pool_nested_and_threaded_access(self):
+        """Test mượn lồng nhau và từ nhiều thread không bị treo"""
+        outer = self.db.get_connection()
+        self.assertIsNotNone(self.db.add_weight_record(self.user_id, 65.0))
+        outer.close()
+        
+        errors = []
+        def worker():
+            try:
+                for _ in range(20):
+                    self.db.get_current_weight(self.user_id)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        self.assertEqual(errors, [])
+        self.assertLessEqual(self.db._pool.idle_count, self.db.pool_size)
+    
+    def test_close_keeps_manager_usable(self):
+        """Test sau close() vẫn truy vấn được (đăng xuất rồi đăng nhập lại)"""
+        self.db.add_weight_record(self.user_id, 70.0)
+        self.db.close()
+        self.assertEqual(self.db.get_current_weight(self.user_id), 70.0)
+        
+        # Lời gọi muộn sau close() không mở lại pool và không giữ lại kết nối
+        self.assertTrue(self.db._pool.closed)
+        self.assertEqual(self.db._pool.idle_count, 0)
+        
+        self.db.reopen()
+        self.db.get_current_weight(self.user_id)
+        self.assertEqual(self.db._pool.idle_count, 1)
+    
+    def test_unpooled_mode(self):
+        """Test chế độ không dùng pool"""
+        db = DatabaseManager(self.test_db_file, pool_size=0)
+        self.assertIsNotNone(db.add_weight_record(self.user_id, 68.0))
+        self.assertEqual(db.get_current_weight(self.user_id), 68.0)
+    
+    def test_get_users(self):
+        """Test lấy danh sách user theo ID hoặc tất cả"""
+        self.db.create_user("second", "password", "Second User", 160.0)
+        users = self.db.get_users()
+        self.assertEqual([u['username'] for u in users], ["dbuser", "second"])
+        self.assertNotIn('password', users[0])
+        
+        self.assertEqual([u['user_id'] for u in self.db.get_users([self.user_id])], [self.user_id])
+        self.assertEqual(self.db.get_users([]), [])
+    
+    def test_migrations_create_indexes(self):
+        """Test migration tạo index và cập nhật user_version"""
+        conn = self.db.get_connection()
+        try:
+            self.assertEqual(get_schema_version(conn), LATEST_VERSION)
+            indexes = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index'")]
+            self.assertIn('idx_heart_rate_user_date_time', indexes)
+            self.assertIn('idx_activities_user_date', indexes)
+            
+            plan = ' '.join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT bpm FROM heart_rate_records "
+                "WHERE user_id = 1 AND record_date >= '2024-01-01' "
+                "ORDER BY record_date DESC, record_time DESC"))
+            self.assertIn('idx_heart_rate_user_date_time', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+        finally:
+            conn.close()
+    
+    def test_migrations_upgrade_existing_database(self):
+        """Test nâng cấp database cũ (chưa có index) tại chỗ"""
+        conn = self.db.get_connection()
+        try:
+            conn.execute("DROP INDEX idx_heart_rate_user_date_time")
+            conn.execute("DROP INDEX idx_activities_user_date")
+            conn.execute("PRAGMA user_version = 0")
+        finally:
+            conn.close()
+        
+        self.db.add_activity(self.user_id, "Đi bộ", 30)
+        self.db.init_database()
+        
+        conn = self.db.get_connection()
+        try:
+            self.assertEqual(get_schema_version(conn), LATEST_VERSION)
+            # Chạy lại không làm gì thêm
+            self.assertEqual(run_migrations(conn), LATEST_VERSION)
+        finally:
+            conn.close()
+        self.assertEqual(self.db.get_weekly_activity_minutes(self.user_id), 30)
+    
+    def test_performance_profile_pragmas(self):
+        """Test bộ PRAGMA performance được áp dụng khi mở kết nối"""
+        # Mặc định không đổi journal mode của file database
+        conn = self.db.get_connection()
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'delete')
+        finally:
+            conn.close()
+        
+        db = DatabaseManager(self.test_db_file, pool_size=0, profile="performance")
+        conn = db.get_connection()
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)   # MEMORY
+        finally:
+            conn.close()
+    
+    def test_custom_and_unknown_profiles(self):
+        """Test chọn profile tùy chỉnh và báo lỗi profile không tồn tại"""
+        db = DatabaseManager(self.test_db_file, pool_size=0, profile={"cache_size": -2000})
+        conn = db.get_connection()
+        try:
+            self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -2000)
+        finally:
+            conn.close()
+        
+        with self.assertRaises(ValueError):
+            DatabaseManager(self.test_db_file, profile="turbo")
+    
+    def test_bulk_weight_records(self):
+        """Test thêm nhiều bản ghi cân nặng, trả về BMI từng dòng"""
+        bmis = self.db.add_weight_records_bulk(self.user_id, [
+            {'weight': 65.0, 'date': '2024-01-01'},
+            {'date': '2024-01-02'},                  # thiếu cân nặng
+            {'weight': 'abc', 'date': '2024-01-03'},  # sai kiểu
+            {'weight': 70.0, 'date': '2024-01-04', 'notes': 'ok'},
+        ])
+        
+        self.assertAlmostEqual(bmis[0], 22.5, places=1)
+        self.assertIsNone(bmis[1])
+        self.assertIsNone(bmis[2])
+        self.assertAlmostEqual(bmis[3], 24.2, places=1)
+        self.assertEqual(self.db.get_current_weight(self.user_id), 70.0)
+    
+    def test_bulk_inserts_report_per_row_outcomes(self):
+        """Test bulk insert các loại bản ghi khác"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        
+        activity_results = self.db.add_activities_bulk(self.user_id, [
+            {'activity_type': 'Đi bộ', 'duration': 30},
+            {'activity_type': 'Chạy bộ', 'duration': 20, 'intensity': 'high'},
+            {'duration': 10},
+        ])
+        self.assertEqual(activity_results, [True, True, False])
+        self.assertEqual(self.db.get_weekly_activity_minutes(self.user_id), 50)
+        
+        sleep_results = self.db.add_sleep_records_bulk(self.user_id, [
+            {'record_date': today, 'sleep_hours': 7.5, 'sleep_quality': 'Tốt'},
+            {'sleep_hours': 6.0},
+        ])
+        self.assertEqual(sleep_results, [True, False])
+        
+        hr_rows = [{'record_date': today, 'record_time': f"08:{i:02d}", 'bpm': 60 + i} for i in range(50)]
+        hr_rows.append({'record_date': today, 'record_time': None, 'bpm': None})
+        hr_results = self.db.add_heart_rate_records_bulk(self.user_id, hr_rows)
+        self.assertEqual(hr_results, [True] * 50 + [False])
+        self.assertEqual(len(self.db.get_heart_rate_records(self.user_id, days=1)), 50)
+        self.assertEqual(self.db.get_latest_heart_rate(self.user_id)['bpm'], 109)
+    
+    def test_bulk_insert_retries_row_by_row_on_constraint_error(self):
+        """Test lỗi ràng buộc ở một dòng không làm hỏng cả lô"""
+        conn = self.db.get_connection()
+        try:
+            outcomes = self.db._executemany_outcomes(
+                conn,
+                "INSERT INTO activities (user_id, activity_date, activity_type, duration) VALUES (?, ?, ?, ?)",
+                [(self.user_id, '2024-01-01', 'Yoga', 30),
+                 (self.user_id, '2024-01-02', None, 30),
+                 None,
+                 (self.user_id, '2024-01-03', 'Gym', 45)])
+        finally:
+            conn.close()
+        
+        self.assertEqual(outcomes, [True, False, False, True])
+    
+    def test_dashboard_snapshot_matches_individual_queries(self):
+        """Test snapshot dashboard khớp với các truy vấn riêng lẻ"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.db.add_weight_record(self.user_id, 66.0)
+        self.db.add_activity(self.user_id, "Đi bộ", 40, 160.0)
+        self.db.add_activity(self.user_id, "Gym", 25, 175.0)
+        self.db.add_sleep_record(self.user_id, today, 6.5, "Tốt")
+        for i, bpm in enumerate([62, 75, 88]):
+            self.db.add_heart_rate_record(self.user_id, today, f"0{i + 7}:00", bpm)
+        
+        snapshot = self.db.get_dashboard_snapshot(self.user_id)
+        
+        self.assertEqual(snapshot['current_weight'], self.db.get_current_weight(self.user_id))
+        self.assertEqual(snapshot['weekly_activity_minutes'], self.db.get_weekly_activity_minutes(self.user_id))
+        self.assertEqual(snapshot['recent_activities'], self.db.get_activities(self.user_id, days=7))
+        self.assertEqual(snapshot['sleep_records'], self.db.get_sleep_records(self.user_id, days=7))
+        self.assertEqual(snapshot['average_sleep'], self.db.get_average_sleep(self.user_id, days=7))
+        self.assertEqual(snapshot['latest_heart_rate'], self.db.get_latest_heart_rate(self.user_id))
+        self.assertEqual(snapshot['average_heart_rate'], self.db.get_average_heart_rate(self.user_id, days=7))
+        self.assertEqual(snapshot['recent_heart_rates'],
+                         self.db.get_heart_rate_records(self.user_id, days=7)[:5])
+    
+    def test_dashboard_snapshot_empty_user(self):
+        """Test snapshot khi chưa có dữ liệu"""
+        snapshot = self.db.get_dashboard_snapshot(self.user_id)
+        self.assertIsNone(snapshot['current_weight'])
+        self.assertEqual(snapshot['weekly_activity_minutes'], 0)
+        self.assertIsNone(snapshot['latest_heart_rate'])
+        self.assertEqual(snapshot['average_heart_rate'], 0.0)
+    
+    def test_records_page_keyset_walk(self):
+        """Test duyệt hết dữ liệu nhịp tim theo trang, không trùng/thiếu"""
+        rows = [{'record_date': f"2024-01-{day:02d}", 'record_time': f"{hour:02d}:00", 'bpm': 60 + hour}
+                for day in range(1, 11) for hour in range(0, 24, 3)]
+        rows.append({'record_date': "2024-01-05", 'record_time': "03:00", 'bpm': 99})  # trùng khóa thời gian
+        self.db.add_heart_rate_records_bulk(self.user_id, rows)
+        
+        seen = []
+        page = self.db.get_records_page('heart_rate', self.user_id, limit=7)
+        while page:
+            seen.extend(page)
+            after = self.db.get_record_key('heart_rate', page[-1])
+            page = self.db.get_records_page('heart_rate', self.user_id, after=after, limit=7)
+        
+        self.assertEqual(len(seen), len(rows))
+        self.assertEqual(len({r['heart_rate_id'] for r in seen}), len(rows))
+        keys = [self.db.get_record_key('heart_rate', r) for r in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        
+        # Trang mới hơn một khóa trả về đúng các bản ghi liền trước, mới nhất trước
+        newer = self.db.get_records_page('heart_rate', self.user_id, before=keys[10], limit=3)
+        self.assertEqual([self.db.get_record_key('heart_rate', r) for r in newer], keys[7:10])
+    
+    def test_records_page_null_time(self):
+        """Test bản ghi nhịp tim không có giờ đo vẫn được phân trang, không bị bỏ sót"""
+        rows = [{'record_date': f"2024-01-{day:02d}", 'record_time': time, 'bpm': 70}
+                for day in range(1, 4) for time in (None, "08:00", None, "20:00")]
+        self.db.add_heart_rate_records_bulk(self.user_id, rows)
+        
+        seen = []
+        page = self.db.get_records_page('heart_rate', self.user_id, limit=3)
+        while page:
+            seen.extend(page)
+            after = self.db.get_record_key('heart_rate', page[-1])
+            page = self.db.get_records_page('heart_rate', self.user_id, after=after, limit=3)
+        
+        self.assertEqual(len({r['heart_rate_id'] for r in seen}), len(rows))
+        keys = [self.db.get_record_key('heart_rate', r) for r in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual(sum(1 for r in seen if r['record_time'] is None), 6)
+        
+        # Khóa có giờ NULL dùng được cho cả hai chiều
+        newer = self.db.get_records_page('heart_rate', self.user_id, before=keys[-1], limit=5)
+        self.assertEqual([self.db.get_record_key('heart_rate', r) for r in newer], keys[-6:-1])
+    
+    def test_records_page_date_range(self):
+        """Test phân trang cân nặng theo khoảng ngày"""
+        self.db.add_weight_records_bulk(self.user_id, [
+            {'weight': 60 + i, 'date': f"2024-02-{i + 1:02d}"} for i in range(10)
+        ])
+        page = self.db.get_records_page('weight', self.user_id, "2024-02-03", "2024-02-06", limit=3)
+        self.assertEqual([r['record_date'] for r in page], ["2024-02-06", "2024-02-05", "2024-02-04"])
+        
+        rest = self.db.get_records_page('weight', self.user_id, "2024-02-03", "2024-02-06",
+                                        after=self.db.get_record_key('weight', page[-1]), limit=3)
+        self.assertEqual([r['record_date'] for r in rest], ["2024-02-03"])
+
+    def test_history_range_queries(self):
+        """Test lọc khoảng ngày, giới hạn và chọn cột trong SQL"""
+        self.db.add_activities_bulk(self.user_id, [
+            {'activity_type': "Chạy bộ", 'duration': 20 + i, 'date': f"2024-03-{i + 1:02d}"} for i in range(10)
+        ])
+        self.db.add_sleep_records_bulk(self.user_id, [
+            {'record_date': f"2024-03-{i + 1:02d}", 'sleep_hours': 7.0} for i in range(10)
+        ])
+        self.db.add_heart_rate_records_bulk(self.user_id, [
+            {'record_date': f"2024-03-{i + 1:02d}", 'record_time': "08:00", 'bpm': 70} for i in range(10)
+        ])
+        
+        activities = self.db.get_activity_history(self.user_id, "2024-03-03", "2024-03-05")
+        self.assertEqual([a['date'] for a in activities], ["2024-03-05", "2024-03-04", "2024-03-03"])
+        self.assertEqual(set(activities[0]), {'date', 'activity_type', 'duration',
+                                              'calories_burned', 'intensity', 'notes'})
+        
+        sleep = self.db.get_sleep_history(self.user_id, "2024-03-01", "2024-03-10", limit=2,
+                                          columns=['record_date', 'sleep_hours'])
+        self.assertEqual(sleep, [{'record_date': "2024-03-10", 'sleep_hours': 7.0},
+                                 {'record_date': "2024-03-09", 'sleep_hours': 7.0}])
+        
+        heart_rates = self.db.get_heart_rate_history(self.user_id, "2024-03-08", "2024-03-31")
+        self.assertEqual(len(heart_rates), 3)
+        
+        with self.assertRaises(ValueError):
+            self.db.get_weight_history(self.user_id, "2024-03-01", "2024-03-10", columns=['password'])
+
+    def test_data_versions_bump_on_write(self):
+        """Test phiên bản dữ liệu chỉ tăng khi loại bản ghi tương ứng được ghi"""
+        before = self.db.get_data_versions(self.user_id, ['weight', 'activity', 'sleep', 'heart_rate'])
+        
+        self.db.add_weight_record(self.user_id, 65.0)
+        self.db.add_heart_rate_records_bulk(self.user_id, [
+            {'record_date': "2024-01-01", 'record_time': "08:00", 'bpm': 70}
+        ])
+        self.db.add_sleep_records_bulk(self.user_id, [{'record_date': "2024-01-01"}])  # lỗi, không lưu
+        
+        after = self.db.get_data_versions(self.user_id, ['weight', 'activity', 'sleep', 'heart_rate'])
+        self.assertEqual(after, (before[0] + 1, before[1], before[2], before[3] + 1))
+
+    def test_has_records_probe(self):
+        """Test truy vấn EXISTS theo loại bản ghi và số ngày"""
+        self.assertFalse(self.db.has_records(self.user_id))
+        
+        self.db.add_sleep_record(self.user_id, "2020-01-01", 7.0)
+        self.assertTrue(self.db.has_records(self.user_id))
+        self.assertTrue(self.db.has_records(self.user_id, ['sleep']))
+        self.assertFalse(self.db.has_records(self.user_id, ['weight', 'heart_rate']))
+        self.assertFalse(self.db.has_records(self.user_id, ['sleep'], days=30))
+        self.assertFalse(self.db.has_records(self.user_id, []))
+
+    def test_aggregated_series(self):
+        """Test gộp nhịp tim theo ngày/tuần/tháng trong SQL"""
+        rows = [{'record_date': f"2024-01-{day:02d}", 'record_time': f"{hour:02d}:00", 'bpm': 60 + day + hour}
+                for day in range(1, 15) for hour in (6, 12, 18)]
+        self.db.add_heart_rate_records_bulk(self.user_id, rows)
+        
+        daily = self.db.get_aggregated_series('heart_rate', self.user_id, "2024-01-01")
+        self.assertEqual(len(daily), 14)
+        self.assertEqual(daily[0], {'date': "2024-01-01", 'count': 3, 'min': 67, 'avg': 73.0,
+                                    'max': 79, 'sum': 219})
+        
+        # 2024-01-01 là thứ Hai: 2 tuần trọn vẹn
+        weekly = self.db.get_aggregated_series('heart_rate', self.user_id, "2024-01-01", bucket='week')
+        self.assertEqual([w['date'] for w in weekly], ["2024-01-01", "2024-01-08"])
+        self.assertEqual(sum(w['count'] for w in weekly), len(rows))
+        
+        monthly = self.db.get_aggregated_series('heart_rate', self.user_id, "2024-01-05", "2024-01-06",
+                                                bucket='month')
+        self.assertEqual(monthly[0]['count'], 6)
+        
+        with self.assertRaises(ValueError):
+            self.db.get_aggregated_series('heart_rate', self.user_id, "2024-01-01", bucket='hour')
+    
+    def test_activity_totals_by_type(self):
+        """Test tổng hợp hoạt động theo loại"""
+        self.db.add_activities_bulk(self.user_id, [
+            {'activity_type': "Gym", 'duration': 30, 'calories_burned': 200, 'date': "2024-01-01"},
+            {'activity_type': "Gym", 'duration': 45, 'calories_burned': 300, 'date': "2024-01-02"},
+            {'activity_type': "Đi bộ", 'duration': 20, 'date': "2024-01-02"},
+        ])
+        totals = self.db.get_activity_totals_by_type(self.user_id, "2024-01-01")
+        self.assertEqual(totals, [
+            {'activity_type': "Gym", 'count': 2, 'duration': 75, 'calories_burned': 500},
+            {'activity_type': "Đi bộ", 'count': 1, 'duration': 20, 'calories_burned': 0},
+        ])
+
+    def test_daily_summary_maintained_by_triggers(self):
+        """Test daily_summary khớp dữ liệu gốc sau khi thêm / ghi đè / xóa / sửa"""
+        self.db.add_weight_record(self.user_id, 70.0, "2024-01-01")
+        self.db.add_weight_record(self.user_id, 69.0, "2024-01-01")
+        self.db.add_activities_bulk(self.user_id, [
+            {'activity_type': "Gym", 'duration': 30, 'calories_burned': 200, 'date': "2024-01-01"},
+            {'activity_type': "Đi bộ", 'duration': 20, 'date': "2024-01-01"},
+        ])
+        self.db.add_sleep_record(self.user_id, "2024-01-01", 7.5)
+        self.db.add_heart_rate_records_bulk(self.user_id, [
+            {'record_date': "2024-01-01", 'record_time': f"0{i}:00", 'bpm': bpm}
+            for i, bpm in enumerate([60, 90, 75])
+        ])
+        
+        day = self.db.get_daily_summary(self.user_id, "2024-01-01", "2024-01-01")[0]
+        self.assertEqual((day['weight'], day['activity_minutes'], day['calories'], day['sleep_hours']),
+                         (69.0, 50, 200.0, 7.5))
+        self.assertEqual((day['hr_min'], day['hr_avg'], day['hr_max'], day['hr_count']), (60, 75.0, 90, 3))
+        
+        conn = self.db.get_connection()
+        try:
+            conn.execute("DELETE FROM heart_rate_records WHERE bpm = 90")
+            conn.execute("UPDATE activities SET activity_date = '2024-01-02' WHERE duration = 20")
+            conn.execute("DELETE FROM weight_records")
+            conn.commit()
+        finally:
+            conn.close()
+        
+        days = self.db.get_daily_summary(self.user_id, "2024-01-01", "2024-01-31")
+        self.assertEqual([d['activity_minutes'] for d in days], [30, 20])
+        self.assertIsNone(days[0]['weight'])
+        self.assertEqual((days[0]['hr_max'], days[0]['hr_count']), (75, 2))
+    
+    def test_summary_stats_match_raw_records(self):
+        """Test số liệu N ngày từ daily_summary khớp với tính từ bản ghi gốc"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.db.add_sleep_record(self.user_id, today, 6.0)
+        self.db.add_sleep_record(self.user_id, "2020-01-01", 9.0)
+        self.db.add_activity(self.user_id, "Đi bộ", 40, 160.0)
+        for i, bpm in enumerate([61, 75, 88]):
+            self.db.add_heart_rate_record(self.user_id, today, f"0{i + 7}:00", bpm)
+        
+        stats = self.db.get_summary_stats(self.user_id, days=7)
+        self.assertEqual(stats['sleep_days'], 1)
+        self.assertEqual(stats['calories_burned'], 160.0)
+        self.assertEqual((stats['min_heart_rate'], stats['max_heart_rate']), (61, 88))
+        self.assertEqual(self.db.get_average_sleep(self.user_id, days=7), 6.0)
+        self.assertEqual(self.db.get_average_heart_rate(self.user_id, days=7), 75.0)
+        self.assertEqual(self.db.get_weekly_activity_minutes(self.user_id), 40)
+
+    def test_delete_records_by_id(self):
+        """Test xóa theo khóa chính: chỉ bản ghi của user, tổng hợp và cảnh báo được cập nhật"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.db.add_heart_rate_records_bulk(self.user_id, [
+            {'record_date': today, 'record_time': f"0{i}:00", 'bpm': 60 + i} for i in range(5)
+        ])
+        ids = [r['heart_rate_id'] for r in self.db.get_heart_rate_records(self.user_id, days=1)]
+        self.db.create_user("other", "password", "Other", 170.0)
+        other_id = self.db.authenticate_user("other", "password")['user_id']
+        version = self.db.get_data_version(self.user_id, 'heart_rate')
+        
+        self.assertEqual(self.db.delete_records('heart_rate', other_id, ids), 0)
+        self.assertEqual(self.db.delete_records('heart_rate', self.user_id, ids[:2] + ids[:1]), 2)
+        self.assertFalse(self.db.delete_record('heart_rate', self.user_id, ids[0]))
+        
+        remaining = self.db.get_heart_rate_records(self.user_id, days=1)
+        self.assertEqual([r['bpm'] for r in remaining], [62, 61, 60])
+        self.assertEqual(self.db.get_summary_stats(self.user_id, days=1)['heart_rate_count'], 3)
+        self.assertEqual(self.db.get_alert_state(self.user_id)['heart_rate']['latest'][0][2], 62)
+        self.assertEqual(self.db.get_data_version(self.user_id, 'heart_rate'), version + 1)
+    
+    def test_update_record_by_id(self):
+        """Test sửa theo khóa chính, BMI tính lại và trùng ngày bị từ chối"""
+        self.db.add_weight_record(self.user_id, 70.0, "2024-01-01")
+        self.db.add_weight_record(self.user_id, 71.0, "2024-01-02")
+        first, second = [r['record_id'] for r in
+                         self.db.get_weight_history(self.user_id, "2024-01-01", "2024-01-02",
+                                                    columns=['record_id'])][::-1]
+        
+        self.assertTrue(self.db.update_record('weight', self.user_id, first, {'weight': 68.0, 'notes': "sửa"}))
+        record = self.db.get_weight_history(self.user_id, "2024-01-01", "2024-01-01")[0]
+        self.assertEqual((record['weight'], record['bmi'], record['notes']), (68.0, 23.5, "sửa"))
+        self.assertEqual(self.db.get_daily_summary(self.user_id, "2024-01-01", "2024-01-01")[0]['weight'], 68.0)
+        
+        self.assertFalse(self.db.update_record('weight', self.user_id, second, {'date': "2024-01-01"}))
+        self.assertFalse(self.db.update_record('weight', self.user_id, 9999, {'notes': "x"}))
+        with self.assertRaises(ValueError):
+            self.db.update_record('weight', self.user_id, first, {'record_id': 5})
+
+if __name__ == '__main__':
+    unittest.main()
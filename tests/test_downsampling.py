@@ -0,0 +1,32 @@
+# tests/test_downsampling.py
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.downsampling import downsample_min_max
+
+class TestDownsampling(unittest.TestCase):
+    """Test cases cho giảm số điểm biểu đồ"""
+    
+    def setUp(self):
+        # Chuỗi nhịp tim dao động quanh 70 với một đỉnh nhanh và một đáy chậm
+        self.points = [(i, 70 + (i % 7) - 3) for i in range(10000)]
+        self.points[1234] = (1234, 165)
+        self.points[8765] = (8765, 38)
+    
+    def test_min_max_keeps_extremes(self):
+        """Test giữ lại đỉnh và đáy bất thường"""
+        result = downsample_min_max(self.points, 500, value=lambda p: p[1])
+        self.assertLessEqual(len(result), 500)
+        self.assertIn((1234, 165), result)
+        self.assertIn((8765, 38), result)
+        self.assertEqual(result, sorted(result))
+    
+    def test_short_series_unchanged(self):
+        """Test chuỗi ngắn được giữ nguyên"""
+        short = self.points[:50]
+        self.assertEqual(downsample_min_max(short, 100, value=lambda p: p[1]), short)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+# tests/test_heart_rate_stream.py
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DEVICE_ACTIVITY, DatabaseManager
+from utils.device_simulator import HealthDeviceSimulator
+from utils.heart_rate_stream import HeartRateStream
+
+# Đầu phút, để mỗi phút có đủ 60 mẫu
+START = datetime(2024, 3, 1, 8, 0, 0)
+START_TS = int(START.timestamp())
+
+class TestHeartRateStream(unittest.TestCase):
+    """Test cases cho pipeline ghi nhịp tim theo giây"""
+
+    def setUp(self):
+        self.test_db_file = tempfile.mktemp(suffix='.db')
+        self.db = DatabaseManager(self.test_db_file)
+        self.db.init_database()
+        self.db.create_user("wearer", "password", "Wearer", 170.0)
+        self.user_id = self.db.authenticate_user("wearer", "password")['user_id']
+        self.simulator = HealthDeviceSimulator(user_height=170.0)
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.test_db_file + suffix):
+                os.unlink(self.test_db_file + suffix)
+
+    def minutes(self):
+        return self.db.get_heart_rate_minutes(self.user_id, '2024-03-01', '2024-03-01')
+
+    def test_ingest_samples_and_minutes(self):
+        """Test ghi mẫu thô và tổng hợp theo phút khớp với dữ liệu"""
+        samples = list(self.simulator.stream_heart_rate(seconds=600, start=START))
+        stream = HeartRateStream(self.db, self.user_id, batch_size=250)
+        stats = stream.ingest(samples)
+
+        self.assertEqual(stats, {'received': 600, 'rejected': 0, 'saved': 600, 'batches': 3})
+        stored = self.db.get_heart_rate_samples(self.user_id, START_TS, START_TS + 599)
+        self.assertEqual(stored, samples)
+
+        minutes = self.minutes()
+        self.assertEqual(len(minutes), 10)
+        self.assertEqual(minutes[0]['minute'], '2024-03-01 08:00')
+        first = [bpm for _, bpm in samples[:60]]
+        self.assertEqual(minutes[0]['sample_count'], 60)
+        self.assertEqual(minutes[0]['bpm_min'], min(first))
+        self.assertEqual(minutes[0]['bpm_max'], max(first))
+        self.assertAlmostEqual(minutes[0]['bpm_avg'], sum(first) / 60)
+
+        # Gửi lại (thiết bị gửi trùng): không lưu thêm, tổng hợp không đổi
+        self.assertEqual(stream.ingest(samples[100:200])['saved'], 600)
+        self.assertEqual(self.minutes(), minutes)
+
+    def test_invalid_samples_rejected(self):
+        """Test mẫu ngoài 30-220 BPM hoặc không phải số bị loại"""
+        stats = HeartRateStream(self.db, self.user_id).ingest([
+            (START_TS, 70), (START_TS + 1, 250), (START_TS + 2, 'abc'), (START, 80), (START_TS + 3, 10),
+        ])
+        self.assertEqual(stats['received'], 5)
+        self.assertEqual(stats['rejected'], 3)
+        self.assertEqual(stats['saved'], 1)
+
+    def test_minutes_only(self):
+        """Test chỉ lưu tổng hợp phút (không lưu mẫu thô)"""
+        stream = HeartRateStream(self.db, self.user_id, batch_size=45, store_samples=False)
+        stream.ingest((START_TS + i, 60 + i % 3) for i in range(120))
+
+        self.assertEqual(self.db.get_heart_rate_samples(self.user_id, START_TS, START_TS + 120), [])
+        minutes = self.minutes()
+        self.assertEqual([m['sample_count'] for m in minutes], [60, 60])
+        self.assertEqual((minutes[1]['bpm_min'], minutes[1]['bpm_max'], minutes[1]['bpm_avg']), (60, 62, 61))
+
+    def test_background_writer(self):
+        """Test luồng liên tục: ghi theo lô đầy và theo thời gian khi luồng chậm"""
+        with HeartRateStream(self.db, self.user_id, batch_size=100, flush_interval=0.05) as stream:
+            for i in range(250):
+                stream.put(START_TS + i, 70)
+            # 50 mẫu còn trong bộ đệm được thread ghi đẩy đi sau flush_interval
+            deadline = time.time() + 5
+            while stream.stats()['saved'] < 250 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(stream.stats()['saved'], 250)
+
+            stream.put_many((START_TS + 250 + i, 75) for i in range(30))
+        self.assertEqual(stream.stats()['saved'], 280)
+        self.assertEqual(sum(m['sample_count'] for m in self.minutes()), 280)
+
+    def test_writer_survives_db_error(self):
+        """Test lỗi khi ghi (lô đầy hoặc đẩy bộ đệm theo thời gian) không làm dừng thread ghi"""
+        original = self.db.add_heart_rate_samples
+        failures = []
+
+        def failing_twice(*args, **kwargs):
+            if len(failures) < 2:
+                failures.append(args[1])
+                raise RuntimeError("database is locked")
+            return original(*args, **kwargs)
+
+        self.db.add_heart_rate_samples = failing_twice
+        stream = HeartRateStream(self.db, self.user_id, batch_size=10, flush_interval=0.05,
+                                 max_pending_batches=1).start()
+        def produce():
+            # Lô chưa đầy: thất bại ở nhánh đẩy bộ đệm theo thời gian
+            stream.put_many((START_TS + i, 70) for i in range(5))
+            deadline = time.time() + 5
+            while not failures and time.time() < deadline:
+                time.sleep(0.01)
+            # Lô đầy: thất bại ở nhánh hàng đợi, các lô sau vẫn được ghi
+            stream.put_many((START_TS + 100 + i, 70) for i in range(50))
+            stream.close()
+
+        # Thread ghi chết thì put_many / close bị treo: chạy trong thread riêng có hạn chờ
+        producer = threading.Thread(target=produce, daemon=True)
+        with self.assertLogs('utils.heart_rate_stream', level='ERROR'):
+            producer.start()
+            producer.join(10)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(len(failures), 2)
+        self.assertEqual(stream.stats()['saved'], 40)
+
+    def test_full_batches_one_commit_each(self):
+        """Test luồng nhanh được ghi theo lô đầy, mỗi lô một lần ghi (đo tốc độ: benchmarks/)"""
+        original = self.db.add_heart_rate_samples
+        sizes = []
+
+        def recording(user_id, batch, *args):
+            sizes.append(len(batch))
+            return original(user_id, batch, *args)
+
+        self.db.add_heart_rate_samples = recording
+        with HeartRateStream(self.db, self.user_id, batch_size=5000, flush_interval=60) as stream:
+            for i in range(0, 12000, 1000):
+                stream.put_many((START_TS + i + j, 70) for j in range(1000))
+        self.assertEqual(sizes, [5000, 5000, 2000])
+        self.assertEqual(stream.stats(), {'received': 12000, 'rejected': 0, 'saved': 12000, 'batches': 3})
+
+    def test_minutes_rolled_up_into_records(self):
+        """Test tổng hợp phút hiện như bản ghi nhịp tim: lịch sử, daily_summary, thông báo thay đổi"""
+        changes = []
+        self.db.changes.subscribe(changes.append, ['heart_rate'])
+        samples = [(START_TS + i, 60 + i // 60 * 10) for i in range(150)]
+        HeartRateStream(self.db, self.user_id, batch_size=90).ingest(samples)
+
+        records = self.db.get_heart_rate_history(self.user_id, '2024-03-01', '2024-03-01')
+        self.assertEqual(sorted((r['record_time'], r['bpm']) for r in records),
+                         [('08:00', 60), ('08:01', 70), ('08:02', 80)])
+        self.assertTrue(all(r['activity_type'] == DEVICE_ACTIVITY for r in records))
+        summary = self.db.get_daily_summary(self.user_id, '2024-03-01', '2024-03-01')[0]
+        self.assertEqual((summary['hr_min'], summary['hr_max']), (60, 80))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual((changes[0].from_date, changes[0].to_date), ('2024-03-01', '2024-03-01'))
+        self.assertEqual(self.db.get_latest_heart_rate(self.user_id)['bpm'], 80)
+
+        # Phút đã có bản ghi được cập nhật, không thêm bản ghi mới
+        HeartRateStream(self.db, self.user_id).ingest((START_TS + 150 + i, 100) for i in range(30))
+        records = self.db.get_heart_rate_history(self.user_id, '2024-03-01', '2024-03-01')
+        self.assertEqual(sorted((r['record_time'], r['bpm']) for r in records),
+                         [('08:00', 60), ('08:01', 70), ('08:02', 90)])
+        summary = self.db.get_daily_summary(self.user_id, '2024-03-01', '2024-03-01')[0]
+        self.assertEqual(summary['hr_count'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
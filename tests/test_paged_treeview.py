@@ -0,0 +1,125 @@
+# tests/test_paged_treeview.py
+import unittest
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gui.background_loader import BackgroundLoader
+from gui.components.paged_treeview import PagedTreeview
+from tests.test_background_loader import FakeRoot
+
+class FakeTree(FakeRoot):
+    """Thay cho ttk.Treeview trong test: giữ danh sách dòng theo thứ tự"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.values = {}
+
+    def configure(self, **options):
+        pass
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.rows.insert(len(self.rows) if index == 'end' else index, iid)
+        self.values[iid] = values
+        return iid
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.rows.remove(iid)
+            del self.values[iid]
+
+    def exists(self, iid):
+        return iid in self.values
+
+    def get_children(self):
+        return list(self.rows)
+
+    def yview_scroll(self, number, what):
+        pass
+
+    def yview_moveto(self, fraction):
+        pass
+
+class FakeScrollbar:
+    def set(self, first, last):
+        pass
+
+class TestPagedTreeview(unittest.TestCase):
+    """Test cases cho Treeview phân trang theo keyset"""
+
+    def setUp(self):
+        # Bản ghi mới nhất trước, khóa keyset là id
+        self.records = [{'id': i} for i in range(100, 0, -1)]
+        self.fetch_threads = []
+        self.tree = FakeTree()
+        self.loader = BackgroundLoader(self.tree)
+        self.pager = PagedTreeview(self.tree, FakeScrollbar(), self.fetch_page,
+                                   format_row=lambda r: (r['id'],), key_func=lambda r: (r['id'],),
+                                   iid_func=lambda r: str(r['id']), page_size=10, max_pages=3,
+                                   loader=self.loader, channel='page')
+
+    def tearDown(self):
+        self.loader.shutdown()
+
+    def fetch_page(self, after=None, before=None, limit=10):
+        self.fetch_threads.append(threading.current_thread())
+        if after is not None:
+            return [r for r in self.records if (r['id'],) < after][:limit]
+        if before is not None:
+            return [r for r in self.records if (r['id'],) > before][-limit:]
+        return self.records[:limit]
+
+    def run_until_idle(self, timeout=5):
+        """Chạy after_idle / vòng poll của loader cho tới khi không còn trang đang tải"""
+        deadline = time.time() + timeout
+        self.tree.run_pending()
+        while self.pager.loading and time.time() < deadline:
+            time.sleep(0.01)
+            self.tree.run_pending()
+
+    def test_scroll_loads_pages_in_background(self):
+        """Test cuộn tới cuối tải trang cũ hơn trên thread nền, giữ tối đa max_pages trang"""
+        self.pager.reset(self.fetch_page())
+        for _ in range(4):
+            self.pager._on_yscroll('0.9', '1.0')
+            self.run_until_idle()
+
+        self.assertEqual(self.tree.rows, [str(i) for i in range(80, 50, -1)])
+        self.assertEqual(self.pager.materialized_count, 30)
+        self.assertTrue(self.fetch_threads)
+        self.assertNotIn(threading.main_thread(), self.fetch_threads[1:])
+
+        self.pager._on_yscroll('0.0', '0.1')
+        self.run_until_idle()
+        self.assertEqual(self.tree.rows, [str(i) for i in range(90, 60, -1)])
+
+    def test_stale_page_ignored_after_reset(self):
+        """Test trang đang tải cho lần hiển thị trước không bị chèn sau reset"""
+        self.pager.reset(self.fetch_page())
+        self.pager._on_yscroll('0.9', '1.0')
+        self.tree.run_pending()
+        self.pager.reset(self.records[50:60])
+        self.run_until_idle()
+        self.assertEqual(self.tree.rows, [str(i) for i in range(50, 40, -1)])
+
+    def test_remove_all_rows_reloads_first_page(self):
+        """Test xóa hết các dòng đang giữ thì tải lại trang đầu thay vì dừng phân trang"""
+        self.pager.reset(self.fetch_page())
+        removed = self.tree.get_children()
+        self.records = self.records[10:]
+        self.pager.remove(removed)
+        self.run_until_idle()
+        self.assertEqual(self.tree.rows, [str(i) for i in range(90, 80, -1)])
+
+        self.pager._on_yscroll('0.9', '1.0')
+        self.run_until_idle()
+        self.assertEqual(self.pager.materialized_count, 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# tests/test_refresh_scheduler.py
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gui.refresh_scheduler import RefreshScheduler
+from tests.test_background_loader import FakeRoot
+
+class TestRefreshScheduler(unittest.TestCase):
+    """Test cases cho RefreshScheduler"""
+
+    def setUp(self):
+        self.root = FakeRoot()
+        self.scheduler = RefreshScheduler(self.root)
+        self.calls = []
+
+    def test_requests_coalesced_per_key(self):
+        """Test nhiều yêu cầu trên cùng khóa chỉ chạy yêu cầu cuối"""
+        for name in ('a', 'b', 'c'):
+            self.scheduler.request('charts', lambda name=name: self.calls.append(name))
+        self.scheduler.request('history', lambda: self.calls.append('history'))
+        self.assertEqual(len(self.root.pending), 2)
+
+        self.root.run_pending()
+        self.assertEqual(sorted(self.calls), ['c', 'history'])
+        self.assertFalse(self.scheduler.is_pending('charts'))
+
+    def test_cancel(self):
+        """Test hủy yêu cầu đang chờ"""
+        self.scheduler.request('charts', lambda: self.calls.append('charts'))
+        self.scheduler.request('history', lambda: self.calls.append('history'))
+        self.scheduler.cancel('charts')
+        self.root.run_pending()
+        self.assertEqual(self.calls, ['history'])
+
+        self.scheduler.request('charts', lambda: self.calls.append('charts'))
+        self.scheduler.cancel()
+        self.root.run_pending()
+        self.assertEqual(self.calls, ['history'])
+
+    def test_rendered_versions(self):
+        """Test ghi nhận phiên bản đã hiển thị và quên khi invalidate"""
+        self.assertFalse(self.scheduler.is_rendered('charts', (1, 'week')))
+        self.scheduler.mark_rendered('charts', (1, 'week'))
+        self.assertTrue(self.scheduler.is_rendered('charts', (1, 'week')))
+        self.assertFalse(self.scheduler.is_rendered('charts', (2, 'week')))
+        self.assertFalse(self.scheduler.is_rendered('history', (1, 'week')))
+
+        self.scheduler.mark_rendered('history', None)
+        self.assertFalse(self.scheduler.is_rendered('history', None))
+
+        self.scheduler.invalidate('charts')
+        self.assertFalse(self.scheduler.is_rendered('charts', (1, 'week')))
+
+    def test_callback_error_logged(self):
+        """Test lỗi trong callback không làm hỏng scheduler"""
+        def failing():
+            raise ValueError("boom")
+
+        self.scheduler.request('dashboard', failing)
+        with self.assertLogs('gui.refresh_scheduler', level='ERROR'):
+            self.root.run_pending()
+        self.scheduler.request('dashboard', lambda: self.calls.append('ok'))
+        self.root.run_pending()
+        self.assertEqual(self.calls, ['ok'])
+
+if __name__ == '__main__':
+    unittest.main()
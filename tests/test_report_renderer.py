@@ -0,0 +1,94 @@
+# tests/test_report_renderer.py
+import unittest
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+
+try:
+    from utils.report_renderer import render_reports, render_user_report, user_report_dir
+    HAS_MATPLOTLIB = True
+except ImportError:
+    HAS_MATPLOTLIB = False
+
+@unittest.skipUnless(HAS_MATPLOTLIB, "matplotlib chưa được cài đặt")
+class TestReportRenderer(unittest.TestCase):
+    """Test cases cho xuất báo cáo không giao diện"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_file = os.path.join(self.temp_dir, 'report.db')
+        db = DatabaseManager(self.db_file)
+        db.init_database()
+        db.create_user("alice", "password", "Alice", 165.0)
+        db.create_user("bob", "password", "Bob", 175.0)
+        self.user_ids = [u['user_id'] for u in db.get_users()]
+        today = datetime.now().strftime("%Y-%m-%d")
+        db.add_weight_record(self.user_ids[0], 60.0, today)
+        db.close()
+        self.output_dir = os.path.join(self.temp_dir, 'reports')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_render_user_report_formats(self):
+        """Test ghi mỗi biểu đồ ra từng định dạng"""
+        paths = render_user_report(self.db_file, self.user_ids[0], self.output_dir,
+                                   chart_types=['weight_trend', 'bmi'], formats=['png', 'svg'], dpi=50)
+        self.assertEqual(len(paths), 4)
+        for path in paths:
+            self.assertTrue(os.path.getsize(path) > 0)
+        self.assertTrue(all(os.path.dirname(p).endswith('alice') for p in paths))
+
+    def test_render_reports_all_users(self):
+        """Test vẽ báo cáo cho mọi user bằng process pool"""
+        results = render_reports(self.db_file, self.output_dir, chart_types=['weight_trend'],
+                                 dpi=50, workers=2)
+        self.assertEqual(sorted(results), sorted(self.user_ids))
+        self.assertTrue(all(len(paths) == 1 for paths in results.values()))
+
+    def test_cli_end_to_end(self):
+        """Test chạy công cụ report.py qua hàm main"""
+        import report
+        status = report.main(['--db', self.db_file, '--output', self.output_dir,
+                              '--charts', 'weight_trend', 'activity', '--formats', 'png', 'pdf',
+                              '--dpi', '50', '--workers', '2'])
+        self.assertEqual(status, 0)
+        # Chạy báo cáo không chuyển database sang WAL
+        conn = sqlite3.connect(self.db_file)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'delete')
+        finally:
+            conn.close()
+        for user_dir in ('alice', 'bob'):
+            files = sorted(os.listdir(os.path.join(self.output_dir, user_dir)))
+            self.assertEqual(len(files), 4)
+
+    def test_username_cannot_escape_output_dir(self):
+        """Test tên user như đường dẫn không làm ghi file ra ngoài thư mục báo cáo"""
+        db = DatabaseManager(self.db_file)
+        for username in ("../../escaped", "/tmp/absolute", ".."):
+            db.create_user(username, "password", "Evil", 170.0)
+        users = {u['username']: u['user_id'] for u in db.get_users()}
+        db.close()
+
+        root = os.path.realpath(self.output_dir)
+        for username in ("../../escaped", "/tmp/absolute", ".."):
+            paths = render_user_report(self.db_file, users[username], self.output_dir,
+                                       chart_types=['bmi'], dpi=50)
+            self.assertEqual(os.path.dirname(os.path.dirname(paths[0])), root)
+        self.assertEqual(os.path.basename(user_report_dir(self.output_dir, 7, "../x")), "___x_7")
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['report.db', 'reports'])
+
+    def test_unknown_format_rejected(self):
+        """Test định dạng không hỗ trợ bị từ chối"""
+        with self.assertRaises(ValueError):
+            render_user_report(self.db_file, self.user_ids[0], self.output_dir, formats=['bmp'])
+
+if __name__ == '__main__':
+    unittest.main()
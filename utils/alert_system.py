@@ -1,26 +1,40 @@
 # utils/alert_system.py
 import logging
 from typing import List, Dict
+from database.alert_state import window_days, window_start
 from database.db_manager import DatabaseManager
 
 class AlertSystem:
-    """Hệ thống cảnh báo sức khỏe"""
+    """
+    Hệ thống cảnh báo sức khỏe
+    
+    Các check_* đánh giá trên trạng thái cửa sổ trượt do DatabaseManager
+    duy trì khi ghi bản ghi (get_alert_state), nên mỗi lần làm mới chỉ cần
+    một truy vấn và không phụ thuộc số bản ghi trong cửa sổ.
+    """
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.logger = logging.getLogger(__name__)
     
-    def check_weight_alerts(self, user_id: int, current_weight: float) -> List[Dict]:
+    def _load_state(self, user_id: int, state: Dict = None) -> Dict:
+        """Dùng trạng thái đã đọc sẵn hoặc đọc từ database ({} nếu lỗi)"""
+        if state is None:
+            state = self.db.get_alert_state(user_id)
+        return state or {}
+    
+    def check_weight_alerts(self, user_id: int, current_weight: float, state: Dict = None) -> List[Dict]:
         """Kiểm tra cảnh báo về cân nặng"""
         alerts = []
         
         try:
-            # Lấy lịch sử 7 ngày gần nhất
-            recent_records = self.db.get_recent_weight_records(user_id, days=7)
+            # Cân nặng 7 ngày gần nhất, mới nhất trước
+            state = self._load_state(user_id, state)
+            weights = [weight for _, weight in window_days('weight', state.get('weight'))]
             
-            if len(recent_records) >= 2:
+            if len(weights) >= 2:
                 # Kiểm tra thay đổi đột ngột
-                weight_change = current_weight - recent_records[1]['weight']  # record trước đó
+                weight_change = current_weight - weights[1]  # record trước đó
                 if abs(weight_change) > 2:  # thay đổi > 2kg trong 1 ngày
                     alerts.append({
                         'type': 'weight_change',
@@ -30,9 +44,8 @@ class AlertSystem:
                     })
             
             # Kiểm tra xu hướng tuần
-            if len(recent_records) >= 7:
-                weights = [record['weight'] for record in recent_records[:7]]
-                weekly_change = weights[0] - weights[-1]  # so sánh đầu và cuối tuần
+            if len(weights) >= 7:
+                weekly_change = weights[0] - weights[6]  # so sánh đầu và cuối tuần
                 
                 if weekly_change > 3:  # Giảm > 3kg/tuần
                     alerts.append({
@@ -93,12 +106,13 @@ class AlertSystem:
         
         return alerts
     
-    def check_activity_alerts(self, user_id: int) -> List[Dict]:
+    def check_activity_alerts(self, user_id: int, state: Dict = None) -> List[Dict]:
         """Kiểm tra cảnh báo hoạt động"""
         alerts = []
         
         try:
-            weekly_activity = self.db.get_weekly_activity_minutes(user_id)
+            state = self._load_state(user_id, state)
+            weekly_activity = int(sum(minutes for _, minutes in window_days('activity', state.get('activity'))))
             
             if weekly_activity == 0:
                 alerts.append({
@@ -127,13 +141,14 @@ class AlertSystem:
         
         return alerts
     
-    def check_consistency_alerts(self, user_id: int) -> List[Dict]:
+    def check_consistency_alerts(self, user_id: int, state: Dict = None) -> List[Dict]:
         """Kiểm tra cảnh báo về tính nhất quán trong theo dõi"""
         alerts = []
         
         try:
             # Kiểm tra số ngày không nhập liệu
-            recent_records = self.db.get_recent_weight_records(user_id, days=7)
+            state = self._load_state(user_id, state)
+            recent_records = window_days('weight', state.get('weight'))
             if len(recent_records) == 0:
                 alerts.append({
                     'type': 'no_data_week',
@@ -154,19 +169,20 @@ class AlertSystem:
         
         return alerts
     
-    def check_sleep_alerts(self, user_id: int) -> List[Dict]:
+    def check_sleep_alerts(self, user_id: int, state: Dict = None) -> List[Dict]:
         """Kiểm tra cảnh báo về giấc ngủ"""
         alerts = []
         
         try:
-            # Lấy bản ghi giấc ngủ 7 ngày gần nhất
-            recent_records = self.db.get_sleep_records(user_id, days=7)
+            # [giờ ngủ, chất lượng] của 7 ngày gần nhất
+            state = self._load_state(user_id, state)
+            recent_records = [value for _, value in window_days('sleep', state.get('sleep'))]
             
             if not recent_records:
                 return alerts
             
             # Tính giờ ngủ trung bình
-            sleep_hours = [record['sleep_hours'] for record in recent_records]
+            sleep_hours = [hours for hours, _ in recent_records]
             avg_sleep = sum(sleep_hours) / len(sleep_hours)
             
             # Kiểm tra thiếu ngủ
@@ -194,8 +210,7 @@ class AlertSystem:
             
             # Kiểm tra chất lượng giấc ngủ
             quality_count = {}
-            for record in recent_records:
-                quality = record['sleep_quality']
+            for _, quality in recent_records:
                 quality_count[quality] = quality_count.get(quality, 0) + 1
             
             bad_quality = quality_count.get('Không tốt', 0) + quality_count.get('Rất không tốt', 0)
@@ -212,18 +227,18 @@ class AlertSystem:
         
         return alerts
     
-    def check_heart_rate_alerts(self, user_id: int) -> List[Dict]:
+    def check_heart_rate_alerts(self, user_id: int, state: Dict = None) -> List[Dict]:
         """Kiểm tra cảnh báo về nhịp tim"""
         alerts = []
         
         try:
-            # Lấy nhịp tim mới nhất
-            latest = self.db.get_latest_heart_rate(user_id)
+            # Hai bản ghi nhịp tim mới nhất [ngày, giờ, bpm, hoạt động]
+            state = self._load_state(user_id, state)
+            latest = state.get('heart_rate', {}).get('latest', [])
             if not latest:
                 return alerts
             
-            bpm = latest['bpm']
-            activity = latest['activity_type']
+            _, _, bpm, activity = latest[0]
             
             # Kiểm tra nhịp tim bất thường
             if bpm < 40:
@@ -256,9 +271,10 @@ class AlertSystem:
                 })
             
             # Kiểm tra thay đổi đột ngột nhịp tim (so sánh với hôm trước)
-            recent = self.db.get_heart_rate_records(user_id, days=2)
+            start = window_start('heart_rate')
+            recent = [record for record in latest if record[0] >= start]
             if len(recent) >= 2:
-                hr_change = abs(recent[0]['bpm'] - recent[1]['bpm'])
+                hr_change = abs(recent[0][2] - recent[1][2])
                 if hr_change > 30:  # thay đổi > 30 BPM trong ngày
                     alerts.append({
                         'type': 'heart_rate_spike',
@@ -276,25 +292,28 @@ class AlertSystem:
         """Lấy tất cả cảnh báo"""
         all_alerts = []
         
+        # Đọc trạng thái cửa sổ trượt một lần cho mọi kiểm tra
+        state = self._load_state(user_id)
+        
         # Kiểm tra cảnh báo cân nặng nếu có current_weight
         if current_weight is not None:
-            all_alerts.extend(self.check_weight_alerts(user_id, current_weight))
+            all_alerts.extend(self.check_weight_alerts(user_id, current_weight, state))
         
         # Kiểm tra cảnh báo BMI nếu có current_bmi
         if current_bmi is not None:
             all_alerts.extend(self.check_bmi_alerts(current_bmi))
         
         # Kiểm tra cảnh báo hoạt động
-        all_alerts.extend(self.check_activity_alerts(user_id))
+        all_alerts.extend(self.check_activity_alerts(user_id, state))
         
         # Kiểm tra cảnh báo nhất quán
-        all_alerts.extend(self.check_consistency_alerts(user_id))
+        all_alerts.extend(self.check_consistency_alerts(user_id, state))
         
         # Kiểm tra cảnh báo giấc ngủ
-        all_alerts.extend(self.check_sleep_alerts(user_id))
+        all_alerts.extend(self.check_sleep_alerts(user_id, state))
         
         # Kiểm tra cảnh báo nhịp tim
-        all_alerts.extend(self.check_heart_rate_alerts(user_id))
+        all_alerts.extend(self.check_heart_rate_alerts(user_id, state))
         
         # Sắp xếp theo mức độ ưu tiên
         priority_order = {'critical': 0, 'danger': 1, 'warning': 2, 'info': 3, 'success': 4}
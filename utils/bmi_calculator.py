@@ -1,5 +1,50 @@
 # utils/bmi_calculator.py
-from typing import Dict, List
+import bisect
+import math
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Ngưỡng BMI theo tiêu chuẩn châu Á: mã phân loại i ứng với
+# BMI_CUTOFFS[i - 1] <= BMI < BMI_CUTOFFS[i]
+BMI_CUTOFFS = (18.5, 23.0, 25.0, 30.0)
+
+# Thông tin phân loại theo mã (dùng chung, không được sửa)
+BMI_CATEGORIES = (
+    {
+        "category": "Thiếu cân",
+        "risk": "Cao",
+        "color": "red",
+        "description": "Cần tăng cân để đạt mức BMI bình thường"
+    },
+    {
+        "category": "Bình thường", 
+        "risk": "Thấp",
+        "color": "green",
+        "description": "Duy trì chế độ ăn uống và tập luyện hiện tại"
+    },
+    {
+        "category": "Thừa cân",
+        "risk": "Trung bình", 
+        "color": "orange",
+        "description": "Cần chú ý đến chế độ ăn uống và tập luyện"
+    },
+    {
+        "category": "Béo phì cấp I",
+        "risk": "Cao",
+        "color": "red", 
+        "description": "Cần giảm cân để cải thiện sức khỏe"
+    },
+    {
+        "category": "Béo phì cấp II",
+        "risk": "Rất cao",
+        "color": "darkred",
+        "description": "Cần can thiệp y tế và giảm cân ngay lập tức"
+    },
+)
 
 class BMICalculator:
     """Class tính toán và đánh giá chỉ số BMI"""
@@ -29,43 +74,49 @@ class BMICalculator:
             bmi: Chỉ số BMI
             
         Returns:
-            Dict chứa thông tin phân loại
+            Dict chứa thông tin phân loại (dùng chung, không được sửa)
         """
-        if bmi < 18.5:
-            return {
-                "category": "Thiếu cân",
-                "risk": "Cao",
-                "color": "red",
-                "description": "Cần tăng cân để đạt mức BMI bình thường"
-            }
-        elif 18.5 <= bmi < 23:
-            return {
-                "category": "Bình thường", 
-                "risk": "Thấp",
-                "color": "green",
-                "description": "Duy trì chế độ ăn uống và tập luyện hiện tại"
-            }
-        elif 23 <= bmi < 25:
-            return {
-                "category": "Thừa cân",
-                "risk": "Trung bình", 
-                "color": "orange",
-                "description": "Cần chú ý đến chế độ ăn uống và tập luyện"
-            }
-        elif 25 <= bmi < 30:
-            return {
-                "category": "Béo phì cấp I",
-                "risk": "Cao",
-                "color": "red", 
-                "description": "Cần giảm cân để cải thiện sức khỏe"
-            }
-        else:
-            return {
-                "category": "Béo phì cấp II",
-                "risk": "Rất cao",
-                "color": "darkred",
-                "description": "Cần can thiệp y tế và giảm cân ngay lập tức"
-            }
+        return BMI_CATEGORIES[BMICalculator.categorize(bmi)]
+    
+    @staticmethod
+    def categorize(bmi: float) -> int:
+        """Mã phân loại (chỉ số trong BMI_CATEGORIES) của một chỉ số BMI"""
+        return bisect.bisect_right(BMI_CUTOFFS, bmi)
+    
+    @staticmethod
+    def calculate_bmi_many(weights: Sequence[float], height: float):
+        """
+        Tính BMI cho nhiều lần đo cùng lúc
+        
+        Args:
+            weights: Các giá trị cân nặng (kg)
+            height: Chiều cao (m)
+            
+        Returns:
+            Mảng numpy (hoặc list nếu chưa cài numpy) BMI làm tròn 1 chữ số
+        """
+        if np is None:
+            return [BMICalculator.calculate_bmi(weight, height) for weight in weights]
+        if height <= 0:
+            return np.zeros(len(weights))
+        return np.round(np.asarray(weights, dtype=float) / (height ** 2), 1)
+    
+    @staticmethod
+    def categorize_many(bmis: Sequence[Optional[float]]) -> List[Optional[int]]:
+        """
+        Mã phân loại cho nhiều chỉ số BMI (tìm nhị phân trên BMI_CUTOFFS)
+        
+        Returns:
+            List mã phân loại; tra thông tin bằng BMI_CATEGORIES[mã]. BMI thiếu
+            (None) hoặc không hữu hạn (NaN, inf) không có phân loại: mã None
+        """
+        if np is None:
+            return [bisect.bisect_right(BMI_CUTOFFS, bmi)
+                    if bmi is not None and math.isfinite(bmi) else None
+                    for bmi in bmis]
+        values = np.asarray(bmis, dtype=float)
+        codes = np.searchsorted(BMI_CUTOFFS, values, side='right')
+        return [int(code) if finite else None for code, finite in zip(codes, np.isfinite(values))]
     
     @staticmethod
     def get_health_recommendations(bmi: float) -> List[str]:
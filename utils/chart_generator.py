@@ -1,44 +1,169 @@
 # utils/chart_generator.py
-import matplotlib.pyplot as plt
+import matplotlib
 import matplotlib.dates as mdates
+import matplotlib.style
+import weakref
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import Any, Hashable, List, Dict, Optional, Tuple
 import logging
+from .bmi_calculator import BMI_CUTOFFS, BMICalculator
+
+# Loại bản ghi mà mỗi biểu đồ phụ thuộc (dùng để tạo khóa cache theo phiên bản dữ liệu)
+CHART_RECORD_TYPES = {
+    "weight_trend": ("weight",),
+    "bmi": ("weight",),
+    "activity": ("activity",),
+    "sleep_trend": ("sleep",),
+    "heart_rate_trend": ("heart_rate",),
+    "sleep_quality": ("sleep",),
+    "heart_rate_distribution": ("heart_rate",),
+    "weekly_summary": ("weight", "activity"),
+}
+
+# Biểu đồ đường có thể cập nhật tại chỗ: loại -> (khóa ngày, khóa giá trị)
+TREND_SERIES = {
+    "weight_trend": ("date", "weight"),
+    "sleep_trend": ("record_date", "sleep_hours"),
+    "heart_rate_trend": ("record_date", "bpm"),
+}
 
 class ChartGenerator:
     """Class tạo biểu đồ sức khỏe"""
     
-    def __init__(self):
-        plt.style.use('seaborn-v0_8')
+    def __init__(self, cache_size: int = 16, cache_memory_mb: float = 128):
+        """
+        Args:
+            cache_size: Số biểu đồ tối đa giữ trong cache
+            cache_memory_mb: Dung lượng ước tính tối đa của cache (MB)
+        """
+        matplotlib.style.use('seaborn-v0_8')
         # Reserve extra top space so titles are not clipped across different charts
-        plt.rcParams['figure.subplot.top'] = 0.85
-        plt.rcParams['figure.subplot.bottom'] = 0.10
-        plt.rcParams['figure.titlesize'] = 14
+        matplotlib.rcParams['figure.subplot.top'] = 0.85
+        matplotlib.rcParams['figure.subplot.bottom'] = 0.10
+        matplotlib.rcParams['figure.titlesize'] = 14
         self.logger = logging.getLogger(__name__)
+        
+        # Cache LRU: khóa -> (figure, dữ liệu kèm theo, số byte ước tính)
+        self.cache_size = cache_size
+        self.cache_memory = int(cache_memory_mb * 1024 * 1024)
+        self._figure_cache: "OrderedDict[Hashable, Tuple[Figure, Any, int]]" = OrderedDict()
+        self._cache_bytes = 0
+        
+        # Các artist của biểu đồ đường, dùng để cập nhật dữ liệu tại chỗ
+        self._trend_artists = weakref.WeakKeyDictionary()
+    
+    @staticmethod
+    def _new_figure(figsize: Tuple[float, float]) -> Figure:
+        """
+        Tạo Figure độc lập với pyplot
+        
+        Figure gắn với canvas Agg nên vẽ được ngay (tight_layout, savefig) mà
+        không cần cửa sổ; giao diện gắn nó vào FigureCanvasTkAgg khi hiển thị.
+        """
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig
+    
+    # ========== FIGURE CACHE ==========
+    
+    def get_cached_figure(self, key: Hashable) -> Optional[Tuple[Figure, Any]]:
+        """
+        Lấy biểu đồ đã dựng sẵn
+        
+        Args:
+            key: Khóa cache, nên gồm (user_id, chart_type, period, phiên bản dữ liệu)
+            
+        Returns:
+            (figure, dữ liệu kèm theo) hoặc None nếu chưa có
+        """
+        entry = self._figure_cache.get(key)
+        if entry is None:
+            return None
+        self._figure_cache.move_to_end(key)
+        return entry[0], entry[1]
+    
+    def cache_figure(self, key: Hashable, fig: Figure, payload: Any = None):
+        """Lưu biểu đồ vào cache, loại bỏ biểu đồ ít dùng nhất khi vượt giới hạn"""
+        if key in self._figure_cache:
+            self._evict(key)
+        size = self._figure_bytes(fig)
+        self._figure_cache[key] = (fig, payload, size)
+        self._cache_bytes += size
+        
+        while self._figure_cache and (len(self._figure_cache) > self.cache_size
+                                      or self._cache_bytes > self.cache_memory):
+            oldest = next(iter(self._figure_cache))
+            if oldest == key:
+                break
+            self._evict(oldest)
+    
+    def forget_figure(self, fig: Figure):
+        """Bỏ figure khỏi cache (vd: trước khi sửa dữ liệu của nó tại chỗ)"""
+        for key in [k for k, entry in self._figure_cache.items() if entry[0] is fig]:
+            self._evict(key)
+    
+    def is_cached_figure(self, fig: Figure) -> bool:
+        """Biểu đồ có đang nằm trong cache hay không (không được đóng)"""
+        return any(entry[0] is fig for entry in self._figure_cache.values())
+    
+    def invalidate_cache(self, user_id: int = None):
+        """Xóa cache (của một user, hoặc toàn bộ) - khóa cache bắt đầu bằng user_id"""
+        for key in list(self._figure_cache):
+            if user_id is None or (isinstance(key, tuple) and key and key[0] == user_id):
+                self._evict(key)
+    
+    def _evict(self, key: Hashable):
+        fig, _, size = self._figure_cache.pop(key)
+        self._cache_bytes -= size
     
-    def create_weight_trend_chart(self, weight_data: List[Dict], period: str = 'week') -> plt.Figure:
+    @staticmethod
+    def _figure_bytes(fig: Figure) -> int:
+        """Ước tính bộ nhớ của figure theo kích thước buffer RGBA khi vẽ"""
+        width, height = fig.get_size_inches()
+        return int(width * height * fig.dpi * fig.dpi * 4)
+    
+    def create_weight_trend_chart(self, weight_data: List[Dict], period: str = 'week') -> Figure:
         """Tạo biểu đồ xu hướng cân nặng"""
         try:
             if not weight_data:
                 return self._create_empty_chart("Không có dữ liệu cân nặng")
             
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig = self._new_figure(figsize=(10, 6))
+            ax = fig.subplots()
             
             dates = [datetime.strptime(item['date'], '%Y-%m-%d') for item in weight_data]
             weights = [item['weight'] for item in weight_data]
             
             # Vẽ đường xu hướng
-            ax.plot(dates, weights, marker='o', linewidth=2, markersize=6, 
-                   color='#2E86AB', label='Cân nặng')
+            line, = ax.plot(dates, weights, marker='o', linewidth=2, markersize=6, 
+                           color='#2E86AB', label='Cân nặng')
             
             # Vẽ vùng biến động
+            fill = None
             if len(weights) > 1:
-                ax.fill_between(dates, weights, alpha=0.2, color='#2E86AB')
+                fill = ax.fill_between(dates, weights, alpha=0.2, color='#2E86AB')
             
             ax.set_title('📊 Xu hướng Cân nặng', fontsize=14, fontweight='bold', pad=20)
             ax.set_ylabel('Cân nặng (kg)', fontsize=12)
             ax.grid(True, alpha=0.3)
             
+            self._format_trend_axis(ax, 'weight_trend', period)
+            fig.tight_layout()
+            
+            self._trend_artists[fig] = {'kind': 'weight_trend', 'ax': ax, 'line': line, 'fill': fill}
+            return fig
+            
+        except Exception as e:
+            self.logger.error(f"Error creating weight trend chart: {e}")
+            return self._create_empty_chart("Lỗi tạo biểu đồ")
+    
+    def _format_trend_axis(self, ax, kind: str, period: str):
+        """Định dạng trục thời gian của biểu đồ đường"""
+        if kind == 'weight_trend':
             # Format trục x theo period
             if period == 'week':
                 ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
@@ -49,32 +174,79 @@ class ChartGenerator:
             else:  # 3 months
                 ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m/%y'))
                 ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=2))
-            
-            plt.xticks(rotation=45)
-            fig.tight_layout()
-            return fig
-            return fig
+        else:
+            # Chọn mốc theo độ dài trục (ngày) để tháng / 3 tháng không bị chồng nhãn
+            start, end = ax.get_xlim()
+            span = end - start
+            if span <= 14:
+                ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+                ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
+            elif span <= 62:
+                ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+                ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))
+            else:
+                ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m/%y'))
+                ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=12))
+        ax.tick_params(axis='x', labelrotation=45)
+    
+    def update_trend_chart(self, fig: Figure, kind: str, records: List[Dict], period: str = 'week') -> bool:
+        """
+        Cập nhật dữ liệu của biểu đồ đường đã có thay vì dựng Figure mới
+        
+        Args:
+            fig: Figure tạo bởi create_weight/sleep/heart_rate_trend_chart
+            kind: Khóa trong TREND_SERIES, phải khớp loại của fig
+            records: Dữ liệu mới (cùng dạng với hàm create_* tương ứng)
+            period: Khoảng thời gian, dùng để định dạng trục
+            
+        Returns:
+            False nếu fig không phải biểu đồ loại kind (cần dựng mới)
+        """
+        artists = self._trend_artists.get(fig)
+        if artists is None or artists['kind'] != kind or not records:
+            return False
+        
+        try:
+            date_key, value_key = TREND_SERIES[kind]
+            dates = [datetime.strptime(item[date_key], '%Y-%m-%d') for item in records]
+            values = [item[value_key] for item in records]
+            
+            ax = artists['ax']
+            artists['line'].set_data(dates, values)
+            if 'fill' in artists:
+                if artists['fill'] is not None:
+                    artists['fill'].remove()
+                artists['fill'] = (ax.fill_between(dates, values, alpha=0.2, color='#2E86AB')
+                                   if len(values) > 1 else None)
+            
+            ax.relim()
+            # Giấc ngủ giữ cố định trục y 0-12h
+            ax.autoscale_view(scaley=kind != 'sleep_trend')
+            self._format_trend_axis(ax, kind, period)
+            return True
             
         except Exception as e:
-            self.logger.error(f"Error creating weight trend chart: {e}")
-            return self._create_empty_chart("Lỗi tạo biểu đồ")
+            self.logger.error(f"Error updating {kind} chart: {e}")
+            return False
     
-    def create_bmi_chart(self, bmi_data: List[Dict]) -> plt.Figure:
+    def create_bmi_chart(self, bmi_data: List[Dict]) -> Figure:
         """Tạo biểu đồ BMI với vùng phân loại"""
         try:
             if not bmi_data:
                 return self._create_empty_chart("Không có dữ liệu BMI")
             
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig = self._new_figure(figsize=(10, 6))
+            ax = fig.subplots()
             
             dates = [datetime.strptime(item['date'], '%Y-%m-%d') for item in bmi_data]
             bmis = [item['bmi'] for item in bmi_data]
             
             # Vẽ các vùng BMI với màu sắc
-            ax.axhspan(0, 18.5, alpha=0.3, color='#FF6B6B', label='Thiếu cân')
-            ax.axhspan(18.5, 23, alpha=0.3, color='#4ECDC4', label='Bình thường')
-            ax.axhspan(23, 25, alpha=0.3, color='#FFE66D', label='Thừa cân')
-            ax.axhspan(25, 40, alpha=0.3, color='#FF6B6B', label='Béo phì')
+            underweight, normal, overweight = BMI_CUTOFFS[:3]
+            ax.axhspan(0, underweight, alpha=0.3, color='#FF6B6B', label='Thiếu cân')
+            ax.axhspan(underweight, normal, alpha=0.3, color='#4ECDC4', label='Bình thường')
+            ax.axhspan(normal, overweight, alpha=0.3, color='#FFE66D', label='Thừa cân')
+            ax.axhspan(overweight, 40, alpha=0.3, color='#FF6B6B', label='Béo phì')
             
             # Vẽ đường BMI
             ax.plot(dates, bmis, marker='s', linewidth=2, markersize=6, 
@@ -86,11 +258,11 @@ class ChartGenerator:
             ax.grid(True, alpha=0.3)
             
             # Đường giới hạn khuyến nghị
-            ax.axhline(y=18.5, color='red', linestyle='--', alpha=0.5)
-            ax.axhline(y=23, color='orange', linestyle='--', alpha=0.5)
-            ax.axhline(y=25, color='red', linestyle='--', alpha=0.5)
+            ax.axhline(y=underweight, color='red', linestyle='--', alpha=0.5)
+            ax.axhline(y=normal, color='orange', linestyle='--', alpha=0.5)
+            ax.axhline(y=overweight, color='red', linestyle='--', alpha=0.5)
             
-            plt.xticks(rotation=45)
+            ax.tick_params(axis='x', labelrotation=45)
             fig.tight_layout()
             return fig
             
@@ -98,13 +270,14 @@ class ChartGenerator:
             self.logger.error(f"Error creating BMI chart: {e}")
             return self._create_empty_chart("Lỗi tạo biểu đồ BMI")
     
-    def create_activity_chart(self, activity_data: List[Dict]) -> plt.Figure:
+    def create_activity_chart(self, activity_data: List[Dict]) -> Figure:
         """Tạo biểu đồ hoạt động"""
         try:
             if not activity_data:
                 return self._create_empty_chart("Không có dữ liệu hoạt động")
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+            fig = self._new_figure(figsize=(14, 6))
+            ax1, ax2 = fig.subplots(1, 2)
             
             # Chuẩn bị dữ liệu
             activities_by_type = {}
@@ -129,7 +302,7 @@ class ChartGenerator:
             if activities_by_type:
                 labels = list(activities_by_type.keys())
                 sizes = list(activities_by_type.values())
-                colors = plt.cm.Set3(range(len(labels)))
+                colors = colormaps['Set3'](range(len(labels)))
                 
                 ax1.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
                 ax1.set_title('Phân bố Loại Hoạt động', fontweight='bold')
@@ -143,7 +316,7 @@ class ChartGenerator:
                 ax2.set_title('Thời gian Hoạt động Theo Ngày', fontweight='bold')
                 ax2.set_ylabel('Phút')
                 ax2.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-                plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+                ax2.tick_params(axis='x', labelrotation=45)
             
             fig.tight_layout()
             return fig
@@ -152,10 +325,11 @@ class ChartGenerator:
             self.logger.error(f"Error creating activity chart: {e}")
             return self._create_empty_chart("Lỗi tạo biểu đồ hoạt động")
     
-    def create_weekly_summary_chart(self, weight_data: List[Dict], activity_data: List[Dict]) -> plt.Figure:
+    def create_weekly_summary_chart(self, weight_data: List[Dict], activity_data: List[Dict]) -> Figure:
         """Tạo biểu đồ tổng quan tuần"""
         try:
-            fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
+            fig = self._new_figure(figsize=(12, 8))
+            (ax1, ax2), (ax3, ax4) = fig.subplots(2, 2)
             
             # 1. Cân nặng tuần
             if weight_data:
@@ -166,7 +340,7 @@ class ChartGenerator:
                 ax1.plot(dates, weights, marker='o', color='#2E86AB')
                 ax1.set_title('Cân nặng 7 ngày')
                 ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-                plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
+                ax1.tick_params(axis='x', labelrotation=45)
             
             # 2. BMI tuần
             if weight_data:
@@ -174,7 +348,7 @@ class ChartGenerator:
                 ax2.plot(dates, bmis, marker='s', color='#1A535C')
                 ax2.set_title('BMI 7 ngày')
                 ax2.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-                plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+                ax2.tick_params(axis='x', labelrotation=45)
             
             # 3. Tổng hoạt động tuần
             if activity_data:
@@ -186,27 +360,18 @@ class ChartGenerator:
             
             # 4. Phân loại BMI hiện tại
             if weight_data:
-                from .bmi_calculator import BMICalculator
                 current_bmi = weight_data[0]['bmi'] if weight_data else 0
-                category = BMICalculator.get_bmi_category(current_bmi)
                 
                 categories = ['Thiếu cân', 'Bình thường', 'Thừa cân', 'Béo phì']
                 values = [0, 0, 0, 0]
                 colors = ['#FF6B6B', '#4ECDC4', '#FFE66D', '#FF6B6B']
                 
-                # Highlight category hiện tại
-                if category['category'] == 'Thiếu cân':
-                    values[0] = 1
-                elif category['category'] == 'Bình thường':
-                    values[1] = 1  
-                elif category['category'] == 'Thừa cân':
-                    values[2] = 1
-                else:
-                    values[3] = 1
+                # Highlight category hiện tại (béo phì cấp I/II chung một cột)
+                values[min(BMICalculator.categorize(current_bmi), 3)] = 1
                 
                 bars = ax4.bar(categories, values, color=colors, alpha=0.7)
                 ax4.set_title('Phân loại BMI hiện tại')
-                plt.setp(ax4.xaxis.get_majorticklabels(), rotation=45)
+                ax4.tick_params(axis='x', labelrotation=45)
             
             fig.tight_layout()
             return fig
@@ -215,32 +380,34 @@ class ChartGenerator:
             self.logger.error(f"Error creating weekly summary chart: {e}")
             return self._create_empty_chart("Lỗi tạo biểu đồ tổng quan")
     
-    def _create_empty_chart(self, message: str) -> plt.Figure:
+    def _create_empty_chart(self, message: str) -> Figure:
         """Tạo biểu đồ trống với thông báo"""
-        fig, ax = plt.subplots(figsize=(8, 4))
+        fig = self._new_figure(figsize=(8, 4))
+        ax = fig.subplots()
         ax.text(0.5, 0.5, message, ha='center', va='center', 
                transform=ax.transAxes, fontsize=12, style='italic')
         ax.set_xticks([])
         ax.set_yticks([])
         return fig
     
-    def create_sleep_trend_chart(self, sleep_data: List[Dict], period: str = 'week') -> plt.Figure:
+    def create_sleep_trend_chart(self, sleep_data: List[Dict], period: str = 'week') -> Figure:
         """Tạo biểu đồ xu hướng giấc ngủ"""
         try:
             if not sleep_data:
                 return self._create_empty_chart("Không có dữ liệu giấc ngủ")
             
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig = self._new_figure(figsize=(10, 6))
+            ax = fig.subplots()
             
             dates = [datetime.strptime(item['record_date'], '%Y-%m-%d') for item in sleep_data]
             sleep_hours = [item['sleep_hours'] for item in sleep_data]
             
             # Vẽ đường xu hướng
-            ax.plot(dates, sleep_hours, marker='o', linewidth=2, markersize=6,
-                   color='#9B59B6', label='Giờ ngủ')
+            line, = ax.plot(dates, sleep_hours, marker='o', linewidth=2, markersize=6,
+                           color='#9B59B6', label='Giờ ngủ')
             
-            # Vẽ vùng mục tiêu (7-9 giờ)
-            ax.fill_between(dates, 7, 9, alpha=0.1, color='#27AE60', label='Mục tiêu (7-9h)')
+            # Vẽ vùng mục tiêu (7-9 giờ) - không phụ thuộc dữ liệu trục x
+            ax.axhspan(7, 9, alpha=0.1, color='#27AE60', label='Mục tiêu (7-9h)')
             ax.axhline(y=7, color='#27AE60', linestyle='--', linewidth=1, alpha=0.5)
             ax.axhline(y=9, color='#27AE60', linestyle='--', linewidth=1, alpha=0.5)
             
@@ -250,35 +417,34 @@ class ChartGenerator:
             ax.grid(True, alpha=0.3)
             ax.legend()
             
-            # Format trục x
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-            ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
-            plt.xticks(rotation=45)
+            self._format_trend_axis(ax, 'sleep_trend', period)
             fig.tight_layout()
             
+            self._trend_artists[fig] = {'kind': 'sleep_trend', 'ax': ax, 'line': line}
             return fig
             
         except Exception as e:
             self.logger.error(f"Error creating sleep trend chart: {e}")
             return self._create_empty_chart("Lỗi tạo biểu đồ giấc ngủ")
     
-    def create_heart_rate_trend_chart(self, hr_data: List[Dict], period: str = 'week') -> plt.Figure:
+    def create_heart_rate_trend_chart(self, hr_data: List[Dict], period: str = 'week') -> Figure:
         """Tạo biểu đồ xu hướng nhịp tim"""
         try:
             if not hr_data:
                 return self._create_empty_chart("Không có dữ liệu nhịp tim")
             
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig = self._new_figure(figsize=(10, 6))
+            ax = fig.subplots()
             
             dates = [datetime.strptime(item['record_date'], '%Y-%m-%d') for item in hr_data]
             bpms = [item['bpm'] for item in hr_data]
             
             # Vẽ đường xu hướng
-            ax.plot(dates, bpms, marker='o', linewidth=2, markersize=6,
-                   color='#E74C3C', label='BPM')
+            line, = ax.plot(dates, bpms, marker='o', linewidth=2, markersize=6,
+                           color='#E74C3C', label='BPM')
             
-            # Vẽ vùng bình thường (60-100 BPM)
-            ax.fill_between(dates, 60, 100, alpha=0.1, color='#27AE60', label='Bình thường (60-100)')
+            # Vẽ vùng bình thường (60-100 BPM) - không phụ thuộc dữ liệu trục x
+            ax.axhspan(60, 100, alpha=0.1, color='#27AE60', label='Bình thường (60-100)')
             ax.axhline(y=60, color='#27AE60', linestyle='--', linewidth=1, alpha=0.5)
             ax.axhline(y=100, color='#27AE60', linestyle='--', linewidth=1, alpha=0.5)
             
@@ -291,25 +457,24 @@ class ChartGenerator:
             ax.grid(True, alpha=0.3)
             ax.legend()
             
-            # Format trục x
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-            ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
-            plt.xticks(rotation=45)
+            self._format_trend_axis(ax, 'heart_rate_trend', period)
             fig.tight_layout()
             
+            self._trend_artists[fig] = {'kind': 'heart_rate_trend', 'ax': ax, 'line': line}
             return fig
             
         except Exception as e:
             self.logger.error(f"Error creating heart rate trend chart: {e}")
             return self._create_empty_chart("Lỗi tạo biểu đồ nhịp tim")
     
-    def create_sleep_quality_chart(self, sleep_data: List[Dict]) -> plt.Figure:
+    def create_sleep_quality_chart(self, sleep_data: List[Dict]) -> Figure:
         """Tạo biểu đồ chất lượng giấc ngủ"""
         try:
             if not sleep_data:
                 return self._create_empty_chart("Không có dữ liệu giấc ngủ")
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+            fig = self._new_figure(figsize=(12, 5))
+            ax1, ax2 = fig.subplots(1, 2)
             
             # Phân bố chất lượng
             quality_counts = {}
@@ -333,7 +498,7 @@ class ChartGenerator:
             ax2.set_title('Giờ ngủ 7 ngày gần nhất')
             ax2.set_ylabel('Giờ')
             ax2.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+            ax2.tick_params(axis='x', labelrotation=45)
             ax2.legend()
             
             fig.tight_layout()
@@ -343,13 +508,14 @@ class ChartGenerator:
             self.logger.error(f"Error creating sleep quality chart: {e}")
             return self._create_empty_chart("Lỗi tạo biểu đồ chất lượng giấc ngủ")
     
-    def create_heart_rate_distribution_chart(self, hr_data: List[Dict]) -> plt.Figure:
+    def create_heart_rate_distribution_chart(self, hr_data: List[Dict]) -> Figure:
         """Tạo biểu đồ phân bố nhịp tim"""
         try:
             if not hr_data:
                 return self._create_empty_chart("Không có dữ liệu nhịp tim")
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+            fig = self._new_figure(figsize=(12, 5))
+            ax1, ax2 = fig.subplots(1, 2)
             
             # Biểu đồ phân bố hoạt động
             activity_counts = {}
@@ -380,4 +546,116 @@ class ChartGenerator:
             
         except Exception as e:
             self.logger.error(f"Error creating heart rate distribution chart: {e}")
-            return self._create_empty_chart("Lỗi tạo biểu đồ phân bố nhịp tim")
\ No newline at end of file
+            return self._create_empty_chart("Lỗi tạo biểu đồ phân bố nhịp tim")
+    
+    # ========== BIỂU ĐỒ TỪ DỮ LIỆU ĐÃ GỘP ==========
+    
+    def _plot_series_band(self, ax, series: List[Dict], color: str, label: str):
+        """Vẽ đường trung bình của từng nhóm kèm dải min-max"""
+        dates = [datetime.strptime(item['date'], '%Y-%m-%d') for item in series]
+        ax.fill_between(dates, [item['min'] for item in series], [item['max'] for item in series],
+                        alpha=0.2, color=color, label='Min - Max')
+        ax.plot(dates, [item['avg'] for item in series], marker='o', linewidth=2, markersize=4,
+                color=color, label=label)
+        
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+        ax.tick_params(axis='x', labelrotation=45)
+        return dates
+    
+    def create_heart_rate_series_chart(self, series: List[Dict], period: str = '6months') -> Figure:
+        """Tạo biểu đồ xu hướng nhịp tim từ các nhóm đã gộp (get_aggregated_series)"""
+        try:
+            if not series:
+                return self._create_empty_chart("Không có dữ liệu nhịp tim")
+            
+            fig = self._new_figure(figsize=(10, 6))
+            ax = fig.subplots()
+            self._plot_series_band(ax, series, '#E74C3C', 'BPM trung bình')
+            
+            # Vùng bình thường và ngưỡng cảnh báo
+            ax.axhspan(60, 100, alpha=0.1, color='#27AE60', label='Bình thường (60-100)')
+            ax.axhline(y=120, color='#F39C12', linestyle='--', linewidth=1, alpha=0.5, label='Cảnh báo (120)')
+            ax.axhline(y=40, color='#F39C12', linestyle='--', linewidth=1, alpha=0.5)
+            
+            ax.set_title('❤️ Xu hướng Nhịp tim', fontsize=14, fontweight='bold', pad=20)
+            ax.set_ylabel('BPM', fontsize=12)
+            ax.grid(True, alpha=0.3)
+            ax.legend()
+            fig.tight_layout()
+            
+            return fig
+            
+        except Exception as e:
+            self.logger.error(f"Error creating heart rate series chart: {e}")
+            return self._create_empty_chart("Lỗi tạo biểu đồ nhịp tim")
+    
+    def create_sleep_series_chart(self, series: List[Dict], period: str = '6months') -> Figure:
+        """Tạo biểu đồ xu hướng giấc ngủ từ các nhóm đã gộp (get_aggregated_series)"""
+        try:
+            if not series:
+                return self._create_empty_chart("Không có dữ liệu giấc ngủ")
+            
+            fig = self._new_figure(figsize=(10, 6))
+            ax = fig.subplots()
+            self._plot_series_band(ax, series, '#9B59B6', 'Giờ ngủ trung bình')
+            
+            # Vùng mục tiêu (7-9 giờ)
+            ax.axhspan(7, 9, alpha=0.1, color='#27AE60', label='Mục tiêu (7-9h)')
+            
+            ax.set_title('😴 Xu hướng Giấc ngủ', fontsize=14, fontweight='bold', pad=20)
+            ax.set_ylabel('Giờ ngủ', fontsize=12)
+            ax.set_ylim(0, 12)
+            ax.grid(True, alpha=0.3)
+            ax.legend()
+            fig.tight_layout()
+            
+            return fig
+            
+        except Exception as e:
+            self.logger.error(f"Error creating sleep series chart: {e}")
+            return self._create_empty_chart("Lỗi tạo biểu đồ giấc ngủ")
+    
+    def create_activity_series_chart(self, totals_by_type: List[Dict], series: List[Dict],
+                                     period: str = '6months') -> Figure:
+        """
+        Tạo biểu đồ hoạt động từ dữ liệu đã gộp
+        
+        Args:
+            totals_by_type: Kết quả get_activity_totals_by_type
+            series: Tổng thời gian theo nhóm (get_aggregated_series của 'activity')
+        """
+        try:
+            if not totals_by_type:
+                return self._create_empty_chart("Không có dữ liệu hoạt động")
+            
+            fig = self._new_figure(figsize=(14, 6))
+            ax1, ax2 = fig.subplots(1, 2)
+            
+            # Biểu đồ 1: Phân bố loại hoạt động
+            labels = [item['activity_type'] for item in totals_by_type]
+            sizes = [item['duration'] for item in totals_by_type]
+            colors = colormaps['Set3'](range(len(labels)))
+            ax1.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
+            ax1.set_title('Phân bố Loại Hoạt động', fontweight='bold')
+            
+            # Biểu đồ 2: Tổng thời gian theo nhóm
+            if series:
+                dates = [datetime.strptime(item['date'], '%Y-%m-%d') for item in series]
+                # Độ rộng cột theo khoảng cách giữa các nhóm (ngày/tuần/tháng)
+                gap = min(((b - a).days for a, b in zip(dates, dates[1:])), default=1)
+                ax2.bar(dates, [item['sum'] for item in series], width=gap * 0.8,
+                        color='#4ECDC4', alpha=0.7)
+                ax2.set_title('Thời gian Hoạt động Theo Thời gian', fontweight='bold')
+                ax2.set_ylabel('Phút')
+                ax2.xaxis.set_major_locator(mdates.AutoDateLocator())
+                ax2.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+                ax2.tick_params(axis='x', labelrotation=45)
+            
+            fig.tight_layout()
+            return fig
+            
+        except Exception as e:
+            self.logger.error(f"Error creating activity series chart: {e}")
+            return self._create_empty_chart("Lỗi tạo biểu đồ hoạt động")
\ No newline at end of file
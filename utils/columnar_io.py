@@ -0,0 +1,123 @@
+# utils/columnar_io.py
+"""
+Xuất / nhập dữ liệu dạng cột (NumPy .npz) cho phân tích
+
+Mỗi loại bản ghi được lưu thành các mảng có kiểu: ngày là datetime64[D],
+số đo là float64/int64 (thiếu giá trị = NaN), văn bản là mảng unicode. Một
+file .npz chứa mọi loại bản ghi với khóa "<loại>.<cột>", đọc lại bằng
+numpy.load mà không cần phân tích chuỗi từng dòng.
+
+numpy là phụ thuộc tùy chọn: khi chưa cài, HAS_NUMPY = False và các hàm
+export_npz / import_npz ném RuntimeError.
+"""
+import logging
+from typing import Dict, Iterable, List
+from database.db_manager import DatabaseManager
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+# Cột và kiểu dữ liệu của từng loại bản ghi ('U' = văn bản)
+COLUMNAR_SCHEMA = {
+    "weight": (("date", "datetime64[D]"), ("weight", "float64"), ("bmi", "float64"), ("notes", "U")),
+    "activity": (("date", "datetime64[D]"), ("activity_type", "U"), ("duration", "int64"),
+                 ("calories_burned", "float64"), ("intensity", "U"), ("notes", "U")),
+    "sleep": (("record_date", "datetime64[D]"), ("sleep_hours", "float64"),
+              ("sleep_quality", "U"), ("notes", "U")),
+    "heart_rate": (("record_date", "datetime64[D]"), ("record_time", "U"), ("bpm", "int64"),
+                   ("activity_type", "U"), ("notes", "U")),
+}
+
+logger = logging.getLogger(__name__)
+
+def _require_numpy():
+    if not HAS_NUMPY:
+        raise RuntimeError("numpy is required for .npz export/import")
+
+def _to_array(values: List, dtype: str):
+    """Chuyển một cột Python thành mảng numpy có kiểu"""
+    if dtype == "U":
+        return np.array(["" if v is None else str(v) for v in values], dtype=str)
+    if dtype == "int64" and any(v is None for v in values):
+        # Cột số nguyên có giá trị thiếu được lưu dạng float (NaN)
+        dtype = "float64"
+    if dtype == "float64":
+        return np.array([np.nan if v is None else v for v in values], dtype=dtype)
+    return np.array(values, dtype=dtype)
+
+def _from_array(array) -> List:
+    """Chuyển mảng numpy về list giá trị Python (NaN -> None, ngày -> 'YYYY-MM-DD')"""
+    if np.issubdtype(array.dtype, np.datetime64):
+        return array.astype(str).tolist()
+    if np.issubdtype(array.dtype, np.floating):
+        return [None if v != v else v for v in array.tolist()]
+    return array.tolist()
+
+def export_npz(db: DatabaseManager, user_id: int, file_path: str,
+               record_types: Iterable[str] = None, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Xuất các loại bản ghi của user ra một file .npz nén
+
+    Returns:
+        Dict loại bản ghi -> số bản ghi đã xuất
+    """
+    _require_numpy()
+    arrays, counts = {}, {}
+    for record_type in record_types or COLUMNAR_SCHEMA:
+        schema = COLUMNAR_SCHEMA[record_type]
+        names = [name for name, _ in schema]
+        columns = {name: [] for name in names}
+        for record in db.iter_records(record_type, user_id, columns=names, batch_size=batch_size):
+            for name in names:
+                columns[name].append(record[name])
+
+        for name, dtype in schema:
+            arrays[f"{record_type}.{name}"] = _to_array(columns[name], dtype)
+        counts[record_type] = len(columns[names[0]])
+
+    np.savez_compressed(file_path, **arrays)
+    logger.info(f"Exported {sum(counts.values())} records to {file_path}")
+    return counts
+
+def load_npz(file_path: str) -> Dict[str, Dict]:
+    """
+    Đọc file .npz thành dict loại bản ghi -> {cột: mảng numpy}
+
+    Dùng trực tiếp cho phân tích (không cần database).
+    """
+    _require_numpy()
+    tables: Dict[str, Dict] = {}
+    with np.load(file_path, allow_pickle=False) as data:
+        for key in data.files:
+            record_type, _, column = key.partition(".")
+            if record_type in COLUMNAR_SCHEMA and column:
+                tables.setdefault(record_type, {})[column] = data[key]
+    return tables
+
+def import_npz(db: DatabaseManager, user_id: int, file_path: str) -> Dict[str, int]:
+    """
+    Nhập file .npz vào database bằng các hàm bulk insert (mỗi loại một giao dịch)
+
+    Returns:
+        Dict loại bản ghi -> số bản ghi đã lưu
+    """
+    inserters = {
+        "weight": db.add_weight_records_bulk,
+        "activity": db.add_activities_bulk,
+        "sleep": db.add_sleep_records_bulk,
+        "heart_rate": db.add_heart_rate_records_bulk,
+    }
+    counts = {}
+    for record_type, columns in load_npz(file_path).items():
+        names = list(columns)
+        values = [_from_array(columns[name]) for name in names]
+        records = [dict(zip(names, row)) for row in zip(*values)]
+        outcomes = inserters[record_type](user_id, records)
+        # Cân nặng trả về BMI, các loại khác trả về bool; None/False = lỗi
+        counts[record_type] = sum(1 for ok in outcomes if ok is not None and ok is not False)
+    logger.info(f"Imported {sum(counts.values())} records from {file_path}")
+    return counts
@@ -0,0 +1,142 @@
+# utils/data_exporter.py
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from datetime import datetime
+from itertools import islice
+from typing import Dict, IO, Iterable, List
+from database.db_manager import DatabaseManager
+from utils.bmi_calculator import BMI_CATEGORIES, BMICalculator
+
+EXPORT_FORMATS = ("csv", "json", "ndjson")
+
+def _weight_rows(records: List[Dict]) -> List[list]:
+    """Dòng CSV cho một lô cân nặng; phân loại BMI cả lô bằng categorize_many"""
+    codes = BMICalculator.categorize_many([record['bmi'] for record in records])
+    return [[record['date'], record['weight'], record['bmi'],
+             BMI_CATEGORIES[code]['category'] if code is not None else '',
+             record['notes'] or '']
+            for record, code in zip(records, codes)]
+
+# Cấu hình xuất cho từng loại bản ghi: tiêu đề CSV và cách chuyển bản ghi thành dòng CSV
+# (row: từng bản ghi; rows: cả một lô bản ghi, dùng khi xử lý theo lô nhanh hơn)
+EXPORT_SPECS = {
+    "weight": {
+        "headers": ['Ngày', 'Cân nặng', 'BMI', 'Phân loại', 'Ghi chú'],
+        "rows": _weight_rows,
+    },
+    "activity": {
+        "headers": ['Ngày', 'Loại hoạt động', 'Khoảng thời gian', 'Calo', 'Ghi chú'],
+        "row": lambda r: [r['date'], r['activity_type'], r['duration'], r['calories_burned'], r['notes'] or ''],
+    },
+    "sleep": {
+        "headers": ['Ngày', 'Giờ ngủ', 'Chất lượng', 'Ghi chú'],
+        "row": lambda r: [r['record_date'], r['sleep_hours'], r['sleep_quality'], r['notes'] or ''],
+    },
+    "heart_rate": {
+        "headers": ['Ngày', 'Thời gian', 'BPM', 'Hoạt động', 'Ghi chú'],
+        "row": lambda r: [r['record_date'], r['record_time'], r['bpm'], r['activity_type'], r['notes'] or ''],
+    },
+}
+
+class DataExporter:
+    """
+    Xuất dữ liệu sức khỏe ra CSV / JSON / NDJSON theo kiểu streaming
+
+    Bản ghi được đọc theo lô (DatabaseManager.iter_records) và ghi ngay ra
+    file hoặc thẳng vào entry của file ZIP, nên bộ nhớ dùng không phụ thuộc
+    độ dài lịch sử và không cần file tạm.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = 500):
+        self.db = db_manager
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def write_records(self, stream: IO[str], record_type: str, records: Iterable[Dict], format: str) -> int:
+        """
+        Ghi bản ghi vào một luồng văn bản
+
+        Args:
+            stream: Luồng văn bản đã mở (CSV cần newline='')
+            record_type: Khóa trong EXPORT_SPECS
+            records: Bản ghi (có thể là generator)
+            format: 'csv', 'json' (mảng JSON) hoặc 'ndjson' (mỗi dòng một object)
+
+        Returns:
+            Số bản ghi đã ghi
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+
+        count = 0
+        if format == 'csv':
+            spec = EXPORT_SPECS[record_type]
+            writer = csv.writer(stream)
+            writer.writerow(spec['headers'])
+            to_rows = spec.get('rows') or (lambda batch: map(spec['row'], batch))
+            records = iter(records)
+            for batch in iter(lambda: list(islice(records, self.batch_size)), []):
+                writer.writerows(to_rows(batch))
+                count += len(batch)
+        elif format == 'ndjson':
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False))
+                stream.write('\n')
+                count += 1
+        else:
+            # Mảng JSON được ghi từng phần tử, không dựng cả danh sách trong bộ nhớ
+            stream.write('[')
+            for record in records:
+                stream.write(',\n  ' if count else '\n  ')
+                stream.write(json.dumps(record, ensure_ascii=False))
+                count += 1
+            stream.write('\n]\n' if count else ']\n')
+        return count
+
+    def export_records(self, user_id: int, record_type: str, file_path: str, format: str,
+                       from_date: str = None, to_date: str = None) -> int:
+        """
+        Xuất một loại bản ghi ra file
+
+        Returns:
+            Số bản ghi đã xuất (0 = không có dữ liệu, file không được tạo)
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        if not self.db.has_records(user_id, [record_type]):
+            return 0
+
+        records = self.db.iter_records(record_type, user_id, from_date, to_date,
+                                       batch_size=self.batch_size)
+        encoding = 'utf-8-sig' if format == 'csv' else 'utf-8'
+        with open(file_path, 'w', newline='', encoding=encoding) as file:
+            count = self.write_records(file, record_type, records, format)
+        self.logger.info(f"Exported {count} {record_type} records to {file_path}")
+        return count
+
+    def export_all(self, user_id: int, zip_path: str, format: str) -> Dict[str, int]:
+        """
+        Xuất mọi loại bản ghi vào một file ZIP, mỗi loại một entry
+
+        Returns:
+            Dict loại bản ghi -> số bản ghi đã xuất
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+
+        ts = datetime.now().strftime("%Y%m%d")
+        encoding = 'utf-8-sig' if format == 'csv' else 'utf-8'
+        counts = {}
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for record_type in EXPORT_SPECS:
+                records = self.db.iter_records(record_type, user_id, batch_size=self.batch_size)
+                # force_zip64: kích thước entry chưa biết trước khi ghi xong
+                with zipf.open(f"{record_type}_{ts}.{format}", "w", force_zip64=True) as entry:
+                    with io.TextIOWrapper(entry, encoding=encoding, newline='') as stream:
+                        counts[record_type] = self.write_records(stream, record_type, records, format)
+        self.logger.info(f"Exported {sum(counts.values())} records to {os.path.basename(zip_path)}")
+        return counts
@@ -0,0 +1,226 @@
+# utils/data_importer.py
+import csv
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from database.db_manager import DatabaseManager
+from utils.data_exporter import EXPORT_SPECS
+from utils.validators import BATCH_RULES, HealthDataValidator
+
+IMPORT_FORMATS = ("csv", "json", "ndjson")
+
+# Tên cột khác (tiêu đề CSV của HistoryTab, dữ liệu thiết bị) -> khóa chuẩn
+IMPORT_ALIASES = {
+    "weight": {"Ngày": "date", "Cân nặng": "weight", "Ghi chú": "notes", "record_date": "date"},
+    "activity": {"Ngày": "date", "Loại hoạt động": "activity_type", "Khoảng thời gian": "duration",
+                 "Calo": "calories_burned", "Ghi chú": "notes", "activity_date": "date",
+                 "duration_minutes": "duration", "calories": "calories_burned"},
+    "sleep": {"Ngày": "record_date", "Giờ ngủ": "sleep_hours", "Chất lượng": "sleep_quality",
+              "Ghi chú": "notes", "date": "record_date"},
+    "heart_rate": {"Ngày": "record_date", "Thời gian": "record_time", "BPM": "bpm",
+                   "Hoạt động": "activity_type", "Ghi chú": "notes", "date": "record_date",
+                   "time": "record_time", "current_heart_rate": "bpm"},
+}
+
+# Số rejected row giữ lại chi tiết trong kết quả
+MAX_REPORTED_ERRORS = 100
+
+# Các khóa của bản ghi sau chuẩn hóa (như tham số của add_*_records_bulk)
+IMPORT_FIELDS = {
+    "weight": ("date", "weight", "notes"),
+    "activity": ("date", "activity_type", "duration", "calories_burned", "intensity", "notes"),
+    "sleep": ("record_date", "sleep_hours", "sleep_quality", "notes"),
+    "heart_rate": ("record_date", "record_time", "bpm", "activity_type", "notes"),
+}
+
+# Chuyển kiểu cho các cột số sau khi validate
+NUMERIC_FIELDS = {
+    "weight": float,
+    "duration": lambda value: int(float(value)),
+    "calories_burned": float,
+    "sleep_hours": float,
+    "bpm": lambda value: int(float(value)),
+}
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _normalize_row(record_type: str, row) -> Dict:
+    """Đổi tên cột về khóa chuẩn và bỏ khoảng trắng; kiểu dữ liệu được kiểm tra sau"""
+    if not isinstance(row, dict):
+        return {}
+    aliases = IMPORT_ALIASES[record_type]
+    row = {aliases.get(key, key): value for key, value in row.items()}
+    record = {key: _text(row.get(key)) for key in IMPORT_FIELDS[record_type]}
+
+    # Chấp nhận cả dạng có giờ ("2024-01-01 08:00:00")
+    date_key = BATCH_RULES[record_type]['date']
+    if record[date_key]:
+        record[date_key] = record[date_key][:10]
+    return record
+
+def validate_chunk(record_type: str, rows: List[Tuple[int, Dict]]) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, str]]]:
+    """
+    Validate một lô dòng (chạy được trong process con)
+
+    Args:
+        record_type: Loại bản ghi
+        rows: Các cặp (số dòng trong file, dòng thô)
+
+    Returns:
+        ([(số dòng, bản ghi hợp lệ)], [(số dòng, lý do)] của các dòng bị loại)
+    """
+    records = [_normalize_row(record_type, row) for _, row in rows]
+    error_mask, messages = HealthDataValidator.validate_records_batch(record_type, records)
+
+    valid, rejected = [], []
+    for index, ((line, _), record, failed) in enumerate(zip(rows, records, error_mask)):
+        if failed:
+            rejected.append((line, messages[index]))
+            continue
+        try:
+            for key in IMPORT_FIELDS[record_type]:
+                if key in NUMERIC_FIELDS and record[key] is not None:
+                    record[key] = NUMERIC_FIELDS[key](record[key])
+        except ValueError:
+            rejected.append((line, f"Giá trị {key} không phải là số"))
+            continue
+        valid.append((line, record))
+    return valid, rejected
+
+class DataImporter:
+    """
+    Nhập dữ liệu từ file CSV / JSON / NDJSON (file do HistoryTab xuất hoặc dữ liệu thiết bị)
+
+    File được đọc theo từng lô; các lô được validate song song trong process
+    pool trong khi main process ghi các lô đã xong bằng bulk insert (mỗi lô
+    một giao dịch). Số lô đang xử lý bị giới hạn nên bộ nhớ không tăng theo
+    kích thước file.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = 20000,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            db_manager: Database đích
+            batch_size: Số dòng mỗi lô validate / insert
+            workers: Số process validate (mặc định số CPU; 1 = validate ngay trong process hiện tại)
+        """
+        self.db = db_manager
+        self.batch_size = batch_size
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def detect_format(file_path: str) -> str:
+        """Đoán định dạng theo phần mở rộng (.csv / .ndjson / .jsonl / .json)"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == '.csv':
+            return 'csv'
+        if ext in ('.ndjson', '.jsonl'):
+            return 'ndjson'
+        return 'json'
+
+    def read_rows(self, record_type: str, file_path: str, format: str = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Đọc các dòng thô kèm số dòng (CSV/NDJSON đọc dần, JSON đọc cả file)
+
+        Dữ liệu thiết bị dạng {'weight_data': {...}, 'activity_data': {...}}
+        (HealthDeviceSimulator.generate_historical_data) được tách lấy phần
+        của record_type; ngày không có trong phần đó thì lấy từ dòng ngoài.
+        """
+        format = format or self.detect_format(file_path)
+        if format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format: {format}")
+
+        if format == 'csv':
+            with open(file_path, newline='', encoding='utf-8-sig') as file:
+                for line, row in enumerate(csv.DictReader(file), start=2):
+                    yield line, row
+            return
+
+        with open(file_path, encoding='utf-8-sig') as file:
+            if format == 'ndjson':
+                rows = ((line, json.loads(text)) for line, text in enumerate(file, start=1) if text.strip())
+            else:
+                data = json.load(file)
+                rows = enumerate(data if isinstance(data, list) else [data], start=1)
+
+            nested_key = f"{record_type}_data"
+            for line, row in rows:
+                if nested_key in row:
+                    if not row[nested_key]:
+                        continue
+                    row = dict(row[nested_key], date=row[nested_key].get('date') or row.get('date'))
+                yield line, row
+
+    def import_file(self, user_id: int, record_type: str, file_path: str, format: str = None,
+                    progress: Callable[[int, int], None] = None) -> Dict:
+        """
+        Nhập một file vào database
+
+        Args:
+            user_id: ID người dùng
+            record_type: 'weight', 'activity', 'sleep' hoặc 'heart_rate'
+            file_path: Đường dẫn file
+            format: Định dạng, mặc định đoán theo phần mở rộng
+            progress: Callback(số dòng đã xử lý, số bản ghi đã lưu) sau mỗi lô
+
+        Returns:
+            Dict {'total', 'imported', 'rejected', 'errors': [(số dòng, lý do)]}
+        """
+        if record_type not in EXPORT_SPECS:
+            raise ValueError(f"Unknown record type: {record_type}")
+        inserters = {
+            'weight': self.db.add_weight_records_bulk,
+            'activity': self.db.add_activities_bulk,
+            'sleep': self.db.add_sleep_records_bulk,
+            'heart_rate': self.db.add_heart_rate_records_bulk,
+        }
+        result = {'total': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+
+        def handle(chunk_size, validated):
+            valid, rejected = validated
+            if valid:
+                outcomes = inserters[record_type](user_id, [record for _, record in valid])
+                # Cân nặng trả về BMI, các loại khác trả về bool; None/False = lỗi
+                failed = [(line, "Không ghi được vào database")
+                          for (line, _), ok in zip(valid, outcomes) if ok is None or ok is False]
+                result['imported'] += len(valid) - len(failed)
+                rejected = rejected + failed
+            result['total'] += chunk_size
+            result['rejected'] += len(rejected)
+            room = MAX_REPORTED_ERRORS - len(result['errors'])
+            result['errors'].extend(rejected[:max(room, 0)])
+            if progress is not None:
+                progress(result['total'], result['imported'])
+
+        rows = self.read_rows(record_type, file_path, format)
+        chunks = iter(lambda: list(islice(rows, self.batch_size)), [])
+
+        if self.workers <= 1:
+            for chunk in chunks:
+                handle(len(chunk), validate_chunk(record_type, chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # Giữ tối đa 2 lô mỗi worker để validate chạy song song với insert
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((len(chunk), executor.submit(validate_chunk, record_type, chunk)))
+                    if len(pending) >= self.workers * 2:
+                        size, future = pending.popleft()
+                        handle(size, future.result())
+                while pending:
+                    size, future = pending.popleft()
+                    handle(size, future.result())
+
+        self.logger.info(f"Imported {result['imported']}/{result['total']} {record_type} rows "
+                         f"from {os.path.basename(file_path)}")
+        return result
@@ -2,7 +2,7 @@
 import random
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, Iterator, List, Tuple
 from .bmi_calculator import BMICalculator
 
 class HealthDeviceSimulator:
@@ -239,6 +239,33 @@ class HealthDeviceSimulator:
                 'heart_rate_zone': "Nghỉ ngơi"
             }
     
+    def stream_heart_rate(self, seconds: int = None, start: datetime = None,
+                          resting_hr: int = None) -> Iterator[Tuple[int, int]]:
+        """
+        Tạo luồng nhịp tim theo giây như thiết bị đeo (dùng với HeartRateStream)
+        
+        Nhịp tim dao động ngẫu nhiên quanh mức mục tiêu theo cường độ hoạt
+        động hiện tại (set_activity_intensity) và kéo dần về mức đó.
+        
+        Args:
+            seconds: Số giây cần tạo (None = vô hạn)
+            start: Thời điểm mẫu đầu tiên (mặc định bây giờ)
+            resting_hr: Nhịp tim nghỉ ngơi (mặc định ngẫu nhiên 58-72)
+            
+        Yields:
+            (Unix timestamp giây, bpm)
+        """
+        resting_hr = resting_hr or random.randint(58, 72)
+        timestamp = int((start or datetime.now()).timestamp())
+        targets = {"low": resting_hr + 10, "medium": resting_hr + 35, "high": resting_hr + 70}
+        bpm = float(resting_hr)
+        elapsed = 0
+        while seconds is None or elapsed < seconds:
+            target = targets.get(self.activity_intensity, resting_hr)
+            bpm += (target - bpm) * 0.05 + random.gauss(0, 1.5)
+            yield timestamp + elapsed, max(30, min(220, int(round(bpm))))
+            elapsed += 1
+    
     def generate_daily_summary(self) -> Dict[str, any]:
         """Tạo báo cáo tổng quan hàng ngày"""
         try:
@@ -0,0 +1,38 @@
+# utils/downsampling.py
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar('T')
+
+def downsample_min_max(points: Sequence[T], max_points: int,
+                       value: Callable[[T], float]) -> List[T]:
+    """
+    Giảm số điểm bằng cách giữ điểm nhỏ nhất và lớn nhất của mỗi nhóm
+
+    Chuỗi được chia thành max_points / 2 nhóm liên tiếp; mỗi nhóm giữ lại điểm
+    có giá trị thấp nhất và cao nhất (theo đúng thứ tự ban đầu). Nhờ vậy các
+    đỉnh bất thường (vd: nhịp tim quá nhanh/quá chậm) không bị làm mất.
+
+    Args:
+        points: Các điểm đã sắp xếp theo thời gian
+        max_points: Số điểm tối đa sau khi giảm
+        value: Hàm lấy giá trị của một điểm
+
+    Returns:
+        Danh sách điểm (tham chiếu tới phần tử gốc), không quá max_points
+    """
+    n = len(points)
+    if max_points <= 0 or n <= max_points:
+        return list(points)
+
+    buckets = max(max_points // 2, 1)
+    result = []
+    for b in range(buckets):
+        start = b * n // buckets
+        end = (b + 1) * n // buckets
+        if start >= end:
+            continue
+        low = min(range(start, end), key=lambda i: value(points[i]))
+        high = max(range(start, end), key=lambda i: value(points[i]))
+        for i in sorted({low, high}):
+            result.append(points[i])
+    return result
@@ -0,0 +1,202 @@
+# utils/heart_rate_stream.py
+"""
+Nhận luồng nhịp tim theo giây từ thiết bị và ghi xuống database theo lô
+
+Mẫu là cặp (thời điểm, bpm); thời điểm là Unix timestamp (giây) hoặc
+datetime. Mẫu được kiểm tra giới hạn bpm như khi nhập tay, gom vào bộ đệm
+và ghi bằng DatabaseManager.add_heart_rate_samples, mỗi lô một giao dịch:
+mẫu thô vào heart_rate_samples và (tùy chọn) tổng hợp theo phút vào
+heart_rate_minutes. Tổng hợp phút được đưa vào heart_rate_records (một bản
+ghi mỗi phút), nên hiện trong lịch sử, biểu đồ và cảnh báo của ứng dụng.
+
+Hai cách dùng:
+  - HeartRateStream.start() + put() / put_many(): thiết bị đẩy mẫu liên tục,
+    một thread nền ghi các lô (có giới hạn số lô chờ).
+  - HeartRateStream.ingest(iterable): ghi đồng bộ từ một generator / file.
+"""
+import logging
+import queue
+import threading
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from database.db_manager import DatabaseManager
+from utils.validators import BATCH_RULES
+
+# Giới hạn bpm hợp lệ, như validate nhịp tim nhập tay
+BPM_MIN, BPM_MAX = BATCH_RULES["heart_rate"]["ranges"]["bpm"][:2]
+
+Sample = Tuple[Union[int, float, datetime], Union[int, float]]
+
+def to_timestamp(value: Union[int, float, datetime]) -> int:
+    """Đổi thời điểm của mẫu về Unix timestamp (giây)"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+class HeartRateStream:
+    """
+    Pipeline ghi mẫu nhịp tim theo lô
+
+        put() / put_many() -> bộ đệm -> hàng đợi lô (giới hạn) -> thread ghi
+
+    Bộ đệm được đẩy đi khi đủ batch_size mẫu hoặc sau flush_interval giây,
+    nên luồng chậm vẫn được ghi kịp thời. Khi database không theo kịp và
+    hàng đợi đầy, put() chờ thay vì dùng thêm bộ nhớ.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, user_id: int, batch_size: int = 5000,
+                 flush_interval: float = 1.0, store_samples: bool = True,
+                 store_minutes: bool = True, max_pending_batches: int = 8):
+        """
+        Args:
+            db_manager: Database đích
+            user_id: ID người dùng đeo thiết bị
+            batch_size: Số mẫu mỗi lô / giao dịch
+            flush_interval: Thời gian tối đa (giây) một mẫu nằm trong bộ đệm
+            store_samples: Lưu mẫu thô theo giây
+            store_minutes: Lưu tổng hợp theo phút (min / max / trung bình / số mẫu)
+            max_pending_batches: Số lô tối đa chờ ghi
+        """
+        self.db = db_manager
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.store_samples = store_samples
+        self.store_minutes = store_minutes
+        self.logger = logging.getLogger(__name__)
+
+        self._buffer: List[Tuple[int, int]] = []
+        self._lock = threading.Lock()
+        # Giữ trong lúc thread ghi tự đẩy bộ đệm (xem _run), để flush() chờ được
+        self._write_lock = threading.Lock()
+        self._batches = queue.Queue(maxsize=max_pending_batches)
+        self._writer: Optional[threading.Thread] = None
+        self._stats = {'received': 0, 'rejected': 0, 'saved': 0, 'batches': 0}
+
+    def start(self) -> 'HeartRateStream':
+        """Khởi động thread ghi"""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="hr-stream-writer", daemon=True)
+            self._writer.start()
+        return self
+
+    def put(self, timestamp: Union[int, float, datetime], bpm: Union[int, float]):
+        """Nhận một mẫu (có thể gọi từ bất kỳ thread nào)"""
+        self.put_many(((timestamp, bpm),))
+
+    def put_many(self, samples: Iterable[Sample]):
+        """Nhận nhiều mẫu một lúc"""
+        valid = self._validate(samples)
+        with self._lock:
+            self._buffer.extend(valid)
+            if len(self._buffer) < self.batch_size:
+                return
+            batches = [self._buffer[i:i + self.batch_size]
+                       for i in range(0, len(self._buffer), self.batch_size)]
+            # Phần lẻ cuối cùng ở lại bộ đệm chờ thêm mẫu
+            self._buffer = batches.pop() if len(batches[-1]) < self.batch_size else []
+        for batch in batches:
+            if self._writer is None:
+                # Chưa start(): ghi ngay trên thread gọi
+                self._write(batch)
+            else:
+                self._batches.put(batch)
+
+    def flush(self):
+        """Đẩy bộ đệm đi và chờ tới khi mọi mẫu đã nhận được ghi xong"""
+        batch = self._take_buffer()
+        if batch:
+            if self._writer is None:
+                self._write(batch)
+            else:
+                self._batches.put(batch)
+        self._batches.join()
+        with self._write_lock:
+            pass
+
+    def close(self):
+        """Ghi nốt các mẫu còn lại và dừng thread ghi"""
+        self.flush()
+        if self._writer is not None:
+            self._batches.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def __enter__(self) -> 'HeartRateStream':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def ingest(self, samples: Iterable[Sample]) -> Dict[str, int]:
+        """
+        Ghi đồng bộ mọi mẫu của một iterable (generator của thiết bị, file...)
+
+        Returns:
+            Thống kê như stats()
+        """
+        samples = iter(samples)
+        for chunk in iter(lambda: list(islice(samples, self.batch_size)), []):
+            batch = self._validate(chunk)
+            if batch:
+                self._write(batch)
+        return self.stats()
+
+    def stats(self) -> Dict[str, int]:
+        """Số mẫu đã nhận / bị loại / đã lưu và số lô đã ghi"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _validate(self, samples: Iterable[Sample]) -> List[Tuple[int, int]]:
+        """Chuẩn hóa mẫu về (timestamp, bpm) và bỏ mẫu ngoài giới hạn"""
+        received, valid = 0, []
+        for timestamp, bpm in samples:
+            received += 1
+            try:
+                bpm = int(bpm)
+                if BPM_MIN <= bpm <= BPM_MAX:
+                    valid.append((to_timestamp(timestamp), bpm))
+            except (TypeError, ValueError, OverflowError):
+                pass
+        with self._lock:
+            self._stats['received'] += received
+            self._stats['rejected'] += received - len(valid)
+        return valid
+
+    def _take_buffer(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        return batch
+
+    def _write(self, batch: List[Tuple[int, int]]):
+        saved = self.db.add_heart_rate_samples(self.user_id, batch, self.store_samples, self.store_minutes)
+        with self._lock:
+            self._stats['saved'] += saved
+            self._stats['batches'] += 1
+
+    def _run(self):
+        """Thread ghi: ghi các lô đầy, hoặc bộ đệm sau mỗi flush_interval nếu luồng chậm"""
+        while True:
+            try:
+                batch = self._batches.get(timeout=self.flush_interval)
+            except queue.Empty:
+                with self._write_lock:
+                    batch = self._take_buffer()
+                    if batch:
+                        self._write_logged(batch)
+                continue
+
+            try:
+                if batch is None:
+                    return
+                self._write_logged(batch)
+            finally:
+                self._batches.task_done()
+
+    def _write_logged(self, batch: List[Tuple[int, int]]):
+        """Ghi một lô trên thread ghi; lỗi chỉ được log để thread không dừng (lô bị bỏ)"""
+        try:
+            self._write(batch)
+        except Exception as e:
+            self.logger.error(f"Error writing heart rate batch: {e}")
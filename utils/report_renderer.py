@@ -0,0 +1,180 @@
+# utils/report_renderer.py
+"""
+Xuất báo cáo biểu đồ không cần giao diện (backend Agg, không dùng Tk)
+
+Mỗi user được vẽ trong một process riêng của ProcessPoolExecutor: process tự
+mở kết nối database, dựng các biểu đồ bằng ChartGenerator rồi ghi ra file.
+Chỉ đường dẫn database và danh sách file được truyền qua lại giữa các process.
+"""
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+import matplotlib
+matplotlib.use("Agg")
+
+from database.db_manager import DatabaseManager
+from utils.chart_generator import CHART_RECORD_TYPES, ChartGenerator
+from utils.downsampling import downsample_min_max
+
+REPORT_FORMATS = ("png", "svg", "pdf")
+REPORT_PERIODS = {"week": 7, "month": 30, "3months": 90, "6months": 180}
+
+# Số điểm nhịp tim tối đa trên một biểu đồ (đủ cho ảnh rộng ~2000 px)
+REPORT_MAX_POINTS = 2000
+
+logger = logging.getLogger(__name__)
+
+def _build_chart(generator: ChartGenerator, chart_type: str, data: Dict, period: str):
+    """Dựng Figure cho một loại biểu đồ từ dữ liệu đã đọc"""
+    weight = data.get("weight", [])
+    activity = data.get("activity", [])
+    sleep = data.get("sleep", [])
+    heart_rate = data.get("heart_rate", [])
+
+    if chart_type == "weight_trend":
+        return generator.create_weight_trend_chart(weight, period)
+    if chart_type == "bmi":
+        return generator.create_bmi_chart(weight)
+    if chart_type == "activity":
+        return generator.create_activity_chart(activity)
+    if chart_type == "sleep_trend":
+        return generator.create_sleep_trend_chart(sleep, period)
+    if chart_type == "heart_rate_trend":
+        ordered = sorted(heart_rate, key=lambda r: (r["record_date"], r["record_time"] or ""))
+        points = downsample_min_max(ordered, REPORT_MAX_POINTS, value=lambda r: r["bpm"])
+        return generator.create_heart_rate_trend_chart(points, period)
+    if chart_type == "sleep_quality":
+        return generator.create_sleep_quality_chart(sleep)
+    if chart_type == "heart_rate_distribution":
+        return generator.create_heart_rate_distribution_chart(heart_rate)
+    if chart_type == "weekly_summary":
+        return generator.create_weekly_summary_chart(weight, activity)
+    raise ValueError(f"Unknown chart type: {chart_type}")
+
+def user_report_dir(output_dir: str, user_id: int, username: str) -> str:
+    """
+    Thư mục báo cáo của một user: output_dir/<username>
+
+    Tên user lấy từ database nên không được tin cậy: ký tự ngoài chữ, số,
+    '_' và '-' được thay bằng '_' (tên bị đổi thì thêm user_id để không trùng
+    thư mục của user khác), và đường dẫn luôn nằm trong output_dir.
+    """
+    name = re.sub(r'[^\w-]', '_', username or '')
+    if name != username:
+        name = f"{name}_{user_id}"
+    root = os.path.realpath(output_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"Invalid report directory for user {user_id}")
+    return path
+
+def render_user_report(db_name: str, user_id: int, output_dir: str,
+                       chart_types: Iterable[str] = None, period: str = "week",
+                       formats: Iterable[str] = ("png",), dpi: int = 150) -> List[str]:
+    """
+    Vẽ các biểu đồ của một user ra file (chạy được trong process con)
+
+    Args:
+        db_name: Đường dẫn file SQLite
+        user_id: ID user
+        output_dir: Thư mục gốc; file được ghi vào user_report_dir(output_dir, ...)
+        chart_types: Các loại biểu đồ (mặc định tất cả CHART_RECORD_TYPES)
+        period: Khoảng thời gian trong REPORT_PERIODS
+        formats: Định dạng file trong REPORT_FORMATS
+        dpi: Độ phân giải ảnh PNG
+
+    Returns:
+        Danh sách file đã ghi
+    """
+    chart_types = list(chart_types or CHART_RECORD_TYPES)
+    formats = list(formats)
+    if period not in REPORT_PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    for fmt in formats:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {fmt}")
+
+    # Mỗi process dùng kết nối riêng, không cần pool; chỉ đọc nên giữ nguyên
+    # journal mode của file (profile "default")
+    db = DatabaseManager(db_name, pool_size=0, profile="default")
+    try:
+        users = db.get_users([user_id])
+        if not users:
+            raise ValueError(f"Unknown user: {user_id}")
+        username = users[0]["username"]
+
+        # Chỉ đọc các loại bản ghi mà các biểu đồ cần, mỗi loại một lần
+        days = REPORT_PERIODS[period]
+        fetchers = {
+            "weight": db.get_weight_records,
+            "activity": db.get_activities,
+            "sleep": db.get_sleep_records,
+            "heart_rate": db.get_heart_rate_records,
+        }
+        needed = {t for chart_type in chart_types for t in CHART_RECORD_TYPES.get(chart_type, ())}
+        data = {record_type: fetchers[record_type](user_id, days=days) for record_type in needed}
+    finally:
+        db.close()
+
+    user_dir = user_report_dir(output_dir, user_id, username)
+    os.makedirs(user_dir, exist_ok=True)
+
+    generator = ChartGenerator(cache_size=0)
+    written = []
+    for chart_type in chart_types:
+        fig = _build_chart(generator, chart_type, data, period)
+        for fmt in formats:
+            path = os.path.join(user_dir, f"{chart_type}_{period}.{fmt}")
+            fig.savefig(path, format=fmt, dpi=dpi, bbox_inches="tight", facecolor="white")
+            written.append(path)
+    return written
+
+def render_reports(db_name: str, output_dir: str, user_ids: Iterable[int] = None,
+                   chart_types: Iterable[str] = None, period: str = "week",
+                   formats: Iterable[str] = ("png",), dpi: int = 150,
+                   workers: Optional[int] = None) -> Dict[int, List[str]]:
+    """
+    Vẽ báo cáo cho nhiều user song song bằng process pool
+
+    Args:
+        db_name: Đường dẫn file SQLite
+        output_dir: Thư mục gốc chứa báo cáo
+        user_ids: Các user cần vẽ (mặc định tất cả)
+        chart_types, period, formats, dpi: Xem render_user_report
+        workers: Số process (mặc định số CPU; 1 = chạy trong process hiện tại)
+
+    Returns:
+        Dict user_id -> danh sách file; user bị lỗi không có trong kết quả
+    """
+    db = DatabaseManager(db_name, pool_size=0, profile="default")
+    try:
+        user_ids = [user["user_id"] for user in db.get_users(user_ids)]
+    finally:
+        db.close()
+
+    chart_types = list(chart_types or CHART_RECORD_TYPES)
+    formats = list(formats)
+    options = dict(chart_types=chart_types, period=period, formats=formats, dpi=dpi)
+    results = {}
+
+    if workers == 1 or len(user_ids) <= 1:
+        for user_id in user_ids:
+            try:
+                results[user_id] = render_user_report(db_name, user_id, output_dir, **options)
+            except Exception as e:
+                logger.error(f"Error rendering report for user {user_id}: {e}")
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_user_report, db_name, user_id, output_dir, **options): user_id
+                   for user_id in user_ids}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                results[user_id] = future.result()
+            except Exception as e:
+                logger.error(f"Error rendering report for user {user_id}: {e}")
+    return results
@@ -1,7 +1,74 @@
 # utils/validators.py
+import functools
+import math
 import re
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9_]+$')
+_FULL_NAME_SPECIAL = re.compile(r'[0-9!@#$%^&*()_+=\[\]{};\':"\\|,.<>?]')
+_TIME_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?$')
+
+VALID_ACTIVITIES = ('Đi bộ', 'Chạy bộ', 'Đạp xe', 'Bơi lội', 
+                    'Gym', 'Yoga', 'Nhảy dây', 'Leo cầu thang')
+VALID_INTENSITIES = ('low', 'medium', 'high')
+
+# Quy tắc validate theo lô: cột ngày, khoảng giá trị số (min, max, thông báo,
+# min có được phép không), cột số nguyên, cột giờ và cột giá trị liệt kê
+BATCH_RULES = {
+    "weight": {
+        "date": "date",
+        "ranges": {"weight": (20, 300, "Cân nặng phải từ 20-300 kg", True)},
+    },
+    "activity": {
+        "date": "date",
+        "ranges": {"duration": (1, 480, "Thời gian hoạt động phải từ 1-480 phút", True)},
+        "integers": ("duration",),
+        "choices": {"activity_type": (VALID_ACTIVITIES, False), "intensity": (VALID_INTENSITIES, True)},
+    },
+    "sleep": {
+        "date": "record_date",
+        "ranges": {"sleep_hours": (0, 24, "Giờ ngủ phải từ 0-24 giờ", False)},
+    },
+    "heart_rate": {
+        "date": "record_date",
+        "ranges": {"bpm": (30, 220, "Nhịp tim phải từ 30-220 BPM", True)},
+        "integers": ("bpm",),
+        "times": ("record_time",),
+    },
+}
+
+# Tên cột hiển thị trong thông báo lỗi
+COLUMN_LABELS = {
+    "weight": "Cân nặng",
+    "duration": "Thời gian",
+    "sleep_hours": "Giờ ngủ",
+    "bpm": "Nhịp tim",
+    "activity_type": "Loại hoạt động",
+    "intensity": "Cường độ",
+}
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(date_str: str) -> Optional[datetime]:
+    """Phân tích ngày YYYY-MM-DD (có cache: dữ liệu hàng loạt lặp lại cùng ngày rất nhiều)"""
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value) -> float:
+    """Chuyển sang float, giá trị thiếu/không phải số thành NaN"""
+    if isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
 
 class HealthDataValidator:
     """Lớp validation cho dữ liệu sức khỏe"""
@@ -74,11 +141,9 @@ class HealthDataValidator:
         Returns:
             Tuple (is_valid, message)
         """
-        try:
-            datetime.strptime(date_str, '%Y-%m-%d')
-            return True, "Hợp lệ"
-        except ValueError:
+        if _parse_date(date_str) is None:
             return False, "Định dạng ngày không hợp lệ (YYYY-MM-DD)"
+        return True, "Hợp lệ"
     
     @staticmethod
     def validate_username(username: str) -> Tuple[bool, str]:
@@ -100,7 +165,7 @@ class HealthDataValidator:
         if len(username) > 20:
             return False, "Tên đăng nhập không được quá 20 ký tự"
         
-        if not re.match(r'^[a-zA-Z0-9_]+$', username):
+        if not _USERNAME_PATTERN.match(username):
             return False, "Tên đăng nhập chỉ được chứa chữ cái, số và dấu gạch dưới"
         
         return True, "Hợp lệ"
@@ -148,7 +213,7 @@ class HealthDataValidator:
             return False, "Họ tên quá dài"
         
         # Kiểm tra ký tự đặc biệt
-        if re.search(r'[0-9!@#$%^&*()_+=\[\]{};\':"\\|,.<>?]', full_name):
+        if _FULL_NAME_SPECIAL.search(full_name):
             return False, "Họ tên không được chứa số hoặc ký tự đặc biệt"
         
         return True, "Hợp lệ"
@@ -194,7 +259,7 @@ class HealthDataValidator:
         
         # Validate ngày sinh hợp lý
         try:
-            birth_dt = datetime.strptime(birth_date, '%Y-%m-%d')
+            birth_dt = _parse_date(birth_date)
             today = datetime.now()
             
             if birth_dt > today:
@@ -223,13 +288,8 @@ class HealthDataValidator:
         if not activity_type:
             return False, "Loại hoạt động không được để trống"
         
-        valid_activities = [
-            'Đi bộ', 'Chạy bộ', 'Đạp xe', 'Bơi lội', 
-            'Gym', 'Yoga', 'Nhảy dây', 'Leo cầu thang'
-        ]
-        
-        if activity_type not in valid_activities:
-            return False, f"Loại hoạt động phải là: {', '.join(valid_activities)}"
+        if activity_type not in VALID_ACTIVITIES:
+            return False, f"Loại hoạt động phải là: {', '.join(VALID_ACTIVITIES)}"
         
         return True, "Hợp lệ"
     
@@ -247,9 +307,8 @@ class HealthDataValidator:
         if not intensity:
             return True, "Hợp lệ"  # Có thể để trống
         
-        valid_intensities = ['low', 'medium', 'high']
-        if intensity not in valid_intensities:
-            return False, f"Cường độ phải là: {', '.join(valid_intensities)}"
+        if intensity not in VALID_INTENSITIES:
+            return False, f"Cường độ phải là: {', '.join(VALID_INTENSITIES)}"
         
         return True, "Hợp lệ"
     
@@ -308,4 +367,65 @@ class HealthDataValidator:
         if height is not None:
             results['height'] = HealthDataValidator.validate_height(height)
         
-        return results
\ No newline at end of file
+        return results
+    
+    @staticmethod
+    def validate_records_batch(record_type: str, rows: Sequence[Dict]) -> Tuple[List[bool], Dict[int, str]]:
+        """
+        Validate nhiều bản ghi cùng lúc theo từng cột (dùng cho nhập file, thiết bị)
+        
+        Kiểm tra khoảng giá trị trên cả cột (vectorized khi có numpy), ngày
+        được phân tích có cache, giờ và liệt kê dùng regex/tập hợp dựng sẵn.
+        
+        Args:
+            record_type: Khóa trong BATCH_RULES ('weight', 'activity', 'sleep', 'heart_rate')
+            rows: Các bản ghi dạng dict với khóa chuẩn (như add_*_records_bulk)
+            
+        Returns:
+            Tuple (error_mask, messages): error_mask[i] là True nếu dòng i lỗi;
+            messages chỉ chứa lỗi đầu tiên của các dòng lỗi (chỉ số -> thông báo)
+        """
+        rules = BATCH_RULES[record_type]
+        messages: Dict[int, str] = {}
+        
+        def fail(indexes, message):
+            for i in indexes:
+                messages.setdefault(i, message)
+        
+        date_key = rules['date']
+        fail((i for i, row in enumerate(rows) if _parse_date(row.get(date_key)) is None),
+             "Định dạng ngày không hợp lệ (YYYY-MM-DD)")
+        
+        for column, (low, high, message, low_inclusive) in rules['ranges'].items():
+            values = [_to_float(row.get(column)) for row in rows]
+            if np is not None:
+                column_values = np.asarray(values, dtype=float)
+                above_low = column_values >= low if low_inclusive else column_values > low
+                # NaN (thiếu / không phải số) luôn nằm ngoài khoảng
+                bad = np.flatnonzero(~(above_low & (column_values <= high))).tolist()
+            else:
+                bad = [i for i, v in enumerate(values)
+                       if not ((v >= low if low_inclusive else v > low) and v <= high)]
+            nan_rows = [i for i in bad if math.isnan(values[i])]
+            fail(nan_rows, f"{COLUMN_LABELS[column]} phải là số")
+            fail(bad, message)
+            
+            if column in rules.get('integers', ()):
+                fail((i for i, v in enumerate(values) if not math.isnan(v) and not v.is_integer()),
+                     f"{COLUMN_LABELS[column]} phải là số nguyên")
+        
+        for column in rules.get('times', ()):
+            fail((i for i, row in enumerate(rows)
+                  if not isinstance(row.get(column), str) or not _TIME_PATTERN.match(row[column])),
+                 "Định dạng giờ không hợp lệ (HH:MM)")
+        
+        for column, (choices, optional) in rules.get('choices', {}).items():
+            allowed = frozenset(choices)
+            fail((i for i, row in enumerate(rows)
+                  if not (optional and not row.get(column)) and row.get(column) not in allowed),
+                 f"{COLUMN_LABELS[column]} phải là: {', '.join(choices)}")
+        
+        error_mask = [False] * len(rows)
+        for i in messages:
+            error_mask[i] = True
+        return error_mask, messages
\ No newline at end of file